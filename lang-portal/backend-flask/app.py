@@ -1,61 +1,135 @@
-from flask import Flask, g
-from flask_cors import CORS
+import os
+import time
 
-from lib.db import Db
+# Time the imports below, which every worker pays before create_app
+IMPORTS_STARTED = time.perf_counter()
+
+from flask import Flask, g, jsonify
+
+from lib.db import Db, LEARNER_HEADER, LEARNER_PATTERN
+from lib.membership import MembershipIndex
+from lib.backup import BackupManager
+from lib.rollups import RollupCompactor
+from lib.pubsub import Broker
+from lib.json_provider import make_json_provider
+from lib.compression import init_compression
+from lib.admission import init_admission
+from lib.queries import queries
+from lib.cors import init_cors
+from lib.startup import StartupTimer
 
 import routes.words
 import routes.groups
 import routes.study_sessions
 import routes.dashboard
 import routes.study_activities
+import routes.kanji
+import routes.sync
+import routes.admin
+import routes.analytics
+import routes.batch
+import routes.export
 
-def get_allowed_origins(app):
+IMPORTS_MS = (time.perf_counter() - IMPORTS_STARTED) * 1000
+
+def validate_queries(app):
+    # Compile every registered statement once, so a broken query fails at
+    # startup instead of on its first request. Databases that have not been
+    # initialized yet (invoke init-db) are skipped, and tables added since a
+    # database was created only warn until a setup task creates them.
+    database = app.config['DATABASE']
+    if not database.startswith('file:') and not os.path.exists(database):
+        # Connecting would create an empty database file
+        return
+    connection = app.db.connect()
     try:
-        cursor = app.db.cursor()
-        cursor.execute('SELECT url FROM study_activities')
-        urls = cursor.fetchall()
-        # Convert URLs to origins (e.g., https://example.com/app -> https://example.com)
-        origins = set()
-        for url in urls:
-            try:
-                from urllib.parse import urlparse
-                parsed = urlparse(url['url'])
-                origin = f"{parsed.scheme}://{parsed.netloc}"
-                origins.add(origin)
-            except:
-                continue
-        return list(origins) if origins else ["*"]
-    except:
-        return ["*"]  # Fallback to allow all origins if there's an error
+        if not connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'words'").fetchone():
+            return
+        errors = queries.validate(connection)
+    finally:
+        connection.close()
+    missing = {name: error for name, error in errors.items() if error.startswith('no such table')}
+    if missing:
+        app.logger.warning(f"Queries need tables missing from {app.config['DATABASE']}: {missing}")
+    invalid = {name: error for name, error in errors.items() if name not in missing}
+    if invalid:
+        raise ValueError('Invalid queries: ' + '; '.join(f'{name}: {error}' for name, error in invalid.items()))
 
 def create_app(test_config=None):
+    startup = StartupTimer(imports_ms=IMPORTS_MS)
     app = Flask(__name__)
     
+    app.config.from_mapping(
+        DATABASE='words.db'
+    )
     if test_config is None:
-        app.config.from_mapping(
-            DATABASE='words.db'
-        )
+        # Deployments configure the app through FLASK_* variables, e.g.
+        # FLASK_DATABASE=/data/words.db
+        app.config.from_prefixed_env()
     else:
         app.config.update(test_config)
     
-    # Initialize database first since we need it for CORS configuration
-    app.db = Db(database=app.config['DATABASE'])
-    
-    # Get allowed origins from study_activities table
-    allowed_origins = get_allowed_origins(app)
+    # Serialize responses with orjson when it is installed
+    app.json = make_json_provider(app)
+
+    # With SHARDS_DIR set, each learner's sessions and reviews live in their
+    # own database file next to the shared vocabulary
+    app.db = Db(
+        database=app.config['DATABASE'],
+        shards_dir=app.config.get('SHARDS_DIR'),
+        shard_cache_size=app.config.get('SHARD_CACHE_SIZE', 16)
+    )
+    if app.db.shards_dir:
+        @app.before_request
+        def check_learner():
+            if not LEARNER_PATTERN.fullmatch(app.db.learner()):
+                return jsonify({"error": f"{LEARNER_HEADER} must be 1-64 letters, digits, - or _"}), 400
+
+    if app.config.get('VALIDATE_QUERIES', True):
+        with startup.step('validate_queries'):
+            validate_queries(app)
+
+    # Session and group membership used to validate reviews, loaded on first use
+    app.membership = MembershipIndex()
+
+    # Live session events, buffered per subscriber
+    app.events = Broker(buffer_size=app.config.get('SSE_BUFFER_SIZE', 100))
+
+    # Online backups started from the admin endpoints, of DATABASE and of
+    # every learner shard
+    app.backups = BackupManager(
+        database=app.config['DATABASE'],
+        directory=app.config.get('BACKUP_DIR', 'backups'),
+        keep=app.config.get('BACKUP_KEEP', 7),
+        shards_dir=app.db.shards_dir
+    )
     
-    # In development, add localhost to allowed origins
-    if app.debug:
-        allowed_origins.extend(["http://localhost:8080", "http://127.0.0.1:8080"])
+    # Optionally compact hourly review rollups into days in the background
+    if app.config.get('ROLLUP_COMPACT_INTERVAL'):
+        with startup.step('rollup_compactor'):
+            app.rollup_compactor = RollupCompactor(
+                database=app.config['DATABASE'],
+                interval=app.config['ROLLUP_COMPACT_INTERVAL'],
+                keep_hours=app.config.get('ROLLUP_KEEP_HOURS', 48),
+                logger=app.logger,
+                shards_dir=app.db.shards_dir
+            )
+            app.rollup_compactor.start()
     
-    # Configure CORS with combined origins
-    CORS(app, resources={
-        r"/*": {
-            "origins": allowed_origins,
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
-        }
-    })
+    # Allow the origins of the study activity urls, loaded on the first
+    # cross-origin request and reloaded when study_activities changes
+    app.cors_origins = init_cors(
+        app,
+        methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["Content-Type", "Authorization", LEARNER_HEADER]
+    )
+
+    # Limit concurrent reads and writes, shedding load with 503s when the
+    # wait queue is full
+    app.admission = init_admission(app)
+
+    # Compress large responses for clients that accept gzip or brotli
+    init_compression(app)
 
     # Close database connection
     @app.teardown_appcontext
@@ -63,15 +137,30 @@ def create_app(test_config=None):
         app.db.close()
 
     # load routes -----------
-    routes.words.load(app)
-    routes.groups.load(app)
-    routes.study_sessions.load(app)
-    routes.dashboard.load(app)
-    routes.study_activities.load(app)
+    with startup.step('routes'):
+        routes.words.load(app)
+        routes.groups.load(app)
+        routes.study_sessions.load(app)
+        routes.dashboard.load(app)
+        routes.study_activities.load(app)
+        routes.kanji.load(app)
+        routes.sync.load(app)
+        routes.admin.load(app)
+        routes.analytics.load(app)
+        routes.batch.load(app)
+        routes.export.load(app)
+
+    startup.finish()
+    app.startup = startup
+    app.logger.info(
+        'App created in %.1f ms (imports %.1f ms): %s',
+        startup.total_ms, IMPORTS_MS, startup.steps
+    )
     
     return app
 
-app = create_app()
-
 if __name__ == '__main__':
+    # Build the app only when run directly, so importing this module (tests,
+    # tasks, serve.py) does not open DATABASE
+    app = create_app()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""Compare concurrent-connection capacity of the serving modes.
+
+Starts the app on a cloned seed database in a child process, once behind
+the threaded Werkzeug server that `app.run` uses and once behind the ASGI
+entry point in serve.py, then sends the same load to both:
+
+    python benchmark.py --concurrency 10 50 200 --requests 1000
+
+Admission control is off by default so the numbers show the server, not
+the load shedding; pass --admission to keep it.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from werkzeug.serving import make_server
+
+from app import create_app
+from lib.asgi import OffloadedWsgiToAsgi
+from lib.fixtures import TemplateDatabase
+
+PATHS = ('/words?page=1', '/dashboard/stats', '/groups?include=stats', '/api/study_sessions')
+
+def serve_wsgi(app, port, threads, workers):
+  logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no per-request log lines
+  make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+def serve_asgi(app, port, threads, workers):
+  import uvicorn
+
+  if workers > 1:
+    # Each worker process builds its app from serve.py and the environment
+    os.environ['SERVE_THREADS'] = str(threads)
+    os.environ['FLASK_DATABASE'] = app.config['DATABASE']
+    os.environ['FLASK_ADMISSION_CONTROL'] = 'true' if app.config['ADMISSION_CONTROL'] else 'false'
+    uvicorn.run('serve:asgi_app', host='127.0.0.1', port=port, workers=workers,
+                log_level='error', backlog=4096)
+    return
+  uvicorn.run(
+    OffloadedWsgiToAsgi(app, threads=threads),
+    host='127.0.0.1', port=port, log_level='error', backlog=4096
+  )
+
+SERVERS = {'wsgi': serve_wsgi, 'asgi': serve_asgi}
+
+async def fetch(port, path, timeout):
+  started = time.perf_counter()
+  reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+  try:
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode())
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), timeout)
+  finally:
+    writer.close()
+  status = int(response.split(b' ', 2)[1])
+  return status, time.perf_counter() - started
+
+async def run_load(port, concurrency, total, timeout):
+  """Send `total` requests with `concurrency` connections open at once."""
+  queue = list(range(total))
+  latencies = []
+  errors = 0
+  shed = 0
+
+  async def client():
+    nonlocal errors, shed
+    while queue:
+      index = queue.pop()
+      try:
+        status, latency = await fetch(port, PATHS[index % len(PATHS)], timeout)
+      except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+        errors += 1
+        continue
+      if status == 503:
+        shed += 1
+      elif status != 200:
+        errors += 1
+      else:
+        latencies.append(latency)
+
+  started = time.perf_counter()
+  await asyncio.gather(*(client() for _ in range(concurrency)))
+  elapsed = time.perf_counter() - started
+  return latencies, errors, shed, elapsed
+
+def percentile(values, fraction):
+  if not values:
+    return float('nan')
+  values = sorted(values)
+  return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def start_server(name, database, port, threads, workers, admission):
+  """Run a server in a child process so it does not share the GIL with the
+  load generator, and wait until it accepts connections."""
+  command = [sys.executable, __file__, '--serve', name, '--database', database,
+             '--port', str(port), '--threads', str(threads), '--workers', str(workers)]
+  if admission:
+    command.append('--admission')
+  process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+  for _ in range(200):
+    try:
+      asyncio.run(fetch(port, '/words', 1.0))
+      return process
+    except OSError:
+      time.sleep(0.05)
+  process.terminate()
+  raise RuntimeError(f'{name} server did not start')
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--servers', nargs='+', choices=SERVERS, default=list(SERVERS))
+  parser.add_argument('--concurrency', nargs='+', type=int, default=[10, 50, 200])
+  parser.add_argument('--requests', type=int, default=1000)
+  parser.add_argument('--threads', type=int, default=16, help='ASGI thread pool size')
+  parser.add_argument('--workers', type=int, default=1, help='ASGI worker processes')
+  parser.add_argument('--timeout', type=float, default=10.0)
+  parser.add_argument('--port', type=int, default=5099)
+  parser.add_argument('--admission', action='store_true', help='Keep admission control on')
+  # Used by the child processes started for each server
+  parser.add_argument('--serve', choices=SERVERS, help=argparse.SUPPRESS)
+  parser.add_argument('--database', help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  if args.serve:
+    app = create_app({'DATABASE': args.database, 'ADMISSION_CONTROL': args.admission})
+    SERVERS[args.serve](app, args.port, args.threads, args.workers)
+    return
+
+  directory = tempfile.mkdtemp(prefix='lang-portal-bench-')
+  database = TemplateDatabase(path=os.path.join(directory, 'template.db')).clone_to_file(
+    os.path.join(directory, 'bench.db')
+  )
+
+  print(f"{'server':<6} {'conns':>6} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'shed':>6}")
+  for name in args.servers:
+    process = start_server(name, database, args.port, args.threads, args.workers, args.admission)
+    try:
+      for concurrency in args.concurrency:
+        latencies, errors, shed, elapsed = asyncio.run(
+          run_load(args.port, concurrency, args.requests, args.timeout)
+        )
+        print(f'{name:<6} {concurrency:>6} {len(latencies) / elapsed:>9.1f} '
+              f'{percentile(latencies, 0.5) * 1000:>8.1f} {percentile(latencies, 0.99) * 1000:>8.1f} '
+              f'{errors:>7} {shed:>6}')
+    finally:
+      process.terminate()
+      process.wait()
+    args.port += 1
+
+if __name__ == '__main__':
+  main()
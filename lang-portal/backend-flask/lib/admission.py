@@ -0,0 +1,196 @@
+import heapq
+import itertools
+import threading
+import time
+
+from flask import g, jsonify, request
+
+# Lower numbers are admitted first and shed last
+PRIORITY_REVIEW = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_DASHBOARD = 2
+
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# POSTs that only read: /batch runs its GETs inside a rolled back transaction
+READ_ONLY_POSTS = ('/batch',)
+
+class Overloaded(Exception):
+  """Raised when a request is shed instead of admitted."""
+
+  def __init__(self, reason):
+    super().__init__(reason)
+    self.reason = reason
+
+class Waiter:
+  def __init__(self, lane, priority, seq):
+    self.lane = lane
+    self.priority = priority
+    self.seq = seq
+    self.evicted = False
+
+  def __lt__(self, other):
+    return (self.priority, self.seq) < (other.priority, other.seq)
+
+class Lane:
+  def __init__(self, limit):
+    self.limit = limit
+    self.active = 0
+    self.waiters = []  # heap of Waiter
+
+class AdmissionController:
+  """Concurrency limiter with separate read and write budgets.
+
+  Requests over a lane's budget wait in a bounded queue shared by both
+  lanes, ordered by priority. When the queue is full a newcomer either
+  displaces the lowest priority waiter or is shed straight away, and
+  waiters give up after `queue_timeout` seconds, so overload turns into
+  fast 503s instead of growing latency.
+  """
+
+  def __init__(self, read_limit=8, write_limit=1, queue_size=32, queue_timeout=2.0):
+    self.lanes = {'read': Lane(read_limit), 'write': Lane(write_limit)}
+    self.queue_size = queue_size
+    self.queue_timeout = queue_timeout
+    self._changed = threading.Condition()
+    self._seq = itertools.count()
+    self.admitted = 0
+    self.shed = {'queue_full': 0, 'timeout': 0, 'evicted': 0}
+
+  def queued(self):
+    return sum(len(lane.waiters) for lane in self.lanes.values())
+
+  def _can_run(self, lane, waiter):
+    return lane.active < lane.limit and lane.waiters and lane.waiters[0] is waiter
+
+  def _make_room(self, waiter):
+    """Evict the lowest priority waiter if it ranks below `waiter`."""
+    # With a queue size of 0 there is nobody to evict
+    if not self.queued():
+      return False
+    lowest = max(
+      (queued for lane in self.lanes.values() for queued in lane.waiters),
+      key=lambda queued: (queued.priority, queued.seq)
+    )
+    if lowest.priority <= waiter.priority:
+      return False
+    lane = self.lanes[lowest.lane]
+    lane.waiters.remove(lowest)
+    heapq.heapify(lane.waiters)
+    lowest.evicted = True
+    self.shed['evicted'] += 1
+    return True
+
+  def acquire(self, lane_name, priority=PRIORITY_DEFAULT):
+    lane = self.lanes[lane_name]
+    with self._changed:
+      if lane.active < lane.limit and not lane.waiters:
+        lane.active += 1
+        self.admitted += 1
+        return
+
+      waiter = Waiter(lane_name, priority, next(self._seq))
+      if self.queued() >= self.queue_size and not self._make_room(waiter):
+        self.shed['queue_full'] += 1
+        raise Overloaded('queue_full')
+
+      heapq.heappush(lane.waiters, waiter)
+      deadline = time.monotonic() + self.queue_timeout
+      while not self._can_run(lane, waiter):
+        remaining = deadline - time.monotonic()
+        if waiter.evicted:
+          self._changed.notify_all()
+          raise Overloaded('evicted')
+        if remaining <= 0:
+          lane.waiters.remove(waiter)
+          heapq.heapify(lane.waiters)
+          self.shed['timeout'] += 1
+          self._changed.notify_all()
+          raise Overloaded('timeout')
+        self._changed.wait(remaining)
+
+      heapq.heappop(lane.waiters)
+      lane.active += 1
+      self.admitted += 1
+      # The next waiter may fit in the budget too
+      self._changed.notify_all()
+
+  def release(self, lane_name):
+    with self._changed:
+      self.lanes[lane_name].active -= 1
+      self._changed.notify_all()
+
+  def stats(self):
+    with self._changed:
+      return {
+        'lanes': {
+          name: {'limit': lane.limit, 'active': lane.active, 'queued': len(lane.waiters)}
+          for name, lane in self.lanes.items()
+        },
+        'queue_size': self.queue_size,
+        'queued': self.queued(),
+        'admitted': self.admitted,
+        'shed': dict(self.shed)
+      }
+
+def classify_request(req):
+  """Lane and priority of a request: review writes go first, dashboard
+  reads are shed first."""
+  if req.method in WRITE_METHODS and req.path not in READ_ONLY_POSTS:
+    if req.path.endswith('/review'):
+      return 'write', PRIORITY_REVIEW
+    return 'write', PRIORITY_DEFAULT
+  if req.path.startswith('/dashboard/'):
+    return 'read', PRIORITY_DASHBOARD
+  return 'read', PRIORITY_DEFAULT
+
+def is_exempt(req):
+  # Preflights are cheap, event streams stay open for the whole session and
+  # the admission stats have to stay readable under overload
+  return (req.method == 'OPTIONS'
+          or req.path.endswith('/events')
+          or req.path == '/admin/admission')
+
+def init_admission(app):
+  """Put every request through an AdmissionController configured from
+  the ADMISSION_* settings. Returns the controller, or None when
+  ADMISSION_CONTROL is False."""
+  if not app.config.get('ADMISSION_CONTROL', True):
+    return None
+
+  controller = AdmissionController(
+    read_limit=app.config.get('ADMISSION_READ_LIMIT', 8),
+    # One writer per database file, learner shards can write in parallel
+    write_limit=app.config.get('ADMISSION_WRITE_LIMIT', 8 if app.config.get('SHARDS_DIR') else 1),
+    queue_size=app.config.get('ADMISSION_QUEUE_SIZE', 32),
+    queue_timeout=app.config.get('ADMISSION_QUEUE_TIMEOUT', 2.0)
+  )
+  retry_after = str(app.config.get('ADMISSION_RETRY_AFTER', 1))
+
+  @app.before_request
+  def admit_request():
+    # Requests dispatched inside an admitted request (POST /batch) share its slot
+    if is_exempt(request) or 'admission_lane' in g:
+      return None
+
+    lane, priority = classify_request(request)
+    try:
+      controller.acquire(lane, priority)
+    except Overloaded as e:
+      response = jsonify({"error": "Server is busy, try again shortly", "reason": e.reason})
+      response.status_code = 503
+      response.headers['Retry-After'] = retry_after
+      return response
+
+    g.admission_lane = lane
+    request.environ['admission.lane'] = lane
+    return None
+
+  @app.teardown_request
+  def release_request(exception):
+    lane = request.environ.pop('admission.lane', None)
+    if lane is not None:
+      g.pop('admission_lane', None)
+      controller.release(lane)
+
+  return controller
@@ -0,0 +1,91 @@
+# Time-partitioned storage for review items. word_review_items only holds
+# recent reviews; older months are moved into word_review_items_YYYY_MM
+# tables, and the word_review_items_history view unions them back together.
+
+PARTITION_PREFIX = 'word_review_items_'
+PARTITION_GLOB = 'word_review_items_[0-9][0-9][0-9][0-9]_[0-9][0-9]'
+
+CREATE_PARTITION = '''
+  CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY,
+    word_id INTEGER NOT NULL,
+    study_session_id INTEGER NOT NULL,
+    correct BOOLEAN NOT NULL,
+    created_at DATETIME
+  )
+'''
+
+CREATE_PARTITION_INDEX = '''
+  CREATE INDEX IF NOT EXISTS idx_{name}_study_session_id ON {name} (study_session_id)
+'''
+
+# Covers the per-word timeline (GET /words/<id>/history)
+CREATE_PARTITION_WORD_INDEX = '''
+  CREATE INDEX IF NOT EXISTS idx_{name}_word_id_created_at ON {name} (word_id, created_at, correct)
+'''
+
+HISTORY_SELECT = 'SELECT id, word_id, study_session_id, correct, created_at FROM {name}'
+
+def review_partitions(cursor):
+  cursor.execute('''
+    SELECT name FROM sqlite_master
+    WHERE type = 'table' AND name GLOB ?
+    ORDER BY name
+  ''', (PARTITION_GLOB,))
+  return [row[0] for row in cursor.fetchall()]
+
+def rebuild_history_view(cursor, partitions):
+  selects = [HISTORY_SELECT.format(name=name) for name in ['word_review_items'] + partitions]
+  cursor.execute('DROP VIEW IF EXISTS word_review_items_history')
+  cursor.execute('CREATE VIEW word_review_items_history AS ' + ' UNION ALL '.join(selects))
+
+def archive_reviews(connection, keep_months=1):
+  """Move review items older than the last `keep_months` months into
+  monthly partitions.
+
+  The per-word and per-session rollups are updated as reviews are written,
+  so archived rows are already folded in and only need to be moved.
+  Returns a dict of partition name to number of rows moved.
+  """
+  cursor = connection.cursor()
+  cursor.execute('BEGIN IMMEDIATE')
+  try:
+    cursor.execute("SELECT date('now', 'start of month', ?)", (f'-{max(keep_months, 1) - 1} months',))
+    cutoff = cursor.fetchone()[0]
+
+    cursor.execute('''
+      SELECT DISTINCT strftime('%Y_%m', created_at) FROM word_review_items
+      WHERE created_at < ?
+    ''', (cutoff,))
+    months = [row[0] for row in cursor.fetchall()]
+
+    moved = {}
+    for month in months:
+      name = PARTITION_PREFIX + month
+      cursor.execute(CREATE_PARTITION.format(name=name))
+      cursor.execute(CREATE_PARTITION_INDEX.format(name=name))
+      cursor.execute(f'''
+        INSERT INTO {name} (id, word_id, study_session_id, correct, created_at)
+        SELECT id, word_id, study_session_id, correct, created_at
+        FROM word_review_items
+        WHERE created_at < ? AND strftime('%Y_%m', created_at) = ?
+      ''', (cutoff, month))
+      moved[name] = cursor.rowcount
+
+    cursor.execute('DELETE FROM word_review_items WHERE created_at < ?', (cutoff,))
+    partitions = review_partitions(cursor)
+    # Partitions archived before the word index existed get it here
+    for name in partitions:
+      cursor.execute(CREATE_PARTITION_WORD_INDEX.format(name=name))
+    rebuild_history_view(cursor, partitions)
+    connection.commit()
+    return moved
+  except Exception:
+    connection.rollback()
+    raise
+
+def drop_review_partitions(cursor):
+  """Drop every archived partition instead of deleting their rows."""
+  for name in review_partitions(cursor):
+    cursor.execute(f'DROP TABLE {name}')
+  rebuild_history_view(cursor, [])
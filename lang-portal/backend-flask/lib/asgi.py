@@ -0,0 +1,165 @@
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Request bodies larger than this are spooled to disk
+MAX_BODY_IN_MEMORY = 1024 * 1024
+
+def build_environ(scope, body):
+  """The WSGI environ of an ASGI http scope (PEP 3333 string rules)."""
+  path = scope['path']
+  root_path = scope.get('root_path', '')
+  if root_path and path.startswith(root_path):
+    path = path[len(root_path):]
+  server = scope.get('server') or ('localhost', 80)
+  environ = {
+    'REQUEST_METHOD': scope['method'],
+    'SCRIPT_NAME': root_path.encode('utf8').decode('latin1'),
+    'PATH_INFO': path.encode('utf8').decode('latin1'),
+    'QUERY_STRING': scope['query_string'].decode('ascii'),
+    'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+    'SERVER_NAME': server[0],
+    'SERVER_PORT': str(server[1] or 0),
+    'wsgi.version': (1, 0),
+    'wsgi.url_scheme': scope.get('scheme', 'http'),
+    'wsgi.input': body,
+    'wsgi.errors': sys.stderr,
+    'wsgi.multithread': True,
+    'wsgi.multiprocess': True,
+    'wsgi.run_once': False,
+  }
+  if scope.get('client'):
+    environ['REMOTE_ADDR'] = scope['client'][0]
+    environ['REMOTE_PORT'] = str(scope['client'][1])
+  for name, value in scope.get('headers', ()):
+    name = name.decode('latin1')
+    value = value.decode('latin1')
+    if name == 'content-length':
+      key = 'CONTENT_LENGTH'
+    elif name == 'content-type':
+      key = 'CONTENT_TYPE'
+    else:
+      key = 'HTTP_' + name.upper().replace('-', '_')
+    environ[key] = f'{environ[key]},{value}' if key in environ else value
+  return environ
+
+def close_iterable(iterable):
+  close = getattr(iterable, 'close', None)
+  if close is not None:
+    close()
+
+class OffloadedWsgiToAsgi:
+  """Serve a WSGI app over ASGI with requests offloaded to a thread pool.
+
+  The event loop holds idle and slow connections without a thread each,
+  and at most `threads` requests run the Flask app (and so SQLite) at once.
+
+  A response without a Content-Length (server-sent events, exports) is
+  streamed: the pool only runs the view, and the body is read on the
+  separate `stream_threads` pool, one chunk at a time. The stream ends
+  when the client disconnects, so abandoned viewers cannot hold threads
+  of either pool for longer than it takes to produce their next chunk.
+  """
+
+  def __init__(self, wsgi_application, threads=16, stream_threads=64):
+    self.wsgi_application = wsgi_application
+    self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+    self.stream_executor = ThreadPoolExecutor(max_workers=stream_threads, thread_name_prefix='wsgi-stream')
+
+  async def __call__(self, scope, receive, send):
+    if scope['type'] == 'lifespan':
+      # Nothing to set up, acknowledge startup and shutdown
+      while True:
+        message = await receive()
+        await send({'type': message['type'] + '.complete'})
+        if message['type'] == 'lifespan.shutdown':
+          return
+    if scope['type'] != 'http':
+      raise ValueError(f"Unsupported ASGI scope type {scope['type']}")
+
+    body = tempfile.SpooledTemporaryFile(max_size=MAX_BODY_IN_MEMORY)
+    try:
+      while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+          return
+        body.write(message.get('body', b''))
+        if not message.get('more_body', False):
+          break
+      body.seek(0)
+
+      loop = asyncio.get_running_loop()
+      status, headers, chunks, stream = await loop.run_in_executor(
+        self.executor, self.run_wsgi_app, build_environ(scope, body)
+      )
+      if stream is not None:
+        await self.send_stream(status, headers, stream, receive, send)
+        return
+      await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+      for chunk in chunks:
+        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+      await send({'type': 'http.response.body'})
+    finally:
+      body.close()
+
+  def run_wsgi_app(self, environ):
+    """Call the app on the request pool. Returns the status, headers and
+    either the whole body or, for streamed responses, the unread iterator."""
+    response = {}
+
+    def start_response(status, response_headers, exc_info=None):
+      if exc_info and response:
+        raise exc_info[1].with_traceback(exc_info[2])
+      response['status'] = int(status.split(' ', 1)[0])
+      response['headers'] = [
+        (name.lower().encode('ascii'), value.encode('latin1')) for name, value in response_headers
+      ]
+      return lambda data: response.setdefault('written', []).append(data)
+
+    iterable = self.wsgi_application(environ, start_response)
+    streamed = not isinstance(iterable, (list, tuple)) and not any(
+      name == b'content-length' for name, _ in response.get('headers', ())
+    )
+    if streamed and 'status' in response:
+      return response['status'], response['headers'], None, iterable
+    try:
+      chunks = response.get('written', []) + [chunk for chunk in iterable if chunk]
+    finally:
+      close_iterable(iterable)
+    return response['status'], response['headers'], chunks, None
+
+  async def send_stream(self, status, headers, stream, receive, send):
+    """Send chunks until the iterator ends or the client disconnects."""
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    pending = None
+    try:
+      await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+      iterator = iter(stream)
+      while True:
+        pending = self.stream_executor.submit(next, iterator, None)
+        chunk = asyncio.wrap_future(pending)
+        await asyncio.wait({chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+        if disconnected.done():
+          return
+        data = chunk.result()
+        if data is None:
+          break
+        if data:
+          await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+      await send({'type': 'http.response.body'})
+    finally:
+      disconnected.cancel()
+      # A generator cannot be closed while a thread is still inside it, so
+      # close it once the pending chunk is produced. The callback runs on
+      # the stream thread, so it does not depend on the event loop.
+      if pending is not None:
+        pending.add_done_callback(lambda _: self.stream_executor.submit(close_iterable, stream))
+      else:
+        self.stream_executor.submit(close_iterable, stream)
+
+async def wait_for_disconnect(receive):
+  while True:
+    message = await receive()
+    if message['type'] == 'http.disconnect':
+      return
@@ -0,0 +1,181 @@
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from lib.db import list_shards
+
+# The part of a snapshot filename after the database name
+SNAPSHOT_SUFFIX = re.compile(r'\d{8}-\d{6}\.db\.gz')
+
+class BackupJob(threading.Thread):
+  """Copy a live database into a compressed snapshot in the background.
+
+  The copy goes through the sqlite3 online backup API `pages` pages at a
+  time, sleeping `step_sleep` seconds between steps, and reports its page
+  progress. The source is switched to WAL and the copy runs inside one read
+  transaction on it: writers keep committing while it runs, and their
+  commits cannot restart it because every step reads the same snapshot.
+  Snapshots are written as <name>-<timestamp>.db.gz and only the newest
+  `keep` snapshots are retained. Temporary files are removed when the
+  backup fails.
+
+  `shards` maps learner ids to their shard files (see lib/db.list_shards),
+  which are snapshotted the same way into <directory>/shards.
+  """
+
+  def __init__(self, database, directory, keep=7, shards=None, pages=64, step_sleep=0.01):
+    super().__init__(daemon=True)
+    self.database = database
+    self.directory = directory
+    self.keep = keep
+    self.pages = pages
+    self.step_sleep = step_sleep
+    self.shards = dict(shards or {})
+
+    self.stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+    self.filename = snapshot_filename(database, self.stamp)
+
+    self.state = 'pending'
+    self.size = None
+    # Snapshot being written and its page progress, DATABASE first, then
+    # each shard
+    self.copying = None
+    self.pages_total = None
+    self.pages_remaining = None
+    self.shards_copied = 0
+    self.error = None
+    self.started_at = None
+    self.finished_at = None
+
+  def _progress(self, status, remaining, total):
+    self.pages_remaining = remaining
+    self.pages_total = total
+    # Give the request threads the GIL and the disk between steps
+    time.sleep(self.step_sleep)
+
+  def run(self):
+    self.state = 'running'
+    self.started_at = datetime.utcnow().isoformat()
+    errors = []
+    try:
+      self.size = self.snapshot(self.database, self.directory)
+    except Exception as e:
+      errors.append(str(e))
+    # A failing shard does not stop the others
+    for learner, path in self.shards.items():
+      try:
+        self.snapshot(path, os.path.join(self.directory, 'shards'))
+        self.shards_copied += 1
+      except Exception as e:
+        errors.append(f'{learner}: {e}')
+    if errors:
+      self.error = '; '.join(errors)
+      self.state = 'failed'
+    else:
+      self.state = 'completed'
+    self.finished_at = datetime.utcnow().isoformat()
+
+  def snapshot(self, database, directory):
+    """Write one snapshot of `database` into `directory`. Returns its size."""
+    filename = snapshot_filename(database, self.stamp)
+    path = os.path.join(directory, filename)
+    raw_path = path[:-len('.gz')] + '.tmp'
+    tmp_path = path + '.tmp'
+    self.copying = filename
+    self.pages_total = None
+    self.pages_remaining = None
+    try:
+      os.makedirs(directory, exist_ok=True)
+      # file: URIs name shared in-memory databases (see lib/fixtures.py)
+      source = sqlite3.connect(database, uri=database.startswith('file:'))
+      target = sqlite3.connect(raw_path)
+      try:
+        # Readers never block WAL writers, so the snapshot can be held open
+        # for the whole copy (in-memory databases report 'memory' instead).
+        # BEGIN is deferred, the first read fixes the snapshot every step
+        # copies from.
+        source.execute('PRAGMA journal_mode=WAL')
+        source.execute('BEGIN')
+        source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        source.backup(target, pages=self.pages, progress=self._progress)
+      finally:
+        target.close()
+        source.close()
+
+      # Compress the copy, then move it into place so a snapshot on disk is
+      # always complete
+      self.state = 'compressing'
+      with open(raw_path, 'rb') as raw, gzip.open(tmp_path, 'wb') as compressed:
+        shutil.copyfileobj(raw, compressed)
+      os.replace(tmp_path, path)
+    finally:
+      for leftover in (raw_path, tmp_path):
+        if os.path.exists(leftover):
+          os.remove(leftover)
+      self.state = 'running'
+
+    prefix = filename[:-len(self.stamp) - len('.db.gz')]
+    for old in list_snapshots(directory, prefix)[self.keep:]:
+      os.remove(os.path.join(directory, old))
+    return os.path.getsize(path)
+
+  def status(self):
+    copied = None
+    if self.pages_total:
+      copied = self.pages_total - self.pages_remaining
+    return {
+      'state': self.state,
+      'snapshot': self.filename,
+      'copying': self.copying,
+      'pages_copied': copied,
+      'pages_total': self.pages_total,
+      'size': self.size,
+      'shards_copied': self.shards_copied,
+      'shards_total': len(self.shards),
+      'error': self.error,
+      'started_at': self.started_at,
+      'finished_at': self.finished_at
+    }
+
+def snapshot_filename(database, stamp):
+  if database.startswith('file:'):
+    # file:words.db?mode=ro names words.db
+    database = database[len('file:'):].split('?', 1)[0]
+  name = os.path.splitext(os.path.basename(database))[0]
+  return f'{name}-{stamp}.db.gz'
+
+def list_snapshots(directory, prefix=''):
+  """Snapshot filenames in `directory`, newest first. With a `prefix`
+  (`words-`), only that database's snapshots, not those of a learner
+  named `words-2`."""
+  if not os.path.isdir(directory):
+    return []
+  if prefix:
+    snapshots = (f for f in os.listdir(directory) if f.startswith(prefix) and SNAPSHOT_SUFFIX.fullmatch(f[len(prefix):]))
+  else:
+    snapshots = (f for f in os.listdir(directory) if f.endswith('.db.gz'))
+  return sorted(snapshots, reverse=True)
+
+class BackupManager:
+  """Runs at most one backup job at a time and remembers the last one."""
+
+  def __init__(self, database, directory, keep=7, shards_dir=None):
+    self.database = database
+    self.directory = directory
+    self.keep = keep
+    self.shards_dir = shards_dir
+    self._lock = threading.Lock()
+    self.job = None
+
+  def start(self):
+    with self._lock:
+      if self.job is not None and self.job.is_alive():
+        return None
+      self.job = BackupJob(self.database, self.directory, keep=self.keep, shards=list_shards(self.shards_dir))
+      self.job.start()
+      return self.job
@@ -0,0 +1,53 @@
+import gzip
+
+from flask import request
+
+try:
+  import brotli
+except ImportError:  # brotli is optional, gzip is always available
+  brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/csv')
+
+def choose_encoding(accept_encodings):
+  """Pick the best encoding the client accepts, preferring brotli."""
+  if brotli is not None and accept_encodings['br']:
+    return 'br'
+  if accept_encodings['gzip']:
+    return 'gzip'
+  return None
+
+def init_compression(app):
+  """Compress responses above COMPRESS_MIN_SIZE bytes when the client
+  accepts gzip or brotli.
+
+  Streamed responses (event streams, exports) are left alone, they handle
+  their own encoding.
+  """
+  min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+  level = app.config.get('COMPRESS_LEVEL', 6)
+
+  @app.after_request
+  def compress_response(response):
+    if (response.direct_passthrough
+        or response.is_streamed
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or 'Content-Encoding' in response.headers
+        or not 200 <= response.status_code < 300):
+      return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < min_size:
+      return response
+
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding == 'br':
+      response.set_data(brotli.compress(data, quality=min(level, 11)))
+    elif encoding == 'gzip':
+      response.set_data(gzip.compress(data, compresslevel=level))
+    else:
+      return response
+
+    response.headers['Content-Encoding'] = encoding
+    return response
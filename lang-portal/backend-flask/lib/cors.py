@@ -0,0 +1,132 @@
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from flask import request
+from flask_cors.core import FLASK_CORS_EVALUATED, get_cors_options, set_cors_headers
+
+from lib.queries import queries, TimedCursor
+
+GET_ACTIVITIES_VERSION = queries.register('cors.activities_version', '''
+  SELECT version FROM table_versions WHERE table_name = 'study_activities'
+''')
+
+GET_ACTIVITY_URLS = queries.register('cors.activity_urls', '''
+  SELECT url FROM study_activities
+''')
+
+def url_origin(url):
+  """https://example.com/app -> https://example.com, None for relative urls."""
+  parsed = urlparse(url)
+  if not parsed.scheme or not parsed.netloc:
+    return None
+  return f'{parsed.scheme}://{parsed.netloc}'
+
+class ActivityOrigins:
+  """The origins of the study activity urls, reloaded when they change.
+
+  Triggers count the writes to study_activities in table_versions. The
+  count is checked at most every `ttl` seconds, and only for requests
+  that carry an Origin header; the urls are read again only when it
+  moved. Until the tables exist (before invoke init-db) only the `extra`
+  origins are allowed.
+  """
+
+  def __init__(self, db, extra=(), ttl=1.0, logger=None):
+    self.db = db
+    self.extra = list(extra)
+    self.ttl = ttl
+    self.logger = logger
+    self.version = None
+    self.origins = self.extra or ['*']
+    self.checked_at = None
+    self.error = None
+    self._lock = threading.Lock()
+
+  def current(self):
+    now = time.monotonic()
+    if self.checked_at is not None and now - self.checked_at < self.ttl:
+      return self.origins
+    with self._lock:
+      if self.checked_at is None or now - self.checked_at >= self.ttl:
+        self.refresh()
+        self.checked_at = now
+    return self.origins
+
+  def refresh(self):
+    cursor = self.db.main_connection().cursor(TimedCursor)
+    try:
+      cursor.execute(GET_ACTIVITIES_VERSION)
+      row = cursor.fetchone()
+      version = row[0] if row else 0
+      if version == self.version:
+        return
+      cursor.execute(GET_ACTIVITY_URLS)
+      origins = {url_origin(row[0]) for row in cursor.fetchall()}
+      origins.discard(None)
+    except sqlite3.Error as e:
+      # Warn once per distinct error, not on every check
+      if self.logger and str(e) != self.error:
+        self.logger.warning(f'Could not load CORS origins, keeping {self.origins}: {e}')
+      self.error = str(e)
+      return
+    finally:
+      cursor.close()
+    self.origins = (sorted(origins) + self.extra) or ['*']
+    self.version = version
+    self.error = None
+
+def as_origin_list(value):
+  """Origins from a list or a comma separated string (FLASK_CORS_* variables)."""
+  if not value:
+    return []
+  if isinstance(value, str):
+    return [origin.strip() for origin in value.split(',') if origin.strip()]
+  return list(value)
+
+def init_cors(app, **options):
+  """Set up the CORS headers of every response.
+
+  Without CORS_ORIGINS or CORS_EXTRA_ORIGINS configured every origin is
+  allowed, and None is returned. Otherwise the configured origins and
+  the study activity origins are allowed, and the ActivityOrigins is
+  returned.
+
+  The @cross_origin() views read CORS_ORIGINS from the app config on each
+  request, which is kept up to date here. Responses that did not go
+  through a view (404s, 503s from admission control) get the same
+  headers from an after_request hook.
+  """
+  @app.after_request
+  def add_cors_headers(response):
+    if not getattr(response, FLASK_CORS_EVALUATED, False):
+      set_cors_headers(response, get_cors_options(app, options))
+    return response
+
+  # Origins of other clients, e.g. the portal frontend
+  extra = as_origin_list(app.config.get('CORS_ORIGINS')) + as_origin_list(app.config.get('CORS_EXTRA_ORIGINS'))
+  if not extra or '*' in extra:
+    app.config['CORS_ORIGINS'] = '*'
+    return None
+
+  # In development, add the study activity and frontend dev servers
+  if app.debug:
+    extra += [
+      'http://localhost:8080', 'http://127.0.0.1:8080',
+      'http://localhost:5173', 'http://127.0.0.1:5173'
+    ]
+  origins = ActivityOrigins(
+    app.db,
+    extra=extra,
+    ttl=app.config.get('CORS_ORIGINS_TTL', 1.0),
+    logger=app.logger
+  )
+  app.config['CORS_ORIGINS'] = origins.origins
+
+  @app.before_request
+  def load_cors_origins():
+    if request.headers.get('Origin'):
+      app.config['CORS_ORIGINS'] = origins.current()
+
+  return origins
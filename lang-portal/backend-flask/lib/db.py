@@ -1,35 +1,230 @@
+import os
+import re
 import sqlite3
 import json
-from flask import g
+import threading
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import quote
+from flask import g, request, has_request_context, jsonify
+
+from lib.queries import queries, TimedCursor
+
+# Header naming the learner whose shard a request reads and writes
+LEARNER_HEADER = 'X-Learner-Id'
+LEARNER_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+DEFAULT_LEARNER = 'default'
+
+# Prepared statements kept per connection; the list endpoints alone have a
+# few dozen sort variants (see lib/queries.py)
+STATEMENT_CACHE_SIZE = 256
+
+# Setup files for a learner shard: study sessions, reviews and everything
+# derived from them. Vocabulary tables stay in the shared database.
+SHARD_SETUP = (
+  'setup/create_table_word_reviews.sql',
+  'setup/create_table_word_review_items.sql',
+  'setup/create_table_study_sessions.sql',
+  'setup/create_index_study_sessions_created_at.sql',
+  'setup/create_table_study_session_stats.sql',
+  'setup/create_table_study_session_reports.sql',
+  'setup/create_index_word_review_items_study_session_id.sql',
+  'setup/create_index_word_review_items_word_id_created_at.sql',
+  'setup/create_view_word_review_items_history.sql',
+  'setup/create_index_word_reviews_word_id.sql',
+  'setup/create_index_word_reviews_error_rate.sql',
+  'setup/create_table_change_log.sql',
+  'setup/create_table_group_stats.sql',
+  'setup/create_table_group_activity_stats.sql',
+  'setup/create_table_review_rollups_hourly.sql',
+  'setup/create_table_review_rollups_daily.sql',
+  'setup/create_table_review_rollups_group_hourly.sql',
+  'setup/create_table_review_rollups_group_daily.sql',
+)
+SHARD_SETUP_SCRIPTS = (
+  'setup/create_indexes_review_rollups.sql',
+  'setup/create_triggers_change_log_reviews.sql',
+)
+
+def list_shards(shards_dir):
+  """Learner id -> shard path for every learner shard in `shards_dir`."""
+  if not shards_dir or not os.path.isdir(shards_dir):
+    return {}
+  shards = {}
+  for filename in sorted(os.listdir(shards_dir)):
+    learner, extension = os.path.splitext(filename)
+    if extension == '.db' and LEARNER_PATTERN.fullmatch(learner):
+      shards[learner] = os.path.join(shards_dir, filename)
+  return shards
+
+def learner_route(create=False):
+  """Mark a view that reads or writes the learner's sessions and reviews.
+
+  With SHARDS_DIR set, a learner's shard is only created by `create` views
+  (starting a session). The other marked views answer 404 for learners
+  without a shard, and unmarked views (the vocabulary) read DATABASE for
+  them, so unknown learner ids cannot fill the disk. The default learner's
+  shard is created on first use.
+  """
+  def decorate(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+      from flask import current_app
+      db = current_app.db
+      learner = db.learner()
+      if learner is not None and not create and not db.shard_exists(learner):
+        return jsonify({"error": "Learner not found", "learner": learner}), 404
+      g.learner_route = 'create' if create else 'read'
+      try:
+        return view(*args, **kwargs)
+      finally:
+        g.pop('learner_route', None)
+    return wrapper
+  return decorate
 
 class Db:
-  def __init__(self, database='words.db'):
+  def __init__(self, database='words.db', shards_dir=None, shard_cache_size=16):
     self.database = database
     self.connection = None
+    # With shards_dir set, each learner gets <shards_dir>/<learner>.db with
+    # the shared database attached as `vocab`
+    self.shards_dir = shards_dir
+    self.shard_cache_size = shard_cache_size
+    self._shards = threading.local()
+
+  def connect(self, learner=None):
+    if learner is not None:
+      return self.connect_shard(learner)
+    # file: URIs name shared in-memory databases (see lib/fixtures.py)
+    connection = sqlite3.connect(
+      self.database,
+      uri=self.database.startswith('file:'),
+      cached_statements=STATEMENT_CACHE_SIZE
+    )
+    connection.row_factory = sqlite3.Row  # Return rows as dictionaries
+    connection.execute('PRAGMA foreign_keys = ON')  # Enforce declared foreign keys
+    # Readers (backups, /batch snapshots) never block writers in WAL mode.
+    # The mode is stored in the file, so this only converts it once.
+    connection.execute('PRAGMA journal_mode = WAL')
+    return connection
+
+  def connect_shard(self, learner):
+    """Open a learner's shard, creating its tables on first use.
+
+    Unqualified table names resolve to the shard first and then to the
+    attached vocabulary database, so queries run unchanged. Foreign keys
+    cannot span database files and are left off on shard connections.
+    """
+    os.makedirs(self.shards_dir, exist_ok=True)
+    path = os.path.abspath(self.shard_path(learner))
+    connection = sqlite3.connect('file:' + quote(path), uri=True, cached_statements=STATEMENT_CACHE_SIZE)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA journal_mode = WAL')
+    vocab = self.database if self.database.startswith('file:') else 'file:' + quote(os.path.abspath(self.database))
+    connection.execute('ATTACH DATABASE ? AS vocab', (vocab,))
+    self.setup_shard_tables(connection.cursor())
+    return connection
+
+  def learner(self):
+    """The learner of the current request, or None without sharding."""
+    if self.shards_dir is None or not has_request_context():
+      return None
+    return request.headers.get(LEARNER_HEADER) or DEFAULT_LEARNER
+
+  def shard_path(self, learner):
+    return os.path.join(self.shards_dir, f'{learner}.db')
+
+  def shard_exists(self, learner):
+    if learner == DEFAULT_LEARNER:
+      return True
+    shards = getattr(self._shards, 'connections', None)
+    return (shards is not None and learner in shards) or os.path.exists(self.shard_path(learner))
+
+  def shard_paths(self):
+    """Learner id -> path of every existing shard, for maintenance jobs."""
+    return list_shards(self.shards_dir)
+
+  def shard_connection(self, learner):
+    # Each thread keeps its most recently used shard connections open
+    shards = getattr(self._shards, 'connections', None)
+    if shards is None:
+      shards = self._shards.connections = OrderedDict()
+    connection = shards.pop(learner, None)
+    if connection is None:
+      connection = self.connect_shard(learner)
+      while len(shards) >= self.shard_cache_size:
+        _, evicted = shards.popitem(last=False)
+        evicted.close()
+    shards[learner] = connection
+    return connection
+
+  def main_connection(self):
+    # Each thread keeps one connection to the shared database open, so the
+    # statements it has prepared are reused by the next request
+    connection = getattr(self._shards, 'main', None)
+    if connection is None:
+      connection = self._shards.main = self.connect()
+    return connection
 
   def get(self):
     if 'db' not in g:
-      g.db = sqlite3.connect(self.database)
-      g.db.row_factory = sqlite3.Row  # Return rows as dictionaries
+      self.open(self.shard_learner())
     return g.db
 
+  def open(self, learner):
+    # The learner's shard, or DATABASE for None, as the request's connection
+    if learner is None:
+      g.db = self.main_connection()
+    else:
+      g.db = self.shard_connection(learner)
+    g.db_cached = True
+
+  def shard_learner(self):
+    # Views marked with learner_route use the learner's shard; any other
+    # view only uses one that already exists (see learner_route)
+    learner = self.learner()
+    if learner is None:
+      return None
+    if g.get('learner_route') == 'create' or self.shard_exists(learner):
+      return learner
+    return None
+
   def commit(self):
     self.get().commit()
 
   def cursor(self):
     # Ensure the connection is valid before getting a cursor
     connection = self.get()
-    return connection.cursor()
+    return connection.cursor(TimedCursor)
 
   def close(self):
+    # A pinned connection is shared by several dispatches (see routes/batch.py)
+    # and is only closed once it is unpinned
+    if g.get('db_pinned'):
+      return
     db = g.pop('db', None)
     if db is not None:
-      db.close()
+      if g.pop('db_cached', False):
+        # Cached connections stay open for the next request
+        if db.in_transaction:
+          db.rollback()
+      else:
+        db.close()
+
+  def pin(self, learner):
+    """Open the connection of `learner` (None for DATABASE) as the
+    request's connection and keep it open across Db.close calls."""
+    self.close()
+    self.open(learner)
+    g.db_pinned = True
+    return g.db
+
+  def unpin(self):
+    g.pop('db_pinned', None)
 
-  # Function to load SQL from a file
+  # Function to load SQL from a file, read once per process
   def sql(self, filepath):
-    with open('sql/' + filepath, 'r') as file:
-      return file.read()
+    return queries.file(filepath)
 
   # Function to load the words from a JSON file
   def load_json(self, filepath):
@@ -56,9 +251,90 @@ class Db:
     cursor.execute(self.sql('setup/create_table_study_activities.sql'))
     self.get().commit()
 
+    cursor.execute(self.sql('setup/create_table_table_versions.sql'))
+    self.get().commit()
+
+    cursor.executescript(self.sql('setup/create_triggers_table_versions.sql'))
+    self.get().commit()
+
     cursor.execute(self.sql('setup/create_table_study_sessions.sql'))
     self.get().commit()
 
+    cursor.execute(self.sql('setup/create_index_study_sessions_created_at.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_table_study_session_stats.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_table_study_session_reports.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_index_word_review_items_study_session_id.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_index_word_review_items_word_id_created_at.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_view_word_review_items_history.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_table_word_parts.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_index_word_parts_kanji.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_index_word_groups_group_id.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_index_word_groups_word_id.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_index_word_reviews_word_id.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_index_word_reviews_error_rate.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_table_change_log.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_table_group_stats.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_table_group_activity_stats.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_table_review_rollups_hourly.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_table_review_rollups_daily.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_table_review_rollups_group_hourly.sql'))
+    self.get().commit()
+
+    cursor.execute(self.sql('setup/create_table_review_rollups_group_daily.sql'))
+    self.get().commit()
+
+    cursor.executescript(self.sql('setup/create_indexes_review_rollups.sql'))
+    self.get().commit()
+
+    # The trigger file holds several statements
+    cursor.executescript(self.sql('setup/create_triggers_change_log.sql'))
+    self.get().commit()
+
+    cursor.executescript(self.sql('setup/create_triggers_change_log_reviews.sql'))
+    self.get().commit()
+
+  def setup_shard_tables(self,cursor):
+    # Create the per-learner tables in a shard (see SHARD_SETUP)
+    for filepath in SHARD_SETUP:
+      cursor.execute(self.sql(filepath))
+    for filepath in SHARD_SETUP_SCRIPTS:
+      cursor.executescript(self.sql(filepath))
+    cursor.connection.commit()
+
   def import_study_activities_json(self,cursor,data_json_path):
     study_actvities = self.load_json(data_json_path)
     for activity in study_actvities:
@@ -67,6 +343,44 @@ class Db:
       ''', (activity['name'],activity['url'],activity['preview_url'],))
     self.get().commit()
 
+  def import_word_parts(self,cursor,word_id,parts):
+    # Normalize the parts of a word into the word_parts table so they can be
+    # queried by kanji without parsing words.parts
+    cursor.executemany('''
+      INSERT INTO word_parts (word_id, position, kanji, romaji) VALUES (?, ?, ?, ?)
+    ''', [
+      (word_id, position, part['kanji'], json.dumps(part['romaji']))
+      for position, part in enumerate(parts)
+    ])
+
+  def backfill_word_parts(self,cursor):
+    # Populate word_parts for words imported before the table existed
+    cursor.execute('''
+      SELECT id, parts FROM words
+      WHERE NOT EXISTS (SELECT 1 FROM word_parts wp WHERE wp.word_id = words.id)
+    ''')
+    words = cursor.fetchall()
+    for word in words:
+      self.import_word_parts(cursor, word['id'], json.loads(word['parts']))
+    self.get().commit()
+    return len(words)
+
+  def backfill_change_log(self,cursor):
+    # Log the rows of a database that predates change_log so a full sync
+    # (since=0) still returns everything
+    cursor.execute('SELECT COUNT(*) FROM change_log')
+    if cursor.fetchone()[0] > 0:
+      return 0
+    count = 0
+    for table in ('words', 'groups', 'study_sessions', 'word_review_items'):
+      cursor.execute(f'''
+        INSERT INTO change_log (table_name, row_id, operation)
+        SELECT '{table}', id, 'upsert' FROM {table} ORDER BY id
+      ''')
+      count += cursor.rowcount
+    self.get().commit()
+    return count
+
   def import_word_json(self,cursor,group_name,data_json_path):
       # Insert a new group
       cursor.execute('''
@@ -90,6 +404,9 @@ class Db:
         # Get the last inserted word's ID
         word_id = cursor.lastrowid
 
+        # Insert the normalized parts of the word
+        self.import_word_parts(cursor, word_id, word['parts'])
+
         # Insert the word-group relationship into word_groups table
         cursor.execute('''
           INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)
@@ -0,0 +1,123 @@
+import bisect
+import threading
+from array import array
+
+from lib.queries import queries
+
+LOAD_SESSIONS = queries.register('membership.load_sessions', '''
+    SELECT id, group_id FROM study_sessions
+''')
+
+LOAD_GROUP_WORDS = queries.register('membership.load_group_words', '''
+    SELECT group_id, word_id
+    FROM word_groups
+    ORDER BY group_id, word_id
+''')
+
+VALIDATE_SESSION = queries.register('membership.validate_session', '''
+    SELECT ss.id, ss.group_id 
+    FROM study_sessions ss 
+    WHERE ss.id = ?
+''')
+
+VALIDATE_WORD = queries.register('membership.validate_word', '''
+    SELECT w.id 
+    FROM words w 
+    JOIN word_groups wg ON w.id = wg.word_id 
+    WHERE w.id = ? AND wg.group_id = ?
+''')
+
+class MembershipIndex:
+  """In-process index used to validate review writes without a query.
+
+  Keeps the group of every study session, keyed by learner when the
+  database is sharded, and, per group, a sorted array of its word ids. The index is built from the database on first use and kept
+  current by the session write paths. Lookups that miss fall back to the
+  database and cache positive results, so sessions created by another
+  worker process or words imported while the app is running are picked up.
+  Entries deleted elsewhere go stale; the review insert checks the session
+  again and drops the entry when it is gone (see drop_session).
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._loaded = False
+    self._session_groups = {}
+    self._group_words = {}
+
+  def load(self, cursor, learner=None):
+    # Other learners' sessions are looked up and cached on first use
+    session_groups = {}
+    cursor.execute(LOAD_SESSIONS)
+    for session in cursor.fetchall():
+      session_groups[(learner, session['id'])] = session['group_id']
+
+    group_words = {}
+    cursor.execute(LOAD_GROUP_WORDS)
+    for row in cursor.fetchall():
+      group_words.setdefault(row['group_id'], array('q')).append(row['word_id'])
+
+    with self._lock:
+      self._session_groups = session_groups
+      self._group_words = group_words
+      self._loaded = True
+
+  def ensure_loaded(self, cursor, learner=None):
+    if not self._loaded:
+      self.load(cursor, learner)
+
+  def session_group(self, cursor, session_id, learner=None):
+    """Return the group id of a study session, or None if it does not exist."""
+    self.ensure_loaded(cursor, learner)
+    group_id = self._session_groups.get((learner, session_id))
+    if group_id is None:
+      cursor.execute(VALIDATE_SESSION, (session_id,))
+      session = cursor.fetchone()
+      if session:
+        group_id = session['group_id']
+        self._session_groups[(learner, session_id)] = group_id
+    return group_id
+
+  def group_has_word(self, cursor, group_id, word_id):
+    """Return True if the word belongs to the group."""
+    self.ensure_loaded(cursor)
+    words = self._group_words.get(group_id)
+    if words is not None:
+      position = bisect.bisect_left(words, word_id)
+      if position < len(words) and words[position] == word_id:
+        return True
+
+    cursor.execute(VALIDATE_WORD, (word_id, group_id))
+    if not cursor.fetchone():
+      return False
+    self.add_group_word(group_id, word_id)
+    return True
+
+  def add_session(self, session_id, group_id, learner=None):
+    self._session_groups[(learner, session_id)] = group_id
+
+  def drop_session(self, session_id, learner=None):
+    """Forget a session, so the next lookup asks the database."""
+    with self._lock:
+      self._session_groups.pop((learner, session_id), None)
+
+  def clear_sessions(self, learner=None):
+    with self._lock:
+      self._session_groups = {
+        key: group_id for key, group_id in self._session_groups.items() if key[0] != learner
+      }
+
+  def add_group_word(self, group_id, word_id):
+    with self._lock:
+      words = self._group_words.setdefault(group_id, array('q'))
+      position = bisect.bisect_left(words, word_id)
+      if position == len(words) or words[position] != word_id:
+        words.insert(position, word_id)
+
+  def drop_group_word(self, group_id, word_id):
+    with self._lock:
+      words = self._group_words.get(group_id)
+      if words is not None:
+        position = bisect.bisect_left(words, word_id)
+        if position < len(words) and words[position] == word_id:
+          del words[position]
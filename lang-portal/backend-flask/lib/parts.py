@@ -0,0 +1,31 @@
+import json
+
+from lib.queries import queries
+
+# The ids are passed as one JSON array, so every page size runs the same
+# statement; the IN list still probes the (word_id, position) primary key
+LIST_WORD_PARTS = queries.register('parts.list', '''
+  SELECT word_id, kanji, romaji
+  FROM word_parts
+  WHERE word_id IN (SELECT value FROM json_each(?))
+  ORDER BY word_id, position
+''')
+
+def fetch_word_parts(cursor, word_ids):
+  """Load the normalized parts for a list of words.
+
+  Returns a dict mapping each word id to its ordered list of parts,
+  e.g. {1: [{"kanji": "払", "romaji": ["ha", "ra"]}, ...]}.
+  """
+  parts = {word_id: [] for word_id in word_ids}
+  if not parts:
+    return parts
+
+  cursor.execute(LIST_WORD_PARTS, (json.dumps(list(parts)),))
+
+  for part in cursor.fetchall():
+    parts[part['word_id']].append({
+      "kanji": part["kanji"],
+      "romaji": json.loads(part["romaji"])
+    })
+  return parts
@@ -0,0 +1,67 @@
+import threading
+from collections import deque
+
+class Subscription:
+  """A subscriber's bounded buffer of events.
+
+  When a slow subscriber falls more than `maxlen` events behind, the oldest
+  events are dropped and `dropped` is increased; events carry the running
+  counters so the client can recover without replaying them.
+  """
+
+  def __init__(self, broker, topic, maxlen):
+    self.broker = broker
+    self.topic = topic
+    self.events = deque(maxlen=maxlen)
+    self.dropped = 0
+    self.ready = threading.Condition()
+
+  def push(self, event):
+    with self.ready:
+      if len(self.events) == self.events.maxlen:
+        self.dropped += 1
+      self.events.append(event)
+      self.ready.notify()
+
+  def get(self, timeout):
+    """Wait up to `timeout` seconds for the next event, None on timeout."""
+    with self.ready:
+      if not self.events:
+        self.ready.wait(timeout)
+      return self.events.popleft() if self.events else None
+
+  def close(self):
+    self.broker.unsubscribe(self)
+
+class Broker:
+  """In-process publish/subscribe keyed by topic.
+
+  Publishing appends the same event to each subscriber's buffer, so a
+  single writer fans out to any number of viewers without touching the
+  database. Only subscribers in the same process see the events.
+  """
+
+  def __init__(self, buffer_size=100):
+    self.buffer_size = buffer_size
+    self._lock = threading.Lock()
+    self._subscriptions = {}
+
+  def subscribe(self, topic):
+    subscription = Subscription(self, topic, self.buffer_size)
+    with self._lock:
+      self._subscriptions.setdefault(topic, set()).add(subscription)
+    return subscription
+
+  def unsubscribe(self, subscription):
+    with self._lock:
+      subscriptions = self._subscriptions.get(subscription.topic)
+      if subscriptions is not None:
+        subscriptions.discard(subscription)
+        if not subscriptions:
+          del self._subscriptions[subscription.topic]
+
+  def publish(self, topic, event):
+    with self._lock:
+      subscriptions = list(self._subscriptions.get(topic, ()))
+    for subscription in subscriptions:
+      subscription.push(event)
@@ -0,0 +1,154 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql')
+
+ORDERS = ('asc', 'desc')
+
+def normalize(sql):
+  return ' '.join(sql.split())
+
+def null_parameters(sql):
+  """NULL bindings for every ? or :name placeholder outside string literals."""
+  code = re.sub(r"'[^']*'|\"[^\"]*\"", '', sql)
+  names = re.findall(r':(\w+)', code)
+  if names:
+    return dict.fromkeys(names)
+  return (None,) * code.count('?')
+
+class SortedQuery:
+  """A list statement with one registered variant per sort column and order.
+
+  The template has `{columns}`, `{sort}` and `{order}` slots. Every variant
+  is built once with the full column list; narrower column lists (see
+  lib/serializers.pick_columns) are built on first use and reused after.
+  """
+
+  def __init__(self, registry, name, template, columns, sorts):
+    self.registry = registry
+    self.name = name
+    self.template = template
+    self.columns = columns
+    self.sorts = sorts
+    self._variants = {}
+    for sort in sorts:
+      for order in ORDERS:
+        self.statement(sort, order)
+
+  def statement(self, sort, order, columns=None):
+    """SQL for a sort key and order, which must have been validated."""
+    from lib.serializers import select_columns
+
+    columns = columns or self.columns
+    key = (sort, order, tuple(key for key, _ in columns))
+    sql = self._variants.get(key)
+    if sql is None:
+      name = f'{self.name}[{sort} {order}]'
+      sql = self.template.format(columns=select_columns(columns), sort=self.sorts[sort], order=order)
+      if columns is self.columns:
+        self.registry.register(name, sql)
+      else:
+        # Counted with the full variant, which is the one validated
+        self.registry.alias(name, sql)
+      sql = self._variants.setdefault(key, sql)
+    return sql
+
+class QueryRegistry:
+  """Every named SQL statement of the app, with execution stats.
+
+  Statements are registered once at import time and handed back unchanged,
+  so call sites keep passing plain strings to cursor.execute. Cursors from
+  Db.cursor() report each execution here, keyed by statement, which is what
+  GET /admin/queries shows. `validate` compiles every statement against a
+  database so a typo fails at startup instead of on the first request.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._names = {}    # normalized SQL -> name
+    self._statements = {}  # name -> SQL
+    self._stats = {}    # name -> [count, seconds]
+    self._files = {}
+
+  def register(self, name, sql):
+    with self._lock:
+      existing = self._statements.get(name)
+      if existing is not None and normalize(existing) != normalize(sql):
+        raise ValueError(f'Query {name} is already registered with different SQL')
+      self._statements[name] = sql
+      self._names[normalize(sql)] = name
+    return sql
+
+  def alias(self, name, sql):
+    """Report executions of `sql` under the registered statement `name`."""
+    with self._lock:
+      self._names[normalize(sql)] = name
+    return sql
+
+  def register_sorted(self, name, template, columns, sorts):
+    return SortedQuery(self, name, template, columns, sorts)
+
+  def file(self, filepath):
+    """Contents of a file under sql/, read once."""
+    sql = self._files.get(filepath)
+    if sql is None:
+      with open(os.path.join(SQL_DIR, filepath), 'r') as file:
+        sql = self._files.setdefault(filepath, file.read())
+    return sql
+
+  def validate(self, connection):
+    """Compile every statement without running it. Returns the error of
+    each statement that does not compile, by name."""
+    errors = {}
+    for name, sql in list(self._statements.items()):
+      try:
+        connection.execute('EXPLAIN ' + sql, null_parameters(sql))
+      except sqlite3.Error as e:
+        errors[name] = str(e)
+    return errors
+
+  def record(self, sql, seconds):
+    key = normalize(sql)
+    name = self._names.get(key) or 'adhoc: ' + key[:80]
+    with self._lock:
+      stats = self._stats.setdefault(name, [0, 0.0])
+      stats[0] += 1
+      stats[1] += seconds
+
+  def stats(self):
+    """Executions per statement, most total time first."""
+    with self._lock:
+      rows = [{
+        'name': name,
+        'count': count,
+        'total_ms': seconds * 1000,
+        'mean_ms': seconds * 1000 / count
+      } for name, (count, seconds) in self._stats.items()]
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+  def reset_stats(self):
+    with self._lock:
+      self._stats = {}
+
+class TimedCursor(sqlite3.Cursor):
+  """Cursor that reports every execution to the query registry."""
+
+  def execute(self, sql, parameters=()):
+    started = time.perf_counter()
+    try:
+      return super().execute(sql, parameters)
+    finally:
+      queries.record(sql, time.perf_counter() - started)
+
+  def executemany(self, sql, seq_of_parameters):
+    started = time.perf_counter()
+    try:
+      return super().executemany(sql, seq_of_parameters)
+    finally:
+      queries.record(sql, time.perf_counter() - started)
+
+# The registry shared by every module
+queries = QueryRegistry()
@@ -0,0 +1,289 @@
+import sqlite3
+import threading
+
+from lib.db import list_shards
+from lib.queries import queries
+
+# Rollups maintained by the review write path, so reads never have to
+# aggregate word_review_items (which may be partly archived)
+
+RECORD_WORD_REVIEW = queries.register('rollups.record_word_review', '''
+  INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+  VALUES (?, ?, ?, datetime('now'))
+  ON CONFLICT (word_id) DO UPDATE SET
+    correct_count = correct_count + excluded.correct_count,
+    wrong_count = wrong_count + excluded.wrong_count,
+    last_reviewed = excluded.last_reviewed
+  RETURNING correct_count, wrong_count
+''')
+
+RECORD_SESSION_REVIEW = queries.register('rollups.record_session_review', '''
+  INSERT INTO study_session_stats (study_session_id, review_items_count, correct_count, wrong_count, last_activity_at)
+  VALUES (?, 1, ?, ?, datetime('now'))
+  ON CONFLICT (study_session_id) DO UPDATE SET
+    review_items_count = review_items_count + 1,
+    correct_count = correct_count + excluded.correct_count,
+    wrong_count = wrong_count + excluded.wrong_count,
+    last_activity_at = excluded.last_activity_at
+  RETURNING review_items_count, correct_count, wrong_count
+''')
+
+# Words count as mastered with at least 5 reviews and an 80% success rate
+MASTERED_MIN_REVIEWS = 5
+MASTERED_SUCCESS_RATE = 0.8
+
+RECORD_GROUP_SESSION = queries.register('rollups.record_group_session', '''
+  INSERT INTO group_stats (group_id, sessions_count)
+  VALUES (?, 1)
+  ON CONFLICT (group_id) DO UPDATE SET
+    sessions_count = sessions_count + 1
+''')
+
+RECORD_GROUP_ACTIVITY_SESSION = queries.register('rollups.record_group_activity_session', '''
+  INSERT INTO group_activity_stats (group_id, study_activity_id, sessions_count)
+  VALUES (?, ?, 1)
+  ON CONFLICT (group_id, study_activity_id) DO UPDATE SET
+    sessions_count = sessions_count + 1
+''')
+
+RECORD_GROUP_REVIEW = queries.register('rollups.record_group_review', '''
+  INSERT INTO group_stats (group_id, correct_count, wrong_count, last_studied_at)
+  SELECT group_id, ?, ?, datetime('now')
+  FROM study_sessions
+  WHERE id = ?
+  ON CONFLICT (group_id) DO UPDATE SET
+    correct_count = correct_count + excluded.correct_count,
+    wrong_count = wrong_count + excluded.wrong_count,
+    last_studied_at = excluded.last_studied_at
+''')
+
+# A word's studied/mastered state counts towards every group it belongs to
+RECORD_GROUP_WORD_STATE = queries.register('rollups.record_group_word_state', '''
+  INSERT INTO group_stats (group_id, words_studied, words_mastered)
+  SELECT group_id, ?, ?
+  FROM word_groups
+  WHERE word_id = ?
+  ON CONFLICT (group_id) DO UPDATE SET
+    words_studied = words_studied + excluded.words_studied,
+    words_mastered = words_mastered + excluded.words_mastered
+''')
+
+# Reviews per hour for analytics; older hours are compacted into days
+RECORD_HOURLY_REVIEW = queries.register('rollups.record_hourly_review', '''
+  INSERT INTO review_rollups_hourly (bucket, word_id, group_id, study_activity_id, correct_count, wrong_count)
+  SELECT strftime('%Y-%m-%d %H:00:00', 'now'), ?, group_id, study_activity_id, ?, ?
+  FROM study_sessions
+  WHERE id = ?
+  ON CONFLICT (bucket, word_id, group_id, study_activity_id) DO UPDATE SET
+    correct_count = correct_count + excluded.correct_count,
+    wrong_count = wrong_count + excluded.wrong_count
+''')
+
+# The same counts without the word, for analytics that do not filter by
+# word and would otherwise read one row per word and bucket
+RECORD_GROUP_HOURLY_REVIEW = queries.register('rollups.record_group_hourly_review', '''
+  INSERT INTO review_rollups_group_hourly (bucket, group_id, study_activity_id, correct_count, wrong_count)
+  SELECT strftime('%Y-%m-%d %H:00:00', 'now'), group_id, study_activity_id, ?, ?
+  FROM study_sessions
+  WHERE id = ?
+  ON CONFLICT (bucket, group_id, study_activity_id) DO UPDATE SET
+    correct_count = correct_count + excluded.correct_count,
+    wrong_count = wrong_count + excluded.wrong_count
+''')
+
+COMPACT_HOURLY = queries.register('rollups.compact_hourly', '''
+  INSERT INTO review_rollups_daily (bucket, word_id, group_id, study_activity_id, correct_count, wrong_count)
+  SELECT substr(bucket, 1, 10), word_id, group_id, study_activity_id, SUM(correct_count), SUM(wrong_count)
+  FROM review_rollups_hourly
+  WHERE bucket < ?
+  GROUP BY substr(bucket, 1, 10), word_id, group_id, study_activity_id
+  ON CONFLICT (bucket, word_id, group_id, study_activity_id) DO UPDATE SET
+    correct_count = correct_count + excluded.correct_count,
+    wrong_count = wrong_count + excluded.wrong_count
+''')
+
+COMPACT_GROUP_HOURLY = queries.register('rollups.compact_group_hourly', '''
+  INSERT INTO review_rollups_group_daily (bucket, group_id, study_activity_id, correct_count, wrong_count)
+  SELECT substr(bucket, 1, 10), group_id, study_activity_id, SUM(correct_count), SUM(wrong_count)
+  FROM review_rollups_group_hourly
+  WHERE bucket < ?
+  GROUP BY substr(bucket, 1, 10), group_id, study_activity_id
+  ON CONFLICT (bucket, group_id, study_activity_id) DO UPDATE SET
+    correct_count = correct_count + excluded.correct_count,
+    wrong_count = wrong_count + excluded.wrong_count
+''')
+
+REBUILD_WORD_REVIEWS = queries.register('rollups.rebuild_word_reviews', '''
+  INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+  SELECT word_id,
+      SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END),
+      SUM(CASE WHEN correct = 0 THEN 1 ELSE 0 END),
+      MAX(created_at)
+  FROM word_review_items_history
+  GROUP BY word_id
+''')
+
+REBUILD_SESSION_STATS = queries.register('rollups.rebuild_session_stats', '''
+  INSERT INTO study_session_stats (study_session_id, review_items_count, correct_count, wrong_count, last_activity_at)
+  SELECT study_session_id,
+      COUNT(*),
+      SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END),
+      SUM(CASE WHEN correct = 0 THEN 1 ELSE 0 END),
+      MAX(created_at)
+  FROM word_review_items_history
+  WHERE study_session_id IN (SELECT id FROM study_sessions)
+  GROUP BY study_session_id
+''')
+
+REBUILD_GROUP_STATS = queries.register('rollups.rebuild_group_stats', '''
+  INSERT INTO group_stats (group_id, words_studied, words_mastered, correct_count, wrong_count, sessions_count, last_studied_at)
+  SELECT g.id,
+      (SELECT COUNT(*) FROM word_groups wg JOIN word_reviews r ON r.word_id = wg.word_id
+       WHERE wg.group_id = g.id),
+      (SELECT COUNT(*) FROM word_groups wg JOIN word_reviews r ON r.word_id = wg.word_id
+       WHERE wg.group_id = g.id
+         AND r.correct_count + r.wrong_count >= :min_reviews
+         AND r.correct_count * 1.0 / (r.correct_count + r.wrong_count) >= :success_rate),
+      COALESCE(SUM(st.correct_count), 0),
+      COALESCE(SUM(st.wrong_count), 0),
+      COUNT(ss.id),
+      MAX(st.last_activity_at)
+  FROM groups g
+  LEFT JOIN study_sessions ss ON ss.group_id = g.id
+  LEFT JOIN study_session_stats st ON st.study_session_id = ss.id
+  GROUP BY g.id
+''')
+
+REBUILD_GROUP_ACTIVITY_STATS = queries.register('rollups.rebuild_group_activity_stats', '''
+  INSERT INTO group_activity_stats (group_id, study_activity_id, sessions_count)
+  SELECT group_id, study_activity_id, COUNT(*)
+  FROM study_sessions
+  GROUP BY group_id, study_activity_id
+''')
+
+REBUILD_DAILY_REVIEWS = queries.register('rollups.rebuild_daily_reviews', '''
+  INSERT INTO review_rollups_daily (bucket, word_id, group_id, study_activity_id, correct_count, wrong_count)
+  SELECT date(wri.created_at), wri.word_id, ss.group_id, ss.study_activity_id,
+      SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END),
+      SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END)
+  FROM word_review_items_history wri
+  JOIN study_sessions ss ON ss.id = wri.study_session_id
+  GROUP BY date(wri.created_at), wri.word_id, ss.group_id, ss.study_activity_id
+''')
+
+REBUILD_GROUP_DAILY_REVIEWS = queries.register('rollups.rebuild_group_daily_reviews', '''
+  INSERT INTO review_rollups_group_daily (bucket, group_id, study_activity_id, correct_count, wrong_count)
+  SELECT bucket, group_id, study_activity_id, SUM(correct_count), SUM(wrong_count)
+  FROM review_rollups_daily
+  GROUP BY bucket, group_id, study_activity_id
+''')
+
+def is_mastered(correct_count, wrong_count):
+  total = correct_count + wrong_count
+  return total >= MASTERED_MIN_REVIEWS and correct_count / total >= MASTERED_SUCCESS_RATE
+
+def record_session(cursor, group_id, study_activity_id):
+  """Count a new study session towards its group's rollups."""
+  cursor.execute(RECORD_GROUP_SESSION, (group_id,))
+  cursor.execute(RECORD_GROUP_ACTIVITY_SESSION, (group_id, study_activity_id))
+
+def record_review(cursor, session_id, word_id, correct):
+  """Fold a single review into the per-word, per-session, per-group and
+  hourly rollups.
+
+  Returns the session's new review_items_count, correct_count and
+  wrong_count.
+  """
+  correct_count, wrong_count = (1, 0) if correct else (0, 1)
+  cursor.execute(RECORD_WORD_REVIEW, (word_id, correct_count, wrong_count))
+  totals = cursor.fetchone()
+  cursor.execute(RECORD_SESSION_REVIEW, (session_id, correct_count, wrong_count))
+  session_totals = cursor.fetchone()
+  cursor.execute(RECORD_GROUP_REVIEW, (correct_count, wrong_count, session_id))
+  cursor.execute(RECORD_HOURLY_REVIEW, (word_id, correct_count, wrong_count, session_id))
+  cursor.execute(RECORD_GROUP_HOURLY_REVIEW, (correct_count, wrong_count, session_id))
+
+  # Update the studied/mastered word counts of the word's groups when this
+  # review changed the word's state
+  previous_correct = totals['correct_count'] - correct_count
+  previous_wrong = totals['wrong_count'] - wrong_count
+  studied = 1 if previous_correct + previous_wrong == 0 else 0
+  mastered = int(is_mastered(totals['correct_count'], totals['wrong_count'])) \
+    - int(is_mastered(previous_correct, previous_wrong))
+  if studied or mastered:
+    cursor.execute(RECORD_GROUP_WORD_STATE, (studied, mastered, word_id))
+
+  return session_totals
+
+def clear(cursor):
+  cursor.execute('DELETE FROM group_activity_stats')
+  cursor.execute('DELETE FROM group_stats')
+  cursor.execute('DELETE FROM study_session_stats')
+  cursor.execute('DELETE FROM word_reviews')
+  cursor.execute('DELETE FROM review_rollups_hourly')
+  cursor.execute('DELETE FROM review_rollups_daily')
+  cursor.execute('DELETE FROM review_rollups_group_hourly')
+  cursor.execute('DELETE FROM review_rollups_group_daily')
+
+def rebuild(cursor):
+  """Recompute the rollups from the full review history."""
+  clear(cursor)
+  cursor.execute(REBUILD_WORD_REVIEWS)
+  cursor.execute(REBUILD_SESSION_STATS)
+  cursor.execute(REBUILD_DAILY_REVIEWS)
+  cursor.execute(REBUILD_GROUP_DAILY_REVIEWS)
+  cursor.execute(REBUILD_GROUP_STATS, {
+    'min_reviews': MASTERED_MIN_REVIEWS,
+    'success_rate': MASTERED_SUCCESS_RATE
+  })
+  cursor.execute(REBUILD_GROUP_ACTIVITY_STATS)
+
+def compact(connection, keep_hours=48):
+  """Fold hourly rollups older than `keep_hours` into the daily rollups.
+
+  Only whole days are compacted, so a day is never split between the two
+  tables. Returns the number of hourly rows removed.
+  """
+  cursor = connection.cursor()
+  cursor.execute('BEGIN IMMEDIATE')
+  try:
+    cursor.execute("SELECT date('now', ?)", (f'-{int(keep_hours)} hours',))
+    cutoff = cursor.fetchone()[0]
+    cursor.execute(COMPACT_HOURLY, (cutoff,))
+    cursor.execute('DELETE FROM review_rollups_hourly WHERE bucket < ?', (cutoff,))
+    removed = cursor.rowcount
+    cursor.execute(COMPACT_GROUP_HOURLY, (cutoff,))
+    cursor.execute('DELETE FROM review_rollups_group_hourly WHERE bucket < ?', (cutoff,))
+    connection.commit()
+    return removed
+  except Exception:
+    connection.rollback()
+    raise
+
+class RollupCompactor(threading.Thread):
+  """Optional background thread running `compact` every `interval` seconds,
+  on the database and on every learner shard in `shards_dir`."""
+
+  def __init__(self, database, interval, keep_hours=48, logger=None, shards_dir=None):
+    super().__init__(daemon=True)
+    self.database = database
+    self.shards_dir = shards_dir
+    self.interval = interval
+    self.keep_hours = keep_hours
+    self.logger = logger
+    self.stopped = threading.Event()
+
+  def run(self):
+    while not self.stopped.wait(self.interval):
+      for database in [self.database] + list(list_shards(self.shards_dir).values()):
+        connection = sqlite3.connect(database)
+        try:
+          compact(connection, self.keep_hours)
+        except sqlite3.Error as e:
+          if self.logger:
+            self.logger.error(f"Rollup compaction of {database} failed: {str(e)}")
+        finally:
+          connection.close()
+
+  def stop(self):
+    self.stopped.set()
@@ -0,0 +1,97 @@
+import json
+import random
+
+from lib.queries import queries
+
+# Seek to the first group member at or after a random word id. With the
+# (group_id, word_id) index on word_groups this is a single index probe, so
+# the cost of a draw does not depend on the size of the group.
+SEEK_GROUP_WORD = queries.register('sampling.seek_group_word', '''
+  SELECT wg.word_id,
+      COALESCE(r.correct_count, 0) AS correct_count,
+      COALESCE(r.wrong_count, 0) AS wrong_count
+  FROM word_groups wg
+  LEFT JOIN word_reviews r ON r.word_id = wg.word_id
+  WHERE wg.group_id = ? AND wg.word_id >= ?
+  ORDER BY wg.word_id
+  LIMIT 1
+''')
+
+GROUP_WORD_BOUNDS = queries.register('sampling.group_word_bounds', '''
+  SELECT MIN(word_id) AS min_id, MAX(word_id) AS max_id
+  FROM word_groups
+  WHERE group_id = ?
+''')
+
+LIST_GROUP_WORD_IDS = queries.register('sampling.group_word_ids', 'SELECT word_id FROM word_groups WHERE group_id = ?')
+
+# The members not drawn yet, in random order. The drawn ids are passed as one
+# JSON array.
+LIST_REMAINING_GROUP_WORDS = queries.register('sampling.remaining_group_words', '''
+  SELECT word_id FROM word_groups
+  WHERE group_id = ? AND word_id NOT IN (SELECT value FROM json_each(?))
+  ORDER BY random()
+  LIMIT ?
+''')
+
+# Attempts allowed per requested word before falling back to a plain scan
+MAX_ATTEMPTS_PER_WORD = 20
+
+def error_weight(correct_count, wrong_count):
+  """Acceptance probability for a word when weighting by error rate.
+
+  Uses a smoothed error rate so unreviewed words still get picked about
+  half the time and mastered words are never excluded entirely.
+  """
+  return (wrong_count + 1) / (correct_count + wrong_count + 2)
+
+def sample_group_words(cursor, group_id, words_count, n, exclude=(), weighted=False):
+  """Pick up to n distinct word ids from a group without sorting the group.
+
+  Draws random ids between the smallest and largest member id and seeks to
+  the next member through the word_groups index. When `weighted` is set,
+  candidates are kept with probability `error_weight` (rejection sampling),
+  which favours words that are answered wrong more often.
+
+  Ids assigned by the importer are dense within a group, so the draws are
+  close to uniform; large gaps in the ids slightly favour the word after
+  the gap.
+  """
+  exclude = set(exclude)
+
+  cursor.execute(GROUP_WORD_BOUNDS, (group_id,))
+  bounds = cursor.fetchone()
+  if bounds['min_id'] is None:
+    return []
+
+  # Small groups: nothing to gain from sampling, return every member. Only
+  # excluded ids within the group's id range can be members.
+  excluded_members = sum(1 for word_id in exclude if bounds['min_id'] <= word_id <= bounds['max_id'])
+  if words_count - excluded_members <= n:
+    cursor.execute(LIST_GROUP_WORD_IDS, (group_id,))
+    word_ids = [row['word_id'] for row in cursor.fetchall() if row['word_id'] not in exclude]
+    random.shuffle(word_ids)
+    return word_ids[:n]
+
+  chosen = []
+  seen = set(exclude)
+  attempts = 0
+  while len(chosen) < n and attempts < n * MAX_ATTEMPTS_PER_WORD:
+    attempts += 1
+    cursor.execute(SEEK_GROUP_WORD, (group_id, random.randint(bounds['min_id'], bounds['max_id'])))
+    candidate = cursor.fetchone()
+    if candidate is None or candidate['word_id'] in seen:
+      continue
+    if weighted and random.random() > error_weight(candidate['correct_count'], candidate['wrong_count']):
+      continue
+    seen.add(candidate['word_id'])
+    chosen.append(candidate['word_id'])
+
+  # Unlucky draws (e.g. most of the group excluded): fill up with a random
+  # selection of the remaining members. This reads the whole group, and the
+  # words it adds are not weighted.
+  if len(chosen) < n:
+    cursor.execute(LIST_REMAINING_GROUP_WORDS, (group_id, json.dumps(list(seen)), n - len(chosen)))
+    chosen.extend(row['word_id'] for row in cursor.fetchall())
+
+  return chosen
@@ -0,0 +1,41 @@
+# Shared row serialization for list endpoints. Columns are declared once as
+# (output key, SQL expression) pairs, which drive both the SELECT list and
+# the keys of the serialized rows.
+
+def select_columns(columns):
+  """Build a SELECT list aliasing each expression to its output key."""
+  return ', '.join(f'{expression} AS {key}' for key, expression in columns)
+
+def fetch_dicts(cursor, columns, query, params=()):
+  """Run `query` and return its rows as dicts keyed by the column keys.
+
+  Rows are fetched as plain tuples and zipped with the keys, skipping the
+  sqlite3.Row lookups and the hand-built dict per row.
+  """
+  keys = tuple(key for key, _ in columns)
+  # Same cursor class, so timed cursors still report to the query registry
+  tuple_cursor = cursor.connection.cursor(type(cursor))
+  tuple_cursor.row_factory = None
+  try:
+    tuple_cursor.execute(query, params)
+    return [dict(zip(keys, row)) for row in tuple_cursor.fetchall()]
+  finally:
+    tuple_cursor.close()
+
+def pick_columns(columns, fields, required=('id',)):
+  """Narrow `columns` to a comma separated `fields` parameter.
+
+  Columns keep their declared order and the `required` keys are always
+  kept. Returns every column when `fields` is empty and raises ValueError
+  for unknown fields.
+  """
+  if not fields:
+    return columns
+  requested = {field.strip() for field in fields.split(',') if field.strip()}
+  allowed = [key for key, _ in columns]
+  unknown = requested.difference(allowed)
+  if unknown:
+    raise ValueError(
+      f"Unknown fields: {', '.join(sorted(unknown))}. Allowed fields: {', '.join(allowed)}"
+    )
+  return tuple(column for column in columns if column[0] in requested or column[0] in required)
@@ -0,0 +1,33 @@
+import time
+from contextlib import contextmanager
+
+class StartupTimer:
+  """Wall-clock time of each step of building the app, in milliseconds.
+
+  Kept on the app as `app.startup` and shown by GET /admin/startup, so a
+  slow worker boot can be traced to the step that caused it.
+  """
+
+  def __init__(self, imports_ms=None):
+    self.started = time.perf_counter()
+    self.imports_ms = imports_ms
+    self.steps = {}
+    self.total_ms = None
+
+  @contextmanager
+  def step(self, name):
+    started = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.steps[name] = (time.perf_counter() - started) * 1000
+
+  def finish(self):
+    self.total_ms = (time.perf_counter() - self.started) * 1000
+
+  def summary(self):
+    return {
+      'imports_ms': self.imports_ms,
+      'create_app_ms': self.total_ms,
+      'steps_ms': dict(self.steps)
+    }
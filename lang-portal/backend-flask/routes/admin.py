@@ -0,0 +1,53 @@
+from flask import jsonify
+from flask_cors import cross_origin
+
+from lib.backup import list_snapshots
+from lib.queries import queries
+
+def load(app):
+  @app.route('/admin/backups', methods=['POST'])
+  @cross_origin()
+  def start_backup():
+    """Start an online backup of the database in the background.
+
+    Returns:
+        202: Backup started, with the job status
+        409: A backup is already running
+    """
+    job = app.backups.start()
+    if job is None:
+      return jsonify({
+        'error': 'A backup is already running',
+        'backup': app.backups.job.status()
+      }), 409
+    return jsonify({'backup': job.status()}), 202
+
+  @app.route('/admin/backups', methods=['GET'])
+  @cross_origin()
+  def get_backups():
+    job = app.backups.job
+    return jsonify({
+      'backup': job.status() if job else None,
+      'snapshots': list_snapshots(app.backups.directory)
+    })
+
+
+  @app.route('/admin/admission', methods=['GET'])
+  @cross_origin()
+  def get_admission():
+    """Budgets, queue depth and shed counts of the admission controller."""
+    if app.admission is None:
+      return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **app.admission.stats()})
+
+  @app.route('/admin/queries', methods=['GET'])
+  @cross_origin()
+  def get_queries():
+    """Execution count and time of each statement, most total time first."""
+    return jsonify({'queries': queries.stats()})
+
+  @app.route('/admin/startup', methods=['GET'])
+  @cross_origin()
+  def get_startup():
+    """How long the imports and each step of create_app took."""
+    return jsonify(app.startup.summary())
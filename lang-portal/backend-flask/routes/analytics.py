@@ -0,0 +1,117 @@
+from datetime import date
+from itertools import combinations
+
+from flask import request, jsonify
+from flask_cors import cross_origin
+
+from lib.db import learner_route
+from lib.queries import queries
+
+# How each bucket size groups the day of a rollup row
+BUCKETS = {
+  'day': 'day',
+  'week': "date(day, 'weekday 0', '-6 days')",  # Monday starting the week
+}
+
+# Optional filters, all served by the (column, bucket) rollup indexes
+FILTERS = ('group_id', 'word_id', 'study_activity_id')
+
+# Daily and hourly rollups by word, and without the word for queries that
+# do not filter by word (one row per group and activity instead of per word)
+WORD_ROLLUPS = ('review_rollups_daily', 'review_rollups_hourly')
+GROUP_ROLLUPS = ('review_rollups_group_daily', 'review_rollups_group_hourly')
+
+# Compacted days come from the daily rollup, recent days from the hourly
+# rollup that has not been compacted yet. Both halves take the filter
+# values followed by the from and to dates.
+REVIEW_ANALYTICS_TEMPLATE = '''
+  SELECT
+    {start} as start,
+    SUM(correct_count) as correct_count,
+    SUM(wrong_count) as wrong_count
+  FROM (
+    SELECT bucket as day, correct_count, wrong_count
+    FROM {daily}
+    WHERE {where}
+    UNION ALL
+    SELECT substr(bucket, 1, 10) as day, correct_count, wrong_count
+    FROM {hourly}
+    WHERE {where}
+  )
+  GROUP BY start
+  ORDER BY start
+'''
+
+def review_analytics_statement(bucket, filters):
+  daily, hourly = WORD_ROLLUPS if 'word_id' in filters else GROUP_ROLLUPS
+  conditions = [f'{column} = ?' for column in filters]
+  conditions += ['bucket >= ?', "bucket < date(?, '+1 day')"]
+  return queries.register(
+    f"analytics.reviews[{bucket} {'+'.join(filters) or 'all'}]",
+    REVIEW_ANALYTICS_TEMPLATE.format(
+      start=BUCKETS[bucket], daily=daily, hourly=hourly, where=' AND '.join(conditions)
+    )
+  )
+
+# One statement per bucket size and combination of filters, so each one is
+# validated at startup and reported by name
+REVIEW_ANALYTICS = {
+  (bucket, filters): review_analytics_statement(bucket, filters)
+  for bucket in BUCKETS
+  for size in range(len(FILTERS) + 1)
+  for filters in combinations(FILTERS, size)
+}
+
+def parse_date(value):
+  """YYYY-MM-DD of a date parameter, None when missing. Raises ValueError
+  for anything else."""
+  if not value:
+    return None
+  return date.fromisoformat(value).isoformat()
+
+def load(app):
+  # Endpoint: GET /analytics/reviews?bucket=day|week&group_id=&word_id=&study_activity_id=&from=&to=
+  @app.route('/analytics/reviews', methods=['GET'])
+  @cross_origin()
+  @learner_route()
+  def get_review_analytics():
+    try:
+      cursor = app.db.cursor()
+
+      bucket = request.args.get('bucket', 'day')
+      if bucket not in BUCKETS:
+        return jsonify({"error": "bucket must be one of: day, week"}), 400
+
+      try:
+        date_from = parse_date(request.args.get('from')) or '0000-01-01'
+        date_to = parse_date(request.args.get('to')) or '9999-12-30'
+      except ValueError:
+        return jsonify({"error": "from and to must be dates in YYYY-MM-DD format"}), 400
+      if date_from > date_to:
+        return jsonify({"error": "from must not be after to"}), 400
+
+      # The filters given, in FILTERS order, pick the statement
+      filters = []
+      params = []
+      for column in FILTERS:
+        value = request.args.get(column, type=int)
+        if value is not None:
+          filters.append(column)
+          params.append(value)
+      params += [date_from, date_to]
+
+      cursor.execute(REVIEW_ANALYTICS[(bucket, tuple(filters))], params * 2)
+      points = cursor.fetchall()
+
+      return jsonify({
+        'bucket': bucket,
+        'points': [{
+          'start': point['start'],
+          'correct_count': point['correct_count'],
+          'wrong_count': point['wrong_count'],
+          'review_count': point['correct_count'] + point['wrong_count'],
+          'accuracy': point['correct_count'] / (point['correct_count'] + point['wrong_count'])
+        } for point in points]
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
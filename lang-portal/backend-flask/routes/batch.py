@@ -0,0 +1,64 @@
+from flask import request, jsonify
+from flask_cors import cross_origin
+
+from lib.db import LEARNER_HEADER
+
+def run_subrequest(app, path, headers):
+  """Dispatch a GET for `path` through the URL map in the current app
+  context, so it shares `g` and with it the batch's connection."""
+  with app.test_request_context(path, method='GET', headers=headers):
+    try:
+      response = app.full_dispatch_request()
+    except Exception as e:
+      return {'path': path, 'status': 500, 'body': {"error": str(e)}}
+
+    if response.is_streamed:
+      # Streams (event streams, exports) may never finish and are sent in
+      # chunks, so they cannot be part of a JSON batch body
+      response.close()
+      return {'path': path, 'status': 400, 'body': {"error": "Streaming endpoints cannot be batched"}}
+
+    body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+    return {'path': path, 'status': response.status_code, 'body': body}
+
+def load(app):
+  # Endpoint: POST /batch with {"requests": [{"path": "/dashboard/stats"}, ...]}
+  # to load several GET endpoints in one round trip from one snapshot
+  @app.route('/batch', methods=['POST'])
+  @cross_origin()
+  def post_batch():
+    data = request.get_json(silent=True) or {}
+    subrequests = data.get('requests')
+    if not isinstance(subrequests, list) or not subrequests:
+      return jsonify({"error": "requests must be a non-empty list"}), 400
+
+    max_requests = app.config.get('BATCH_MAX_REQUESTS', 20)
+    if len(subrequests) > max_requests:
+      return jsonify({"error": f"A batch accepts at most {max_requests} requests"}), 400
+
+    paths = []
+    for subrequest in subrequests:
+      path = subrequest.get('path') if isinstance(subrequest, dict) else None
+      if not isinstance(path, str) or not path.startswith('/'):
+        return jsonify({"error": "Each request needs a path starting with /"}), 400
+      if subrequest.get('method', 'GET').upper() != 'GET':
+        return jsonify({"error": "Only GET requests can be batched"}), 400
+      paths.append(path)
+
+    # Every sub-request reads from the same connection inside one read
+    # transaction, so the page sees a consistent snapshot. It is the one the
+    # sub-requests would use on their own, resolved as learner_route does:
+    # the learner's shard, or DATABASE for a learner without one (whose
+    # session routes answer 404 without reading it)
+    connection = app.db.pin(app.db.shard_learner())
+    try:
+      connection.execute('BEGIN')
+      # Sub-requests act for the same learner as the batch
+      headers = {LEARNER_HEADER: request.headers[LEARNER_HEADER]} if LEARNER_HEADER in request.headers else {}
+      responses = [run_subrequest(app, path, headers) for path in paths]
+    finally:
+      if connection.in_transaction:
+        connection.rollback()
+      app.db.unpin()
+
+    return jsonify({'responses': responses})
@@ -2,29 +2,96 @@ from flask import jsonify
 from flask_cors import cross_origin
 from datetime import datetime, timedelta
 
+from lib.db import learner_route
+from lib.queries import queries
+
+# The newest session is the last entry of the created_at index (ties go to
+# the higher id, which the index also holds), and its counters are one row
+# of study_session_stats, so the lookup does not grow with the history
+GET_RECENT_SESSION = queries.register('dashboard.recent_session', '''
+    SELECT
+        ss.id,
+        ss.group_id,
+        sa.name as activity_name,
+        ss.created_at,
+        COALESCE(st.correct_count, 0) as correct_count,
+        COALESCE(st.wrong_count, 0) as wrong_count
+    FROM study_sessions ss
+    JOIN study_activities sa ON ss.study_activity_id = sa.id
+    LEFT JOIN study_session_stats st ON ss.id = st.study_session_id
+    ORDER BY ss.created_at DESC, ss.id DESC
+    LIMIT 1
+''')
+
+# Get total vocabulary count
+COUNT_VOCABULARY = queries.register('dashboard.count_vocabulary', 'SELECT COUNT(*) as total_vocabulary FROM words')
+
+# Get total unique words studied (from the per-word review rollup)
+COUNT_WORDS_STUDIED = queries.register('dashboard.count_words_studied', '''
+    SELECT COUNT(*) as total_words
+    FROM word_reviews
+    WHERE correct_count + wrong_count > 0
+''')
+
+# Get mastered words (words with >80% success rate and at least 5 attempts)
+COUNT_MASTERED_WORDS = queries.register('dashboard.count_mastered_words', '''
+    SELECT COUNT(*) as mastered_words
+    FROM word_reviews
+    WHERE correct_count + wrong_count >= 5
+      AND correct_count * 1.0 / (correct_count + wrong_count) >= 0.8
+''')
+
+# Get overall success rate
+GET_SUCCESS_RATE = queries.register('dashboard.success_rate', '''
+    SELECT 
+        SUM(correct_count) * 1.0 / SUM(correct_count + wrong_count) as success_rate
+    FROM word_reviews
+''')
+
+# Get total number of study sessions
+COUNT_SESSIONS = queries.register('dashboard.count_sessions', 'SELECT COUNT(*) as total_sessions FROM study_sessions')
+
+# Get number of groups with activity in the last 30 days
+COUNT_ACTIVE_GROUPS = queries.register('dashboard.count_active_groups', '''
+    SELECT COUNT(DISTINCT group_id) as active_groups
+    FROM study_sessions
+    WHERE created_at >= date('now', '-30 days')
+''')
+
+# Calculate current streak (consecutive days with at least one study session)
+GET_STREAK = queries.register('dashboard.streak', '''
+    WITH daily_sessions AS (
+        SELECT 
+            date(created_at) as study_date,
+            COUNT(*) as session_count
+        FROM study_sessions
+        GROUP BY date(created_at)
+    ),
+    streak_calc AS (
+        SELECT 
+            study_date,
+            julianday(study_date) - julianday(lag(study_date, 1) over (order by study_date)) as days_diff
+        FROM daily_sessions
+    )
+    SELECT COUNT(*) as streak
+    FROM (
+        SELECT study_date
+        FROM streak_calc
+        WHERE days_diff = 1 OR days_diff IS NULL
+        ORDER BY study_date DESC
+    )
+''')
+
 def load(app):
     @app.route('/dashboard/recent-session', methods=['GET'])
     @cross_origin()
+    @learner_route()
     def get_recent_session():
         try:
             cursor = app.db.cursor()
             
             # Get the most recent study session with activity name and results
-            cursor.execute('''
-                SELECT 
-                    ss.id,
-                    ss.group_id,
-                    sa.name as activity_name,
-                    ss.created_at,
-                    COUNT(CASE WHEN wri.correct = 1 THEN 1 END) as correct_count,
-                    COUNT(CASE WHEN wri.correct = 0 THEN 1 END) as wrong_count
-                FROM study_sessions ss
-                JOIN study_activities sa ON ss.study_activity_id = sa.id
-                LEFT JOIN word_review_items wri ON ss.id = wri.study_session_id
-                GROUP BY ss.id
-                ORDER BY ss.created_at DESC
-                LIMIT 1
-            ''')
+            cursor.execute(GET_RECENT_SESSION)
             
             session = cursor.fetchone()
             
@@ -45,84 +112,30 @@ def load(app):
 
     @app.route('/dashboard/stats', methods=['GET'])
     @cross_origin()
+    @learner_route()
     def get_study_stats():
         try:
             cursor = app.db.cursor()
             
-            # Get total vocabulary count
-            cursor.execute('SELECT COUNT(*) as total_vocabulary FROM words')
+            cursor.execute(COUNT_VOCABULARY)
             total_vocabulary = cursor.fetchone()["total_vocabulary"]
 
-            # Get total unique words studied
-            cursor.execute('''
-                SELECT COUNT(DISTINCT word_id) as total_words
-                FROM word_review_items wri
-                JOIN study_sessions ss ON wri.study_session_id = ss.id
-            ''')
+            cursor.execute(COUNT_WORDS_STUDIED)
             total_words = cursor.fetchone()["total_words"]
             
-            # Get mastered words (words with >80% success rate and at least 5 attempts)
-            cursor.execute('''
-                WITH word_stats AS (
-                    SELECT 
-                        word_id,
-                        COUNT(*) as total_attempts,
-                        SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) * 1.0 / COUNT(*) as success_rate
-                    FROM word_review_items wri
-                    JOIN study_sessions ss ON wri.study_session_id = ss.id
-                    GROUP BY word_id
-                    HAVING total_attempts >= 5
-                )
-                SELECT COUNT(*) as mastered_words
-                FROM word_stats
-                WHERE success_rate >= 0.8
-            ''')
+            cursor.execute(COUNT_MASTERED_WORDS)
             mastered_words = cursor.fetchone()["mastered_words"]
             
-            # Get overall success rate
-            cursor.execute('''
-                SELECT 
-                    SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) * 1.0 / COUNT(*) as success_rate
-                FROM word_review_items wri
-                JOIN study_sessions ss ON wri.study_session_id = ss.id
-            ''')
+            cursor.execute(GET_SUCCESS_RATE)
             success_rate = cursor.fetchone()["success_rate"] or 0
             
-            # Get total number of study sessions
-            cursor.execute('SELECT COUNT(*) as total_sessions FROM study_sessions')
+            cursor.execute(COUNT_SESSIONS)
             total_sessions = cursor.fetchone()["total_sessions"]
             
-            # Get number of groups with activity in the last 30 days
-            cursor.execute('''
-                SELECT COUNT(DISTINCT group_id) as active_groups
-                FROM study_sessions
-                WHERE created_at >= date('now', '-30 days')
-            ''')
+            cursor.execute(COUNT_ACTIVE_GROUPS)
             active_groups = cursor.fetchone()["active_groups"]
             
-            # Calculate current streak (consecutive days with at least one study session)
-            cursor.execute('''
-                WITH daily_sessions AS (
-                    SELECT 
-                        date(created_at) as study_date,
-                        COUNT(*) as session_count
-                    FROM study_sessions
-                    GROUP BY date(created_at)
-                ),
-                streak_calc AS (
-                    SELECT 
-                        study_date,
-                        julianday(study_date) - julianday(lag(study_date, 1) over (order by study_date)) as days_diff
-                    FROM daily_sessions
-                )
-                SELECT COUNT(*) as streak
-                FROM (
-                    SELECT study_date
-                    FROM streak_calc
-                    WHERE days_diff = 1 OR days_diff IS NULL
-                    ORDER BY study_date DESC
-                )
-            ''')
+            cursor.execute(GET_STREAK)
             current_streak = cursor.fetchone()["streak"]
             
             return jsonify({
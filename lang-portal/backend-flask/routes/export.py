@@ -0,0 +1,129 @@
+import csv
+import io
+import zlib
+from datetime import date
+
+from flask import request, jsonify, Response
+from flask_cors import cross_origin
+
+from lib.db import learner_route
+from lib.queries import queries
+
+EXPORT_COLUMNS = (
+  'id', 'created_at', 'correct',
+  'word_id', 'kanji', 'romaji', 'english',
+  'study_session_id', 'group_id', 'group_name', 'study_activity_id', 'activity_name'
+)
+
+# One keyset page of review items, hot and archived, in id order
+EXPORT_REVIEWS = queries.register('export.export_reviews', '''
+  SELECT
+    wri.id, wri.created_at, wri.correct,
+    w.id, w.kanji, w.romaji, w.english,
+    ss.id, g.id, g.name, sa.id, sa.name
+  FROM word_review_items_history wri
+  JOIN words w ON w.id = wri.word_id
+  JOIN study_sessions ss ON ss.id = wri.study_session_id
+  JOIN groups g ON g.id = ss.group_id
+  JOIN study_activities sa ON sa.id = ss.study_activity_id
+  WHERE wri.id > ?
+    AND wri.created_at >= ?
+    AND wri.created_at < date(?, '+1 day')
+  ORDER BY wri.id
+  LIMIT ?
+''')
+
+FORMATS = {
+  'csv': ('text/csv', 'csv'),
+  'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+def parse_date(value):
+  """YYYY-MM-DD of a date parameter, None when missing. Raises ValueError
+  for anything else."""
+  if not value:
+    return None
+  return date.fromisoformat(value).isoformat()
+
+def encode_csv(rows, header=False):
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  if header:
+    writer.writerow(EXPORT_COLUMNS)
+  writer.writerows(rows)
+  return buffer.getvalue().encode()
+
+def encode_ndjson(rows, dumps):
+  return ''.join(dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n' for row in rows).encode()
+
+def export_chunks(db, learner, params, chunk_size):
+  """Yield lists of review rows, reading one keyset page per query.
+
+  Every page is read on its own and the statement is finalized before the
+  rows are handed out, so no read lock is held while a slow client drains
+  the response and writers are never blocked for long.
+  """
+  after_id, date_from, date_to = params
+  connection = db.connect(learner)
+  connection.row_factory = None
+  try:
+    while True:
+      cursor = connection.execute(EXPORT_REVIEWS, (after_id, date_from, date_to, chunk_size))
+      rows = cursor.fetchmany(chunk_size)
+      cursor.close()
+      if not rows:
+        return
+      yield rows
+      if len(rows) < chunk_size:
+        return
+      after_id = rows[-1][0]
+  finally:
+    connection.close()
+
+def load(app):
+  # Endpoint: GET /api/export/reviews?from=&to=&format=csv|ndjson&after_id=
+  @app.route('/api/export/reviews', methods=['GET'])
+  @cross_origin()
+  @learner_route()
+  def export_reviews():
+    export_format = request.args.get('format', 'csv')
+    if export_format not in FORMATS:
+      return jsonify({"error": "format must be one of: csv, ndjson"}), 400
+
+    # Resume an interrupted export from the last id received
+    after_id = request.args.get('after_id', 0, type=int)
+    try:
+      date_from = parse_date(request.args.get('from')) or '0000-01-01'
+      date_to = parse_date(request.args.get('to')) or '9999-12-30'
+    except ValueError:
+      return jsonify({"error": "from and to must be dates in YYYY-MM-DD format"}), 400
+    if date_from > date_to:
+      return jsonify({"error": "from must not be after to"}), 400
+    chunk_size = app.config.get('EXPORT_CHUNK_SIZE', 1000)
+    compress = bool(request.accept_encodings['gzip'])
+    dumps = app.json.dumps
+    # The stream is read after the request ends, so resolve the shard now
+    learner = app.db.learner()
+
+    def generate():
+      # wbits=31 writes a gzip stream; each chunk is flushed so everything
+      # received so far can be decoded if the download is cut off
+      compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+      header = export_format == 'csv' and after_id == 0
+      for rows in export_chunks(app.db, learner, (after_id, date_from, date_to), chunk_size):
+        if export_format == 'csv':
+          data = encode_csv(rows, header)
+          header = False
+        else:
+          data = encode_ndjson(rows, dumps)
+        yield compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else data
+      if compressor:
+        yield compressor.flush()
+
+    mimetype, extension = FORMATS[export_format]
+    response = Response(generate(), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=reviews.{extension}'
+    response.vary.add('Accept-Encoding')
+    if compress:
+      response.headers['Content-Encoding'] = 'gzip'
+    return response
@@ -2,6 +2,150 @@ from flask import request, jsonify, g
 from flask_cors import cross_origin
 import json
 
+from lib.db import learner_route
+from lib.parts import fetch_word_parts
+from lib.queries import queries
+from lib.sampling import sample_group_words
+from lib.serializers import fetch_dicts, pick_columns
+from routes.words import WORD_LIST_COLUMNS, WORD_SORTS
+
+GROUP_LIST_COLUMNS = (
+  ('id', 'groups.id'),
+  ('group_name', 'groups.name'),
+  ('word_count', 'groups.words_count'),
+)
+
+# Maintained group stats, only selected for ?include=stats
+GROUP_STATS_COLUMNS = (
+  ('words_studied', 'COALESCE(s.words_studied, 0)'),
+  ('words_mastered', 'COALESCE(s.words_mastered, 0)'),
+  ('correct_count', 'COALESCE(s.correct_count, 0)'),
+  ('wrong_count', 'COALESCE(s.wrong_count, 0)'),
+  ('sessions_count', 'COALESCE(s.sessions_count, 0)'),
+  ('last_studied_at', 's.last_studied_at'),
+)
+
+GROUP_SESSION_COLUMNS = (
+  ('id', 's.id'),
+  ('group_id', 's.group_id'),
+  ('group_name', 'g.name'),
+  ('study_activity_id', 's.study_activity_id'),
+  ('activity_name', 'a.name'),
+  ('start_time', 's.created_at'),
+  # Sessions without reviews are assumed to have lasted 30 minutes
+  ('end_time', "COALESCE(st.last_activity_at, datetime(s.created_at, '+30 minutes'))"),
+  ('review_items_count', 'COALESCE(st.review_items_count, 0)'),
+)
+
+GROUP_SORTS = {'name': 'groups.name', 'words_count': 'groups.words_count'}
+
+LIST_GROUPS = queries.register_sorted('groups.list', '''
+  SELECT {columns}
+  FROM groups
+  ORDER BY {sort} {order}
+  LIMIT ? OFFSET ?
+''', GROUP_LIST_COLUMNS, GROUP_SORTS)
+
+LIST_GROUPS_WITH_STATS = queries.register_sorted('groups.list_with_stats', '''
+  SELECT {columns}
+  FROM groups
+  LEFT JOIN group_stats s ON s.group_id = groups.id
+  ORDER BY {sort} {order}
+  LIMIT ? OFFSET ?
+''', GROUP_LIST_COLUMNS + GROUP_STATS_COLUMNS, GROUP_SORTS)
+
+LIST_GROUP_WORDS = queries.register_sorted('groups.words', '''
+  SELECT {columns}
+  FROM words w
+  JOIN word_groups wg ON w.id = wg.word_id
+  LEFT JOIN word_reviews r ON w.id = r.word_id
+  WHERE wg.group_id = ?
+  ORDER BY {sort} {order}
+  LIMIT ? OFFSET ?
+''', WORD_LIST_COLUMNS, WORD_SORTS)
+
+LIST_GROUP_SESSIONS = queries.register_sorted('groups.study_sessions', '''
+  SELECT {columns}
+  FROM study_sessions s
+  JOIN study_activities a ON s.study_activity_id = a.id
+  JOIN groups g ON s.group_id = g.id
+  LEFT JOIN study_session_stats st ON st.study_session_id = s.id
+  WHERE s.group_id = ?
+  ORDER BY {sort} {order}
+  LIMIT ? OFFSET ?
+''', GROUP_SESSION_COLUMNS, {
+  key: expression for key, expression in GROUP_SESSION_COLUMNS
+  if key in ('start_time', 'end_time', 'activity_name', 'group_name', 'review_items_count')
+})
+
+COUNT_GROUPS = queries.register('groups.count', 'SELECT COUNT(*) FROM groups')
+
+# The sampled words of GET /groups/:id/words/random, by a JSON array of ids.
+# The route puts them back in the sampled order.
+LIST_RANDOM_WORDS = queries.register_sorted('groups.random_words', '''
+  SELECT {columns}
+  FROM words w
+  LEFT JOIN word_reviews r ON w.id = r.word_id
+  WHERE w.id IN (SELECT value FROM json_each(?))
+  ORDER BY {sort} {order}
+''', WORD_LIST_COLUMNS, {'id': 'w.id'})
+
+GET_GROUP = queries.register('groups.get', '''
+  SELECT id, name, words_count
+  FROM groups
+  WHERE id = ?
+''')
+
+GET_GROUP_NAME = queries.register('groups.get_name', 'SELECT name FROM groups WHERE id = ?')
+
+GET_GROUP_WORDS_COUNT = queries.register('groups.get_words_count', 'SELECT words_count FROM groups WHERE id = ?')
+
+# The stats maintained by the session and review write paths
+GET_GROUP_STATS = queries.register('groups.stats', '''
+  SELECT g.id, g.name,
+         COALESCE(s.words_studied, 0) as words_studied,
+         COALESCE(s.words_mastered, 0) as words_mastered,
+         COALESCE(s.correct_count, 0) as correct_count,
+         COALESCE(s.wrong_count, 0) as wrong_count,
+         COALESCE(s.sessions_count, 0) as sessions_count,
+         s.last_studied_at
+  FROM groups g
+  LEFT JOIN group_stats s ON s.group_id = g.id
+  WHERE g.id = ?
+''')
+
+LIST_GROUP_ACTIVITY_STATS = queries.register('groups.activity_stats', '''
+  SELECT a.id, a.name, s.sessions_count
+  FROM group_activity_stats s
+  JOIN study_activities a ON a.id = s.study_activity_id
+  WHERE s.group_id = ?
+  ORDER BY s.sessions_count DESC
+''')
+
+COUNT_GROUP_WORDS = queries.register('groups.count_words', '''
+  SELECT COUNT(*)
+  FROM word_groups
+  WHERE group_id = ?
+''')
+
+COUNT_GROUP_SESSIONS = queries.register('groups.count_study_sessions', '''
+  SELECT COUNT(*)
+  FROM study_sessions
+  WHERE group_id = ?
+''')
+
+def format_group_stats(stats):
+  reviews_count = stats["correct_count"] + stats["wrong_count"]
+  return {
+    "words_studied": stats["words_studied"],
+    "words_mastered": stats["words_mastered"],
+    "correct_count": stats["correct_count"],
+    "wrong_count": stats["wrong_count"],
+    "accuracy": stats["correct_count"] / reviews_count if reviews_count else 0,
+    "sessions_count": stats["sessions_count"],
+    "last_studied_at": stats["last_studied_at"]
+  }
+
 def load(app):
   @app.route('/groups', methods=['GET'])
   @cross_origin()
@@ -19,35 +163,37 @@ def load(app):
       order = request.args.get('order', 'asc')  # Default to ascending order
 
       # Validate sort_by and order
-      valid_columns = ['name', 'words_count']
-      if sort_by not in valid_columns:
+      if sort_by not in GROUP_SORTS:
         sort_by = 'name'
       if order not in ['asc', 'desc']:
         order = 'asc'
 
-      # Query to fetch groups with sorting and the cached word count
-      cursor.execute(f'''
-        SELECT id, name, words_count
-        FROM groups
-        ORDER BY {sort_by} {order}
-        LIMIT ? OFFSET ?
-      ''', (groups_per_page, offset))
+      # Narrow the returned columns (?fields=group_name)
+      try:
+        columns = pick_columns(GROUP_LIST_COLUMNS, request.args.get('fields'))
+      except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-      groups = cursor.fetchall()
+      # Query to fetch groups with sorting and the cached word count, plus the
+      # maintained group stats when asked for (?include=stats)
+      include_stats = request.args.get('include') == 'stats'
+      query = LIST_GROUPS
+      if include_stats:
+        columns += GROUP_STATS_COLUMNS
+        query = LIST_GROUPS_WITH_STATS
+      groups_data = fetch_dicts(
+        cursor, columns, query.statement(sort_by, order, columns), (groups_per_page, offset)
+      )
 
       # Query the total number of groups
-      cursor.execute('SELECT COUNT(*) FROM groups')
+      cursor.execute(COUNT_GROUPS)
       total_groups = cursor.fetchone()[0]
       total_pages = (total_groups + groups_per_page - 1) // groups_per_page
 
-      # Format the response
-      groups_data = []
-      for group in groups:
-        groups_data.append({
-          "id": group["id"],
-          "group_name": group["name"],
-          "word_count": group["words_count"]
-        })
+      # Nest the stats under each group
+      if include_stats:
+        for group in groups_data:
+          group["stats"] = format_group_stats({key: group.pop(key) for key, _ in GROUP_STATS_COLUMNS})
 
       # Return groups and pagination metadata
       return jsonify({
@@ -65,11 +211,7 @@ def load(app):
       cursor = app.db.cursor()
 
       # Get group details
-      cursor.execute('''
-        SELECT id, name, words_count
-        FROM groups
-        WHERE id = ?
-      ''', (id,))
+      cursor.execute(GET_GROUP, (id,))
       
       group = cursor.fetchone()
       if not group:
@@ -83,6 +225,38 @@ def load(app):
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
+  @app.route('/groups/<int:id>/stats', methods=['GET'])
+  @cross_origin()
+  @learner_route()
+  def get_group_stats(id):
+    try:
+      cursor = app.db.cursor()
+
+      # Read the stats maintained by the session and review write paths
+      cursor.execute(GET_GROUP_STATS, (id,))
+
+      group = cursor.fetchone()
+      if not group:
+        return jsonify({"error": "Group not found"}), 404
+
+      cursor.execute(LIST_GROUP_ACTIVITY_STATS, (id,))
+      activities = cursor.fetchall()
+
+      stats = format_group_stats(group)
+      stats["sessions_by_activity"] = [{
+        "study_activity_id": activity["id"],
+        "activity_name": activity["name"],
+        "sessions_count": activity["sessions_count"]
+      } for activity in activities]
+
+      return jsonify({
+        "id": group["id"],
+        "group_name": group["name"],
+        "stats": stats
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
   @app.route('/groups/<int:id>/words', methods=['GET'])
   @cross_origin()
   def get_group_words(id):
@@ -99,53 +273,38 @@ def load(app):
       order = request.args.get('order', 'asc')
 
       # Validate sort parameters
-      valid_columns = ['kanji', 'romaji', 'english', 'correct_count', 'wrong_count']
-      if sort_by not in valid_columns:
+      if sort_by not in LIST_GROUP_WORDS.sorts:
         sort_by = 'kanji'
       if order not in ['asc', 'desc']:
         order = 'asc'
 
+      # Narrow the returned columns (?fields=kanji,romaji)
+      try:
+        columns = pick_columns(WORD_LIST_COLUMNS, request.args.get('fields'))
+      except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
       # First, check if the group exists
-      cursor.execute('SELECT name FROM groups WHERE id = ?', (id,))
+      cursor.execute(GET_GROUP_NAME, (id,))
       group = cursor.fetchone()
       if not group:
         return jsonify({"error": "Group not found"}), 404
 
       # Query to fetch words with pagination and sorting
-      cursor.execute(f'''
-        SELECT w.*, 
-               COALESCE(wr.correct_count, 0) as correct_count,
-               COALESCE(wr.wrong_count, 0) as wrong_count
-        FROM words w
-        JOIN word_groups wg ON w.id = wg.word_id
-        LEFT JOIN word_reviews wr ON w.id = wr.word_id
-        WHERE wg.group_id = ?
-        ORDER BY {sort_by} {order}
-        LIMIT ? OFFSET ?
-      ''', (id, words_per_page, offset))
-      
-      words = cursor.fetchall()
+      words_data = fetch_dicts(
+        cursor, columns, LIST_GROUP_WORDS.statement(sort_by, order, columns), (id, words_per_page, offset)
+      )
 
       # Get total words count for pagination
-      cursor.execute('''
-        SELECT COUNT(*) 
-        FROM word_groups 
-        WHERE group_id = ?
-      ''', (id,))
+      cursor.execute(COUNT_GROUP_WORDS, (id,))
       total_words = cursor.fetchone()[0]
       total_pages = (total_words + words_per_page - 1) // words_per_page
 
-      # Format the response
-      words_data = []
-      for word in words:
-        words_data.append({
-          "id": word["id"],
-          "kanji": word["kanji"],
-          "romaji": word["romaji"],
-          "english": word["english"],
-          "correct_count": word["correct_count"],
-          "wrong_count": word["wrong_count"]
-        })
+      # Optionally include the per-character parts (?include=parts)
+      if request.args.get('include') == 'parts':
+        parts = fetch_word_parts(cursor, [word["id"] for word in words_data])
+        for word in words_data:
+          word["parts"] = parts[word["id"]]
 
       return jsonify({
         'words': words_data,
@@ -155,10 +314,63 @@ def load(app):
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
+  @app.route('/groups/<int:id>/words/random', methods=['GET'])
+  @cross_origin()
+  def get_group_random_words(id):
+    try:
+      cursor = app.db.cursor()
+
+      # Get sampling parameters
+      n = min(max(1, request.args.get('n', 10, type=int)), 100)
+      weighted = request.args.get('weighted', 'false').lower() in ('1', 'true', 'yes')
+      try:
+        exclude = [int(word_id) for word_id in request.args.get('exclude', '').split(',') if word_id]
+      except ValueError:
+        return jsonify({"error": "exclude must be a comma separated list of word ids"}), 400
+      if len(exclude) > 1000:
+        return jsonify({"error": "exclude accepts at most 1000 word ids"}), 400
+
+      # Narrow the returned columns (?fields=kanji,romaji)
+      try:
+        columns = pick_columns(WORD_LIST_COLUMNS, request.args.get('fields'))
+      except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+      # Check the group exists and read its cached word count
+      cursor.execute(GET_GROUP_WORDS_COUNT, (id,))
+      group = cursor.fetchone()
+      if not group:
+        return jsonify({"error": "Group not found"}), 404
+
+      word_ids = sample_group_words(
+        cursor,
+        group_id=id,
+        words_count=group["words_count"],
+        n=n,
+        exclude=exclude,
+        weighted=weighted
+      )
+
+      words = {}
+      if word_ids:
+        rows = fetch_dicts(
+          cursor, columns, LIST_RANDOM_WORDS.statement('id', 'asc', columns), (json.dumps(word_ids),)
+        )
+        words = {word["id"]: word for word in rows}
+
+      # Keep the sampled order
+      return jsonify({
+        'group_id': id,
+        'words': [words[word_id] for word_id in word_ids if word_id in words]
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
   # todo GET /groups/:id/words/raw
 
   @app.route('/groups/<int:id>/study_sessions', methods=['GET'])
   @cross_origin()
+  @learner_route()
   def get_group_study_sessions(id):
     try:
       cursor = app.db.cursor()
@@ -172,73 +384,35 @@ def load(app):
       sort_by = request.args.get('sort_by', 'created_at')
       order = request.args.get('order', 'desc')  # Default to newest first
 
-      # Map frontend sort keys to database columns
+      # Map frontend sort keys to the returned columns
       sort_mapping = {
-        'startTime': 'created_at',
-        'endTime': 'last_activity_time',
-        'activityName': 'a.name',
-        'groupName': 'g.name',
-        'reviewItemsCount': 'review_count'
+        'startTime': 'start_time',
+        'endTime': 'end_time',
+        'activityName': 'activity_name',
+        'groupName': 'group_name',
+        'reviewItemsCount': 'review_items_count'
       }
 
       # Use mapped sort column or default to created_at
-      sort_column = sort_mapping.get(sort_by, 'created_at')
+      sort_key = sort_mapping.get(sort_by, 'start_time')
+      if order not in ['asc', 'desc']:
+        order = 'desc'
+
+      # Narrow the returned columns (?fields=start_time,review_items_count)
+      try:
+        columns = pick_columns(GROUP_SESSION_COLUMNS, request.args.get('fields'))
+      except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
       # Get total count for pagination
-      cursor.execute('''
-        SELECT COUNT(*)
-        FROM study_sessions
-        WHERE group_id = ?
-      ''', (id,))
+      cursor.execute(COUNT_GROUP_SESSIONS, (id,))
       total_sessions = cursor.fetchone()[0]
       total_pages = (total_sessions + sessions_per_page - 1) // sessions_per_page
 
-      # Get study sessions for this group with dynamic calculations
-      cursor.execute(f'''
-        SELECT 
-          s.id,
-          s.group_id,
-          s.study_activity_id,
-          s.created_at as start_time,
-          (
-            SELECT MAX(created_at)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as last_activity_time,
-          a.name as activity_name,
-          g.name as group_name,
-          (
-            SELECT COUNT(*)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as review_count
-        FROM study_sessions s
-        JOIN study_activities a ON s.study_activity_id = a.id
-        JOIN groups g ON s.group_id = g.id
-        WHERE s.group_id = ?
-        ORDER BY {sort_column} {order}
-        LIMIT ? OFFSET ?
-      ''', (id, sessions_per_page, offset))
-      
-      sessions = cursor.fetchall()
-      sessions_data = []
-      
-      for session in sessions:
-        # If there's no last_activity_time, use start_time + 30 minutes
-        end_time = session["last_activity_time"]
-        if not end_time:
-            end_time = cursor.execute('SELECT datetime(?, "+30 minutes")', (session["start_time"],)).fetchone()[0]
-        
-        sessions_data.append({
-          "id": session["id"],
-          "group_id": session["group_id"],
-          "group_name": session["group_name"],
-          "study_activity_id": session["study_activity_id"],
-          "activity_name": session["activity_name"],
-          "start_time": session["start_time"],
-          "end_time": end_time,
-          "review_items_count": session["review_count"]
-        })
+      # Get study sessions for this group with their maintained counters
+      sessions_data = fetch_dicts(
+        cursor, columns, LIST_GROUP_SESSIONS.statement(sort_key, order, columns), (id, sessions_per_page, offset)
+      )
 
       return jsonify({
         'study_sessions': sessions_data,
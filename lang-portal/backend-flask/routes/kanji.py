@@ -0,0 +1,65 @@
+from flask import request, jsonify
+from flask_cors import cross_origin
+
+from lib.parts import fetch_word_parts
+from lib.queries import queries
+
+# Words using a kanji, found through the index on word_parts.kanji
+LIST_KANJI_WORDS = queries.register('kanji.words', '''
+  SELECT w.id, w.kanji, w.romaji, w.english,
+      COALESCE(r.correct_count, 0) AS correct_count,
+      COALESCE(r.wrong_count, 0) AS wrong_count
+  FROM words w
+  LEFT JOIN word_reviews r ON w.id = r.word_id
+  WHERE w.id IN (SELECT word_id FROM word_parts WHERE kanji = ?)
+  ORDER BY w.id
+  LIMIT ? OFFSET ?
+''')
+
+COUNT_KANJI_WORDS = queries.register('kanji.count_words', '''
+  SELECT COUNT(DISTINCT word_id) FROM word_parts WHERE kanji = ?
+''')
+
+def load(app):
+  # Endpoint: GET /kanji/:char/words to list the words using a kanji
+  @app.route('/kanji/<string:char>/words', methods=['GET'])
+  @cross_origin()
+  def get_kanji_words(char):
+    try:
+      cursor = app.db.cursor()
+
+      # Get the current page number from query parameters (default is 1)
+      page = max(1, request.args.get('page', 1, type=int))
+      words_per_page = 50
+      offset = (page - 1) * words_per_page
+
+      # Find the words through the index on word_parts.kanji
+      cursor.execute(LIST_KANJI_WORDS, (char, words_per_page, offset))
+
+      words = cursor.fetchall()
+
+      # Query the total number of words using the kanji
+      cursor.execute(COUNT_KANJI_WORDS, (char,))
+      total_words = cursor.fetchone()[0]
+      total_pages = (total_words + words_per_page - 1) // words_per_page
+
+      parts = fetch_word_parts(cursor, [word["id"] for word in words])
+
+      return jsonify({
+        "kanji": char,
+        "words": [{
+          "id": word["id"],
+          "kanji": word["kanji"],
+          "romaji": word["romaji"],
+          "english": word["english"],
+          "correct_count": word["correct_count"],
+          "wrong_count": word["wrong_count"],
+          "parts": parts[word["id"]]
+        } for word in words],
+        "total_pages": total_pages,
+        "current_page": page,
+        "total_words": total_words
+      })
+
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
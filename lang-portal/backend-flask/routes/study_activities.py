@@ -1,13 +1,73 @@
 from flask import jsonify, request
 from flask_cors import cross_origin
+import json
 import math
+import sqlite3
+
+from lib import rollups
+from lib.db import learner_route
+from lib.parts import fetch_word_parts
+from lib.queries import queries
+from lib.sampling import error_weight, sample_group_words
+from lib.serializers import fetch_dicts, pick_columns
+from routes.study_sessions import (
+    INSERT_STUDY_SESSION, SESSION_LIST_COLUMNS, study_session_not_found
+)
+from routes.groups import GET_GROUP_WORDS_COUNT
+from routes.words import WORD_LIST_COLUMNS
+
+# Words handed out by POST /api/study-activities/<id>/start, with what the
+# client needs to schedule them
+START_WORD_COLUMNS = WORD_LIST_COLUMNS + (
+    ('last_reviewed', 'r.last_reviewed'),
+)
+
+# An activity's sessions, newest first
+LIST_ACTIVITY_SESSIONS = queries.register_sorted('study_activities.sessions', '''
+    SELECT {columns}
+    FROM study_sessions ss
+    JOIN groups g ON g.id = ss.group_id
+    JOIN study_activities sa ON sa.id = ss.study_activity_id
+    LEFT JOIN study_session_stats st ON st.study_session_id = ss.id
+    WHERE ss.study_activity_id = ?
+    ORDER BY {sort} {order}
+    LIMIT ? OFFSET ?
+''', SESSION_LIST_COLUMNS, {'start_time': 'ss.created_at'})
+
+LIST_ACTIVITIES = queries.register('study_activities.list', 'SELECT id, name, url, preview_url FROM study_activities')
+
+GET_ACTIVITY = queries.register(
+    'study_activities.get', 'SELECT id, name, url, preview_url FROM study_activities WHERE id = ?'
+)
+
+ACTIVITY_EXISTS = queries.register('study_activities.exists', 'SELECT id FROM study_activities WHERE id = ?')
+
+COUNT_ACTIVITY_SESSIONS = queries.register('study_activities.count_sessions', '''
+    SELECT COUNT(*) as count
+    FROM study_sessions ss
+    JOIN groups g ON g.id = ss.group_id
+    WHERE ss.study_activity_id = ?
+''')
+
+# The groups an activity can be launched with
+LIST_LAUNCH_GROUPS = queries.register('study_activities.launch_groups', 'SELECT id, name FROM groups')
+
+# The first words of a started session, by a JSON array of ids. The route
+# puts them back in the sampled order.
+LIST_START_WORDS = queries.register_sorted('study_activities.start_words', '''
+    SELECT {columns}
+    FROM words w
+    LEFT JOIN word_reviews r ON w.id = r.word_id
+    WHERE w.id IN (SELECT value FROM json_each(?))
+    ORDER BY {sort} {order}
+''', START_WORD_COLUMNS, {'id': 'w.id'})
 
 def load(app):
     @app.route('/api/study-activities', methods=['GET'])
     @cross_origin()
     def get_study_activities():
         cursor = app.db.cursor()
-        cursor.execute('SELECT id, name, url, preview_url FROM study_activities')
+        cursor.execute(LIST_ACTIVITIES)
         activities = cursor.fetchall()
         
         return jsonify([{
@@ -21,7 +81,7 @@ def load(app):
     @cross_origin()
     def get_study_activity(id):
         cursor = app.db.cursor()
-        cursor.execute('SELECT id, name, url, preview_url FROM study_activities WHERE id = ?', (id,))
+        cursor.execute(GET_ACTIVITY, (id,))
         activity = cursor.fetchone()
         
         if not activity:
@@ -36,11 +96,12 @@ def load(app):
 
     @app.route('/api/study-activities/<int:id>/sessions', methods=['GET'])
     @cross_origin()
+    @learner_route()
     def get_study_activity_sessions(id):
         cursor = app.db.cursor()
         
         # Verify activity exists
-        cursor.execute('SELECT id FROM study_activities WHERE id = ?', (id,))
+        cursor.execute(ACTIVITY_EXISTS, (id,))
         if not cursor.fetchone():
             return jsonify({'error': 'Activity not found'}), 404
 
@@ -49,47 +110,23 @@ def load(app):
         per_page = request.args.get('per_page', 10, type=int)
         offset = (page - 1) * per_page
 
+        # Narrow the returned columns (?fields=start_time,review_items_count)
+        try:
+            columns = pick_columns(SESSION_LIST_COLUMNS, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         # Get total count
-        cursor.execute('''
-            SELECT COUNT(*) as count 
-            FROM study_sessions ss
-            JOIN groups g ON g.id = ss.group_id
-            WHERE ss.study_activity_id = ?
-        ''', (id,))
+        cursor.execute(COUNT_ACTIVITY_SESSIONS, (id,))
         total_count = cursor.fetchone()['count']
 
         # Get paginated sessions
-        cursor.execute('''
-            SELECT 
-                ss.id,
-                ss.group_id,
-                g.name as group_name,
-                sa.name as activity_name,
-                ss.created_at,
-                ss.study_activity_id as activity_id,
-                COUNT(wri.id) as review_items_count
-            FROM study_sessions ss
-            JOIN groups g ON g.id = ss.group_id
-            JOIN study_activities sa ON sa.id = ss.study_activity_id
-            LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
-            WHERE ss.study_activity_id = ?
-            GROUP BY ss.id, ss.group_id, g.name, sa.name, ss.created_at, ss.study_activity_id
-            ORDER BY ss.created_at DESC
-            LIMIT ? OFFSET ?
-        ''', (id, per_page, offset))
-        sessions = cursor.fetchall()
+        sessions = fetch_dicts(
+            cursor, columns, LIST_ACTIVITY_SESSIONS.statement('start_time', 'desc', columns), (id, per_page, offset)
+        )
 
         return jsonify({
-            'items': [{
-                'id': session['id'],
-                'group_id': session['group_id'],
-                'group_name': session['group_name'],
-                'activity_id': session['activity_id'],
-                'activity_name': session['activity_name'],
-                'start_time': session['created_at'],
-                'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
-                'review_items_count': session['review_items_count']
-            } for session in sessions],
+            'items': sessions,
             'total': total_count,
             'page': page,
             'per_page': per_page,
@@ -102,14 +139,14 @@ def load(app):
         cursor = app.db.cursor()
         
         # Get activity details
-        cursor.execute('SELECT id, name, url, preview_url FROM study_activities WHERE id = ?', (id,))
+        cursor.execute(GET_ACTIVITY, (id,))
         activity = cursor.fetchone()
         
         if not activity:
             return jsonify({'error': 'Activity not found'}), 404
         
         # Get available groups
-        cursor.execute('SELECT id, name FROM groups')
+        cursor.execute(LIST_LAUNCH_GROUPS)
         groups = cursor.fetchall()
         
         return jsonify({
@@ -124,3 +161,125 @@ def load(app):
                 'name': group['name']
             } for group in groups]
         })
+
+    @app.route('/api/study-activities/<int:id>/start', methods=['POST'])
+    @cross_origin()
+    @learner_route(create=True)
+    def start_study_activity(id):
+        """Start a study session and return its first words in one request.
+
+        Replaces the launch, create session and word list round trips before
+        the first card. The session is created and the words are sampled in
+        one transaction.
+
+        JSON payload:
+        {
+            "group_id": integer,
+            "n": integer (optional, 10 by default, at most 100),
+            "weighted": boolean (optional, favour words answered wrong more often)
+        }
+
+        Each word has its parts and scheduling hints: when it was last
+        reviewed and its sampling weight, the smoothed error rate used by
+        weighted sampling. More words of the group can be fetched from
+        /groups/<group_id>/words/random with the returned ids excluded.
+
+        Returns:
+            201: The session and its words
+            400: Invalid request (bad JSON or fields)
+            404: Group or activity not found
+            500: Server error
+        """
+        cursor = None
+        try:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return jsonify({'error': 'Invalid JSON payload'}), 400
+
+            group_id = data.get('group_id')
+            n = data.get('n', 10)
+            weighted = data.get('weighted', False)
+            if not isinstance(group_id, int) or not isinstance(n, int) or not isinstance(weighted, bool):
+                return jsonify({
+                    'error': 'Invalid field types',
+                    'required': {'group_id': 'integer'},
+                    'optional': {'n': 'integer', 'weighted': 'boolean'}
+                }), 400
+            n = min(max(1, n), 100)
+
+            cursor = app.db.cursor()
+
+            # Create the session, foreign keys validate group and activity
+            try:
+                cursor.execute(INSERT_STUDY_SESSION, (group_id, id))
+                session = cursor.fetchone()
+            except sqlite3.IntegrityError as e:
+                if 'FOREIGN KEY' not in str(e):
+                    raise
+                app.db.get().rollback()
+                return study_session_not_found(cursor, group_id, id)
+
+            # Learner shards report a missing group or activity as a missing name
+            if session['group_name'] is None or session['activity_name'] is None:
+                app.db.get().rollback()
+                return study_session_not_found(cursor, group_id, id)
+
+            rollups.record_session(cursor, group_id, id)
+
+            # Sample the first words inside the same transaction
+            cursor.execute(GET_GROUP_WORDS_COUNT, (group_id,))
+            word_ids = sample_group_words(
+                cursor,
+                group_id=group_id,
+                words_count=cursor.fetchone()['words_count'],
+                n=n,
+                weighted=weighted
+            )
+
+            words = {}
+            if word_ids:
+                rows = fetch_dicts(
+                    cursor, START_WORD_COLUMNS, LIST_START_WORDS.statement('id', 'asc'), (json.dumps(word_ids),)
+                )
+                words = {word['id']: word for word in rows}
+            parts = fetch_word_parts(cursor, list(words))
+
+            app.db.commit()
+            app.membership.add_session(session['id'], group_id, app.db.learner())
+            app.logger.info(f"Started study session {session['id']} for group {group_id}")
+
+            # Keep the sampled order
+            started_words = []
+            for word_id in word_ids:
+                word = words.get(word_id)
+                if word is None:
+                    continue
+                last_reviewed = word.pop('last_reviewed')
+                word['parts'] = parts[word_id]
+                word['hints'] = {
+                    'last_reviewed': last_reviewed,
+                    'weight': error_weight(word['correct_count'], word['wrong_count'])
+                }
+                started_words.append(word)
+
+            return jsonify({
+                'session': {
+                    'id': session['id'],
+                    'group_id': session['group_id'],
+                    'group_name': session['group_name'],
+                    'activity_id': session['activity_id'],
+                    'activity_name': session['activity_name'],
+                    'created_at': session['created_at']
+                },
+                'words': started_words
+            }), 201
+        except sqlite3.Error as e:
+            app.logger.error(f"Database error in start_study_activity: {str(e)}")
+            return jsonify({'error': 'Database error occurred'}), 500
+        except Exception as e:
+            app.logger.error(f"Unexpected error in start_study_activity: {str(e)}")
+            return jsonify({'error': 'An unexpected error occurred'}), 500
+        finally:
+            if cursor:
+                cursor.close()
+            app.db.close()
@@ -1,53 +1,183 @@
-from flask import request, jsonify, g
+from flask import request, jsonify, Response
 from flask_cors import cross_origin
 from datetime import datetime
 import math
 import sqlite3
 import logging
+import json
 
-INSERT_STUDY_SESSION = '''
+from lib import rollups
+from lib.archive import drop_review_partitions
+from lib.db import learner_route
+from lib.queries import queries
+from lib.serializers import fetch_dicts, pick_columns
+
+# Create the session and return it with its group and activity names in one
+# statement. Missing groups or activities fail the foreign key constraints.
+INSERT_STUDY_SESSION = queries.register('study_sessions.insert_study_session', '''
     INSERT INTO study_sessions (group_id, study_activity_id)
     VALUES (?, ?)
-'''
+    RETURNING
+        id,
+        group_id,
+        (SELECT name FROM groups WHERE id = study_sessions.group_id) as group_name,
+        study_activity_id as activity_id,
+        (SELECT name FROM study_activities WHERE id = study_sessions.study_activity_id) as activity_name,
+        created_at
+''')
+
+# Output keys of a session in the list endpoints. End times are not tracked,
+# so they are reported as the start time.
+SESSION_LIST_COLUMNS = (
+    ('id', 'ss.id'),
+    ('group_id', 'ss.group_id'),
+    ('group_name', 'g.name'),
+    ('activity_id', 'sa.id'),
+    ('activity_name', 'sa.name'),
+    ('start_time', 'ss.created_at'),
+    ('end_time', 'ss.created_at'),
+    ('review_items_count', 'COALESCE(st.review_items_count, 0)'),
+)
+
+# Newest sessions first
+LIST_SESSIONS = queries.register_sorted('study_sessions.list', '''
+    SELECT {columns}
+    FROM study_sessions ss
+    JOIN groups g ON g.id = ss.group_id
+    JOIN study_activities sa ON sa.id = ss.study_activity_id
+    LEFT JOIN study_session_stats st ON st.study_session_id = ss.id
+    ORDER BY {sort} {order}
+    LIMIT ? OFFSET ?
+''', SESSION_LIST_COLUMNS, {'start_time': 'ss.created_at'})
 
-GET_NEW_SESSION = '''
+COUNT_SESSIONS = queries.register('study_sessions.count', '''
+    SELECT COUNT(*) as count
+    FROM study_sessions ss
+    JOIN groups g ON g.id = ss.group_id
+    JOIN study_activities sa ON sa.id = ss.study_activity_id
+''')
+
+GROUP_EXISTS = queries.register('study_sessions.group_exists', 'SELECT id FROM groups WHERE id = ?')
+
+# Reset deletes the hot review items and the sessions; archived months are
+# dropped as whole partitions
+DELETE_REVIEW_ITEMS = queries.register('study_sessions.delete_review_items', 'DELETE FROM word_review_items')
+DELETE_SESSION_REPORTS = queries.register('study_sessions.delete_session_reports', 'DELETE FROM study_session_reports')
+DELETE_SESSIONS = queries.register('study_sessions.delete_sessions', 'DELETE FROM study_sessions')
+
+# Clearing the history is logged once per table instead of once per row
+LOG_CLEAR_HISTORY = queries.register('study_sessions.log_clear_history', '''
+    INSERT INTO change_log (table_name, row_id, operation)
+    VALUES ('word_review_items', NULL, 'clear'), ('study_sessions', NULL, 'clear')
+''')
+
+# Reviews are only recorded while the session has no report, so closing a
+# session freezes its counters even for other worker processes
+# Inserts nothing when the session is closed or no longer exists; the
+# membership index may still hold a session deleted by another worker, and
+# shard connections do not enforce the foreign key
+INSERT_WORD_REVIEW = queries.register('study_sessions.insert_word_review', '''
+    INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+    SELECT ?, ?, ?, datetime('now')
+    WHERE EXISTS (
+        SELECT 1 FROM study_sessions WHERE id = ?
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM study_session_reports WHERE study_session_id = ?
+    )
+''')
+
+# Closed sessions report their frozen counters from study_session_reports
+GET_SESSION = queries.register('study_sessions.get_session', '''
     SELECT 
         ss.id,
         ss.group_id,
         g.name as group_name,
         sa.id as activity_id,
         sa.name as activity_name,
-        ss.created_at
+        ss.created_at,
+        COALESCE(sr.review_items_count, st.review_items_count, 0) as review_items_count,
+        COALESCE(sr.correct_count, st.correct_count, 0) as correct_count,
+        COALESCE(sr.wrong_count, st.wrong_count, 0) as wrong_count,
+        sr.closed_at,
+        sr.words as report_words
     FROM study_sessions ss
     JOIN groups g ON g.id = ss.group_id
     JOIN study_activities sa ON sa.id = ss.study_activity_id
+    LEFT JOIN study_session_stats st ON st.study_session_id = ss.id
+    LEFT JOIN study_session_reports sr ON sr.study_session_id = ss.id
     WHERE ss.id = ?
-'''
-
-# Add new constants for word review
-VALIDATE_SESSION = '''
-    SELECT ss.id, ss.group_id 
-    FROM study_sessions ss 
-    WHERE ss.id = ?
-'''
-
-VALIDATE_WORD = '''
-    SELECT w.id 
-    FROM words w 
-    JOIN word_groups wg ON w.id = wg.word_id 
-    WHERE w.id = ? AND wg.group_id = ?
-'''
+''')
 
-INSERT_WORD_REVIEW = '''
-    INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
-    VALUES (?, ?, ?, datetime('now'))
-'''
+# The words reviewed in a session with their results. Filtering the history
+# view by session reaches every partition's index.
+GET_SESSION_WORDS = queries.register('study_sessions.get_session_words', '''
+    SELECT 
+        w.id,
+        w.kanji,
+        w.romaji,
+        w.english,
+        wri.session_correct_count,
+        wri.session_wrong_count
+    FROM (
+        SELECT
+            word_id,
+            SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) as session_correct_count,
+            SUM(CASE WHEN correct = 0 THEN 1 ELSE 0 END) as session_wrong_count
+        FROM word_review_items_history
+        WHERE study_session_id = ?
+        GROUP BY word_id
+    ) wri
+    JOIN words w ON w.id = wri.word_id
+    ORDER BY w.kanji
+''')
+
+# One page of the session's words, for sessions that are still open
+GET_SESSION_WORDS_PAGE = queries.register(
+    'study_sessions.get_session_words_page', GET_SESSION_WORDS + ' LIMIT ? OFFSET ?'
+)
+
+COUNT_SESSION_WORDS = queries.register('study_sessions.count_session_words', '''
+    SELECT COUNT(DISTINCT word_id) as count
+    FROM word_review_items_history
+    WHERE study_session_id = ?
+''')
+
+# Order of the values stored per word in a session report
+SESSION_WORD_COLUMNS = ('id', 'kanji', 'romaji', 'english', 'session_correct_count', 'session_wrong_count')
+
+INSERT_SESSION_REPORT = queries.register('study_sessions.insert_session_report', '''
+    INSERT OR IGNORE INTO study_session_reports (study_session_id, review_items_count, correct_count, wrong_count, words)
+    VALUES (?, ?, ?, ?, ?)
+''')
+
+def format_event(event):
+  lines = [f"event: {event['type']}"]
+  if 'review_items_count' in event:
+    lines.append(f"id: {event['review_items_count']}")
+  lines.append(f"data: {json.dumps(event)}")
+  return '\n'.join(lines) + '\n\n'
+
+def study_session_not_found(cursor, group_id, study_activity_id):
+  # Only reached when the insert failed its foreign keys, so work out which
+  # reference was missing to keep the specific 404 responses
+  cursor.execute(GROUP_EXISTS, (group_id,))
+  if not cursor.fetchone():
+    return jsonify({
+      'error': 'Group not found',
+      'group_id': group_id
+    }), 404
+
+  return jsonify({
+    'error': 'Study activity not found',
+    'study_activity_id': study_activity_id
+  }), 404
 
 def load(app):
-  # todo /study_sessions POST
 
   @app.route('/api/study_sessions', methods=['GET'])
   @cross_origin()
+  @learner_route()
   def get_study_sessions():
     try:
       cursor = app.db.cursor()
@@ -57,46 +187,23 @@ def load(app):
       per_page = request.args.get('per_page', 10, type=int)
       offset = (page - 1) * per_page
 
+      # Narrow the returned columns (?fields=start_time,review_items_count)
+      try:
+        columns = pick_columns(SESSION_LIST_COLUMNS, request.args.get('fields'))
+      except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
       # Get total count
-      cursor.execute('''
-        SELECT COUNT(*) as count 
-        FROM study_sessions ss
-        JOIN groups g ON g.id = ss.group_id
-        JOIN study_activities sa ON sa.id = ss.study_activity_id
-      ''')
+      cursor.execute(COUNT_SESSIONS)
       total_count = cursor.fetchone()['count']
 
       # Get paginated sessions
-      cursor.execute('''
-        SELECT 
-          ss.id,
-          ss.group_id,
-          g.name as group_name,
-          sa.id as activity_id,
-          sa.name as activity_name,
-          ss.created_at,
-          COUNT(wri.id) as review_items_count
-        FROM study_sessions ss
-        JOIN groups g ON g.id = ss.group_id
-        JOIN study_activities sa ON sa.id = ss.study_activity_id
-        LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
-        GROUP BY ss.id
-        ORDER BY ss.created_at DESC
-        LIMIT ? OFFSET ?
-      ''', (per_page, offset))
-      sessions = cursor.fetchall()
+      sessions = fetch_dicts(
+        cursor, columns, LIST_SESSIONS.statement('start_time', 'desc', columns), (per_page, offset)
+      )
 
       return jsonify({
-        'items': [{
-          'id': session['id'],
-          'group_id': session['group_id'],
-          'group_name': session['group_name'],
-          'activity_id': session['activity_id'],
-          'activity_name': session['activity_name'],
-          'start_time': session['created_at'],
-          'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
-          'review_items_count': session['review_items_count']
-        } for session in sessions],
+        'items': sessions,
         'total': total_count,
         'page': page,
         'per_page': per_page,
@@ -107,27 +214,13 @@ def load(app):
 
   @app.route('/api/study_sessions/<id>', methods=['GET'])
   @cross_origin()
+  @learner_route()
   def get_study_session(id):
     try:
       cursor = app.db.cursor()
       
-      # Get session details
-      cursor.execute('''
-        SELECT 
-          ss.id,
-          ss.group_id,
-          g.name as group_name,
-          sa.id as activity_id,
-          sa.name as activity_name,
-          ss.created_at,
-          COUNT(wri.id) as review_items_count
-        FROM study_sessions ss
-        JOIN groups g ON g.id = ss.group_id
-        JOIN study_activities sa ON sa.id = ss.study_activity_id
-        LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
-        WHERE ss.id = ?
-        GROUP BY ss.id
-      ''', (id,))
+      # Get session details, with the stored report if the session is closed
+      cursor.execute(GET_SESSION, (id,))
       
       session = cursor.fetchone()
       if not session:
@@ -138,31 +231,19 @@ def load(app):
       per_page = request.args.get('per_page', 10, type=int)
       offset = (page - 1) * per_page
 
-      # Get the words reviewed in this session with their review status
-      cursor.execute('''
-        SELECT 
-          w.*,
-          COALESCE(SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END), 0) as session_correct_count,
-          COALESCE(SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END), 0) as session_wrong_count
-        FROM words w
-        JOIN word_review_items wri ON wri.word_id = w.id
-        WHERE wri.study_session_id = ?
-        GROUP BY w.id
-        ORDER BY w.kanji
-        LIMIT ? OFFSET ?
-      ''', (id, per_page, offset))
-      
-      words = cursor.fetchall()
-
-      # Get total count of words
-      cursor.execute('''
-        SELECT COUNT(DISTINCT w.id) as count
-        FROM words w
-        JOIN word_review_items wri ON wri.word_id = w.id
-        WHERE wri.study_session_id = ?
-      ''', (id,))
-      
-      total_count = cursor.fetchone()['count']
+      if session['closed_at'] is not None:
+        # Closed sessions are served from their report without aggregating
+        report_words = json.loads(session['report_words'])
+        words = [dict(zip(SESSION_WORD_COLUMNS, word)) for word in report_words[offset:offset + per_page]]
+        total_count = len(report_words)
+      else:
+        # Get the words reviewed in this session with their review status
+        cursor.execute(GET_SESSION_WORDS_PAGE, (id, per_page, offset))
+        words = cursor.fetchall()
+
+        # Get total count of words
+        cursor.execute(COUNT_SESSION_WORDS, (id,))
+        total_count = cursor.fetchone()['count']
 
       return jsonify({
         'session': {
@@ -173,6 +254,7 @@ def load(app):
           'activity_name': session['activity_name'],
           'start_time': session['created_at'],
           'end_time': session['created_at'],  # For now, just use the same time
+          'closed_at': session['closed_at'],
           'review_items_count': session['review_items_count']
         },
         'words': [{
@@ -191,8 +273,140 @@ def load(app):
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
+  @app.route('/api/study_sessions/<int:session_id>/events', methods=['GET'])
+  @cross_origin()
+  @learner_route()
+  def get_study_session_events(session_id):
+    """Stream a session's reviews as Server-Sent Events.
+
+    Sends a `snapshot` event with the current counters, then a `review`
+    event for every later review recorded by this process, and a `closed`
+    event when the session is closed. Comments are sent as keep-alives
+    while the session is idle. The broker is in-process: with several
+    workers, reviews recorded by another worker are not streamed.
+    """
+    # Subscribe before reading the snapshot so no review falls in between;
+    # reviews already counted in the snapshot are skipped below
+    subscription = app.events.subscribe((app.db.learner(), session_id))
+    try:
+      cursor = app.db.cursor()
+      cursor.execute(GET_SESSION, (session_id,))
+      session = cursor.fetchone()
+    except Exception as e:
+      subscription.close()
+      return jsonify({"error": str(e)}), 500
+
+    if not session:
+      subscription.close()
+      return jsonify({"error": "Study session not found"}), 404
+
+    snapshot = {
+      'type': 'snapshot',
+      'review_items_count': session['review_items_count'],
+      'correct_count': session['correct_count'],
+      'wrong_count': session['wrong_count'],
+      'closed_at': session['closed_at']
+    }
+    keep_alive = app.config.get('SSE_KEEP_ALIVE', 15)
+
+    def stream():
+      try:
+        yield format_event(snapshot)
+        if snapshot['closed_at'] is not None:
+          return
+        while True:
+          event = subscription.get(timeout=keep_alive)
+          if event is None:
+            yield ': keep-alive\n\n'
+            continue
+          if event['type'] == 'review' and event['review_items_count'] <= snapshot['review_items_count']:
+            continue
+          yield format_event(event)
+          if event['type'] == 'closed':
+            return
+      finally:
+        subscription.close()
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+      'Cache-Control': 'no-cache',
+      'X-Accel-Buffering': 'no'
+    })
+
+  @app.route('/api/study_sessions/<int:session_id>/close', methods=['POST'])
+  @cross_origin()
+  @learner_route()
+  def close_study_session(session_id):
+    """Close a study session and store its report.
+
+    The per-word results are computed once and saved in
+    study_session_reports; the session detail endpoint serves closed
+    sessions from there and no further reviews are accepted.
+
+    Returns:
+        200: The session was already closed, returns the stored report
+        201: Session closed, returns the new report
+        404: Session not found
+        500: Server error
+    """
+    try:
+      cursor = app.db.cursor()
+
+      cursor.execute(GET_SESSION, (session_id,))
+      session = cursor.fetchone()
+      if not session:
+        return jsonify({
+          'error': 'Study session not found',
+          'session_id': session_id
+        }), 404
+
+      status = 200
+      if session['closed_at'] is None:
+        # Take the write lock before reading the counters and words, so no
+        # review lands between the snapshot and the report
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute(GET_SESSION, (session_id,))
+        session = cursor.fetchone()
+        if not session:
+          app.db.get().rollback()
+          return jsonify({
+            'error': 'Study session not found',
+            'session_id': session_id
+          }), 404
+        cursor.execute(GET_SESSION_WORDS, (session_id,))
+        words = [tuple(word[column] for column in SESSION_WORD_COLUMNS) for word in cursor.fetchall()]
+        cursor.execute(INSERT_SESSION_REPORT, (
+          session_id,
+          session['review_items_count'],
+          session['correct_count'],
+          session['wrong_count'],
+          json.dumps(words, ensure_ascii=False)
+        ))
+        # Another request may have closed the session in the meantime
+        status = 201 if cursor.rowcount else 200
+        app.db.commit()
+        if status == 201:
+          app.events.publish((app.db.learner(), session_id), {'type': 'closed'})
+
+        cursor.execute(GET_SESSION, (session_id,))
+        session = cursor.fetchone()
+
+      return jsonify({
+        'study_session_id': session['id'],
+        'closed_at': session['closed_at'],
+        'review_items_count': session['review_items_count'],
+        'correct_count': session['correct_count'],
+        'wrong_count': session['wrong_count'],
+        'words_count': len(json.loads(session['report_words']))
+      }), status
+    except Exception as e:
+      app.db.get().rollback()
+      app.logger.error(f"Unexpected error in close_study_session: {str(e)}")
+      return jsonify({"error": "An unexpected error occurred"}), 500
+
   @app.route('/api/study_sessions', methods=['POST'])
+  @app.route('/api/study-sessions', methods=['POST'])
   @cross_origin()
+  @learner_route(create=True)
   def create_study_session():
     """Create a new study session.
     
@@ -211,8 +425,8 @@ def load(app):
     cursor = None
     try:
       # Get and validate JSON payload
-      data = request.get_json()
-      if not data:
+      data = request.get_json(silent=True)
+      if not isinstance(data, dict):
         return jsonify({'error': 'Invalid JSON payload'}), 400
 
       # Extract and validate required fields
@@ -237,38 +451,30 @@ def load(app):
 
       cursor = app.db.cursor()
 
-      # Validate group_id exists
-      cursor.execute('SELECT id FROM groups WHERE id = ?', (group_id,))
-      if not cursor.fetchone():
-        return jsonify({
-          'error': 'Group not found',
-          'group_id': group_id
-        }), 404
-
-      # Validate study_activity_id exists
-      cursor.execute('SELECT id FROM study_activities WHERE id = ?', (study_activity_id,))
-      if not cursor.fetchone():
-        return jsonify({
-          'error': 'Study activity not found',
-          'study_activity_id': study_activity_id
-        }), 404
-
-      # Insert new study session
-      cursor.execute(INSERT_STUDY_SESSION, (group_id, study_activity_id))
+      # Insert new study session, foreign keys validate group and activity
+      try:
+        cursor.execute(INSERT_STUDY_SESSION, (group_id, study_activity_id))
+        session = cursor.fetchone()
+      except sqlite3.IntegrityError as e:
+        if 'FOREIGN KEY' not in str(e):
+          raise
+        app.db.get().rollback()
+        return study_session_not_found(cursor, group_id, study_activity_id)
+
+      # Learner shards cannot enforce foreign keys into the shared vocabulary,
+      # a missing group or activity shows up as a missing name instead
+      if session['group_name'] is None or session['activity_name'] is None:
+        app.db.get().rollback()
+        return study_session_not_found(cursor, group_id, study_activity_id)
       
-      # Get the ID of the newly created session
-      new_session_id = cursor.lastrowid
+      rollups.record_session(cursor, group_id, study_activity_id)
       
       # Commit the transaction
       app.db.commit()
-      
-      # Fetch the complete session data to return
-      cursor.execute(GET_NEW_SESSION, (new_session_id,))
-      
-      session = cursor.fetchone()
+      app.membership.add_session(session['id'], group_id, app.db.learner())
       
       # Return the created session data
-      app.logger.info(f"Created study session {new_session_id} for group {group_id}")
+      app.logger.info(f"Created study session {session['id']} for group {group_id}")
       return jsonify({
           'id': session['id'],
           'group_id': session['group_id'],
@@ -295,11 +501,11 @@ def load(app):
     finally:
       if cursor:
         cursor.close()
-      if 'db' in g:
-        g.pop('db', None)
+      app.db.close()
 
   @app.route('/api/study_sessions/<int:session_id>/words/<int:word_id>/review', methods=['POST'])
   @cross_origin()
+  @learner_route()
   def create_word_review(session_id, word_id):
     """Record a word review result in a study session.
     
@@ -322,6 +528,7 @@ def load(app):
         }
         400: Invalid request (bad JSON or missing fields)
         404: Session or word not found
+        409: Session is closed
         500: Server error
         
     Foreign Key Constraints:
@@ -331,8 +538,8 @@ def load(app):
     cursor = None
     try:
         # Get and validate JSON payload
-        data = request.get_json()
-        if not data:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
             return jsonify({'error': 'Invalid JSON payload'}), 400
 
         # Extract and validate correct field
@@ -354,30 +561,64 @@ def load(app):
 
         cursor = app.db.cursor()
 
-        # Validate study session exists
-        cursor.execute(VALIDATE_SESSION, (session_id,))
-        session = cursor.fetchone()
-        if not session:
+        # Validate study session exists (answered from the membership index)
+        group_id = app.membership.session_group(cursor, session_id, app.db.learner())
+        if group_id is None:
             return jsonify({
                 'error': 'Study session not found',
                 'session_id': session_id
             }), 404
 
-        # Validate word exists
-        cursor.execute(VALIDATE_WORD, (word_id, session['group_id']))
-        word = cursor.fetchone()
-        if not word:
+        # Validate word exists in the session's group
+        if not app.membership.group_has_word(cursor, group_id, word_id):
             return jsonify({
                 'error': 'Word not found or not in session group',
                 'word_id': word_id,
-                'group_id': session['group_id']
+                'group_id': group_id
             }), 404
 
-        # Insert the word review record
-        cursor.execute(INSERT_WORD_REVIEW, (word_id, session_id, correct))
+        # Insert the word review record and fold it into the rollups
+        try:
+            cursor.execute(INSERT_WORD_REVIEW, (word_id, session_id, correct, session_id, session_id))
+        except sqlite3.IntegrityError:
+            # The word was deleted since the index cached it
+            app.db.get().rollback()
+            app.membership.drop_group_word(group_id, word_id)
+            return jsonify({
+                'error': 'Word not found or not in session group',
+                'word_id': word_id,
+                'group_id': group_id
+            }), 404
+        if cursor.rowcount == 0:
+            app.db.get().rollback()
+            # The index may be stale (e.g. after a reset in another worker),
+            # so ask the database whether the session still exists
+            app.membership.drop_session(session_id, app.db.learner())
+            if app.membership.session_group(cursor, session_id, app.db.learner()) is None:
+                return jsonify({
+                    'error': 'Study session not found',
+                    'session_id': session_id
+                }), 404
+            return jsonify({
+                'error': 'Study session is closed',
+                'session_id': session_id
+            }), 409
+        counters = rollups.record_review(cursor, session_id, word_id, correct)
 
         # Get the ID of the newly created review
         app.db.commit()
+        created_at = datetime.utcnow().isoformat()
+
+        # Push the review and the running counters to live session viewers
+        app.events.publish((app.db.learner(), session_id), {
+            'type': 'review',
+            'word_id': word_id,
+            'correct': correct,
+            'created_at': created_at,
+            'review_items_count': counters['review_items_count'],
+            'correct_count': counters['correct_count'],
+            'wrong_count': counters['wrong_count']
+        })
 
         # Return the created review data
         return jsonify({
@@ -385,7 +626,7 @@ def load(app):
             'word_id': word_id,
             'study_session_id': session_id,
             'correct': correct,
-            'created_at': datetime.utcnow().isoformat()
+            'created_at': created_at
         }), 201
 
     except ValueError as e:
@@ -396,22 +637,31 @@ def load(app):
     finally:
         if cursor:
             cursor.close()
-        if 'db' in g:
-            g.pop('db', None)
+        app.db.close()
 
   @app.route('/api/study_sessions/reset', methods=['POST'])
   @cross_origin()
+  @learner_route()
   def reset_study_sessions():
     try:
       cursor = app.db.cursor()
       
-      # First delete all word review items since they have foreign key constraints
-      cursor.execute('DELETE FROM word_review_items')
+      # First delete all word review items since they have foreign key constraints.
+      # Only recent reviews are kept in word_review_items, archived months are
+      # dropped as whole partitions.
+      cursor.execute(DELETE_REVIEW_ITEMS)
+      drop_review_partitions(cursor)
+      rollups.clear(cursor)
+      cursor.execute(DELETE_SESSION_REPORTS)
       
       # Then delete all study sessions
-      cursor.execute('DELETE FROM study_sessions')
+      cursor.execute(DELETE_SESSIONS)
+
+      # Let syncing clients know to drop their copies
+      cursor.execute(LOG_CLEAR_HISTORY)
       
       app.db.commit()
+      app.membership.clear_sessions(app.db.learner())
       
       return jsonify({"message": "Study history cleared successfully"}), 200
     except Exception as e:
@@ -0,0 +1,149 @@
+from flask import request, jsonify
+from flask_cors import cross_origin
+import json
+
+from lib.db import learner_route
+from lib.queries import queries
+
+# Columns sent to syncing clients for each table in the change log
+SYNC_COLUMNS = {
+  'words': ('id', 'kanji', 'romaji', 'english'),
+  'groups': ('id', 'name', 'words_count'),
+  'study_sessions': ('id', 'group_id', 'study_activity_id', 'created_at'),
+  'word_review_items': ('id', 'word_id', 'study_session_id', 'correct', 'created_at'),
+}
+
+# Archived review items are read back through the history view
+SYNC_SOURCES = {
+  'word_review_items': 'word_review_items_history',
+}
+
+# The rows of each table by id, passed as one JSON array of ids
+FETCH_ROWS = {
+  table_name: queries.register(f'sync.fetch_rows[{table_name}]', f'''
+    SELECT {', '.join(columns)}
+    FROM {SYNC_SOURCES.get(table_name, table_name)}
+    WHERE id IN (SELECT value FROM json_each(?))
+    ORDER BY id
+  ''')
+  for table_name, columns in SYNC_COLUMNS.items()
+}
+
+GET_CHANGES = queries.register('sync.get_changes', '''
+  SELECT version, table_name, row_id, operation
+  FROM change_log
+  WHERE version > ?
+  ORDER BY version
+  LIMIT ?
+''')
+
+# Tables logged in the shared database; learner shards log the others
+VOCAB_TABLES = ('words', 'groups')
+
+# Only valid on shard connections, which attach DATABASE as `vocab`, so it
+# is not compiled at startup
+GET_VOCAB_CHANGES = queries.alias('sync.get_vocab_changes', '''
+  SELECT version, table_name, row_id, operation
+  FROM vocab.change_log
+  WHERE version > ? AND table_name IN ('words', 'groups')
+  ORDER BY version
+  LIMIT ?
+''')
+
+def collapse_changes(changes):
+  """Reduce a page of change log entries to the net change per table.
+
+  Later entries win, so a row inserted and then deleted within the page is
+  only reported as deleted, and a 'clear' drops everything logged for the
+  table before it.
+  """
+  tables = {}
+  for change in changes:
+    table = tables.setdefault(change['table_name'], {'cleared': False, 'rows': {}})
+    if change['operation'] == 'clear':
+      table['cleared'] = True
+      table['rows'] = {}
+    else:
+      table['rows'].pop(change['row_id'], None)
+      table['rows'][change['row_id']] = change['operation']
+  return tables
+
+def parse_cursor(value):
+  """(vocab version, shard version) of a sharded sync cursor.
+
+  Cursors look like `<vocab>.<shard>`. A plain version is taken as the
+  shard's, with the vocabulary sent again from the start.
+  """
+  if not value:
+    return 0, 0
+  vocab, _, shard = value.rpartition('.')
+  return max(0, int(vocab or 0)), max(0, int(shard))
+
+def read_changes(cursor, sql, since, limit):
+  """Up to `limit` changes after `since`, whether more are waiting and the
+  version reached."""
+  cursor.execute(sql, (since, limit + 1))
+  changes = cursor.fetchall()
+  has_more = len(changes) > limit
+  changes = changes[:limit]
+  return changes, has_more, changes[-1]['version'] if changes else since
+
+def fetch_tables(cursor, changes):
+  tables = {}
+  for table_name, table in collapse_changes(changes).items():
+    columns = SYNC_COLUMNS[table_name]
+    upserted = [row_id for row_id, operation in table['rows'].items() if operation == 'upsert']
+
+    rows = []
+    if upserted:
+      cursor.execute(FETCH_ROWS[table_name], (json.dumps(upserted),))
+      rows = [tuple(row) for row in cursor.fetchall()]
+
+    tables[table_name] = {
+      'cleared': table['cleared'],
+      'columns': columns,
+      'rows': rows,
+      'deleted': [row_id for row_id, operation in table['rows'].items() if operation == 'delete']
+    }
+  return tables
+
+def load(app):
+  # Endpoint: GET /sync?since=<version> for clients keeping a local cache
+  @app.route('/sync', methods=['GET'])
+  @cross_origin()
+  @learner_route()
+  def get_sync():
+    try:
+      cursor = app.db.cursor()
+
+      limit = min(max(1, request.args.get('limit', 500, type=int)), 5000)
+
+      if app.db.learner() is None:
+        since = max(0, request.args.get('since', 0, type=int))
+        changes, has_more, version = read_changes(cursor, GET_CHANGES, since, limit)
+        return jsonify({
+          'version': version,
+          'has_more': has_more,
+          'changes': fetch_tables(cursor, changes)
+        })
+
+      # A learner's shard only logs their sessions and reviews; words and
+      # groups are logged in the shared database. Both logs are read with a
+      # combined cursor, vocabulary first, in pages of at most `limit`.
+      try:
+        vocab_since, shard_since = parse_cursor(request.args.get('since'))
+      except ValueError:
+        return jsonify({"error": "since must be a version returned by /sync"}), 400
+      vocab_changes, vocab_more, vocab_version = read_changes(cursor, GET_VOCAB_CHANGES, vocab_since, limit)
+      shard_changes, shard_more, shard_version = read_changes(
+        cursor, GET_CHANGES, shard_since, limit - len(vocab_changes)
+      )
+      tables = fetch_tables(cursor, vocab_changes)
+      tables.update(fetch_tables(cursor, shard_changes))
+      return jsonify({
+        'version': f'{vocab_version}.{shard_version}',
+        'has_more': vocab_more or shard_more,
+        'changes': tables
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
@@ -2,6 +2,101 @@ from flask import request, jsonify, g
 from flask_cors import cross_origin
 import json
 
+from lib.db import learner_route
+from lib.parts import fetch_word_parts
+from lib.queries import queries
+from lib.serializers import fetch_dicts, pick_columns
+
+# Output keys of a word in the list endpoints and the expressions behind them
+WORD_LIST_COLUMNS = (
+  ('id', 'w.id'),
+  ('kanji', 'w.kanji'),
+  ('romaji', 'w.romaji'),
+  ('english', 'w.english'),
+  ('correct_count', 'COALESCE(r.correct_count, 0)'),
+  ('wrong_count', 'COALESCE(r.wrong_count, 0)'),
+)
+
+# Weakest words only come from reviewed words, so they also carry the rate
+WEAKEST_WORD_COLUMNS = WORD_LIST_COLUMNS + (
+  ('error_rate', 'r.wrong_count * 1.0 / (r.correct_count + r.wrong_count)'),
+)
+
+# A word's reviews, hot and archived, split into equal-count buckets in
+# review order. Filtering the history view by word reaches every
+# partition's (word_id, created_at, correct) index.
+GET_WORD_HISTORY = queries.register('words.history', '''
+  SELECT
+    MIN(created_at) as start,
+    MAX(created_at) as end,
+    COUNT(*) as review_count,
+    SUM(correct) as correct_count
+  FROM (
+    SELECT
+      created_at,
+      correct,
+      (ROW_NUMBER() OVER (ORDER BY created_at, id) - 1) * ? / COUNT(*) OVER () as bucket
+    FROM word_review_items_history
+    WHERE word_id = ?
+  )
+  GROUP BY bucket
+  ORDER BY bucket
+''')
+
+# Sort keys of the word lists and the expressions they order by
+WORD_SORTS = {key: expression for key, expression in WORD_LIST_COLUMNS if key != 'id'}
+
+LIST_WORDS = queries.register_sorted('words.list', '''
+  SELECT {columns}
+  FROM words w
+  LEFT JOIN word_reviews r ON w.id = r.word_id
+  ORDER BY {sort} {order}
+  LIMIT ? OFFSET ?
+''', WORD_LIST_COLUMNS, WORD_SORTS)
+
+COUNT_WORDS = queries.register('words.count', 'SELECT COUNT(*) FROM words')
+
+# Walk the error rate index from the top and stop after k words, so the cost
+# does not depend on the size of the vocabulary. Ties go to the word with
+# more wrong answers.
+WEAKEST_WORDS_TEMPLATE = '''
+  SELECT {{columns}}
+  FROM word_reviews r
+  JOIN words w ON w.id = r.word_id
+  {where}
+  ORDER BY {{sort}} {{order}}, r.wrong_count {{order}}
+  LIMIT ?
+'''
+
+WEAKEST_WORD_SORTS = {'error_rate': 'r.wrong_count * 1.0 / (r.correct_count + r.wrong_count)'}
+
+LIST_WEAKEST_WORDS = queries.register_sorted(
+  'words.weakest', WEAKEST_WORDS_TEMPLATE.format(where=''), WEAKEST_WORD_COLUMNS, WEAKEST_WORD_SORTS
+)
+
+LIST_WEAKEST_GROUP_WORDS = queries.register_sorted('words.weakest_in_group', WEAKEST_WORDS_TEMPLATE.format(where='''
+  WHERE EXISTS (
+    SELECT 1 FROM word_groups wg
+    WHERE wg.group_id = ? AND wg.word_id = r.word_id
+  )
+'''), WEAKEST_WORD_COLUMNS, WEAKEST_WORD_SORTS)
+
+# A word with its review counters and groups
+GET_WORD = queries.register('words.get', '''
+  SELECT w.id, w.kanji, w.romaji, w.english,
+         COALESCE(r.correct_count, 0) AS correct_count,
+         COALESCE(r.wrong_count, 0) AS wrong_count,
+         GROUP_CONCAT(DISTINCT g.id || '::' || g.name) as groups
+  FROM words w
+  LEFT JOIN word_reviews r ON w.id = r.word_id
+  LEFT JOIN word_groups wg ON w.id = wg.word_id
+  LEFT JOIN groups g ON wg.group_id = g.id
+  WHERE w.id = ?
+  GROUP BY w.id
+''')
+
+WORD_EXISTS = queries.register('words.exists', 'SELECT id FROM words WHERE id = ?')
+
 def load(app):
   # Endpoint: GET /words with pagination (50 words per page)
   @app.route('/words', methods=['GET'])
@@ -22,41 +117,32 @@ def load(app):
       order = request.args.get('order', 'asc')  # Default to ascending order
 
       # Validate sort_by and order
-      valid_columns = ['kanji', 'romaji', 'english', 'correct_count', 'wrong_count']
-      if sort_by not in valid_columns:
+      if sort_by not in LIST_WORDS.sorts:
         sort_by = 'kanji'
       if order not in ['asc', 'desc']:
         order = 'asc'
 
+      # Narrow the returned columns (?fields=kanji,romaji)
+      try:
+        columns = pick_columns(WORD_LIST_COLUMNS, request.args.get('fields'))
+      except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
       # Query to fetch words with sorting
-      cursor.execute(f'''
-        SELECT w.id, w.kanji, w.romaji, w.english, 
-            COALESCE(r.correct_count, 0) AS correct_count,
-            COALESCE(r.wrong_count, 0) AS wrong_count
-        FROM words w
-        LEFT JOIN word_reviews r ON w.id = r.word_id
-        ORDER BY {sort_by} {order}
-        LIMIT ? OFFSET ?
-      ''', (words_per_page, offset))
-
-      words = cursor.fetchall()
+      words_data = fetch_dicts(
+        cursor, columns, LIST_WORDS.statement(sort_by, order, columns), (words_per_page, offset)
+      )
 
       # Query the total number of words
-      cursor.execute('SELECT COUNT(*) FROM words')
+      cursor.execute(COUNT_WORDS)
       total_words = cursor.fetchone()[0]
       total_pages = (total_words + words_per_page - 1) // words_per_page
 
-      # Format the response
-      words_data = []
-      for word in words:
-        words_data.append({
-          "id": word["id"],
-          "kanji": word["kanji"],
-          "romaji": word["romaji"],
-          "english": word["english"],
-          "correct_count": word["correct_count"],
-          "wrong_count": word["wrong_count"]
-        })
+      # Optionally include the per-character parts (?include=parts)
+      if request.args.get('include') == 'parts':
+        parts = fetch_word_parts(cursor, [word["id"] for word in words_data])
+        for word in words_data:
+          word["parts"] = parts[word["id"]]
 
       return jsonify({
         "words": words_data,
@@ -70,6 +156,36 @@ def load(app):
     finally:
       app.db.close()
 
+  # Endpoint: GET /words/weakest to get the words answered wrong most often
+  @app.route('/words/weakest', methods=['GET'])
+  @cross_origin()
+  @learner_route()
+  def get_weakest_words():
+    try:
+      cursor = app.db.cursor()
+
+      k = min(max(1, request.args.get('k', 10, type=int)), 100)
+      group_id = request.args.get('group_id', type=int)
+
+      # Narrow the returned columns (?fields=kanji,error_rate)
+      try:
+        columns = pick_columns(WEAKEST_WORD_COLUMNS, request.args.get('fields'))
+      except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+      if group_id is None:
+        statement, params = LIST_WEAKEST_WORDS, (k,)
+      else:
+        statement, params = LIST_WEAKEST_GROUP_WORDS, (group_id, k)
+      words = fetch_dicts(cursor, columns, statement.statement('error_rate', 'desc', columns), params)
+
+      return jsonify({
+        "words": words
+      })
+
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
   # Endpoint: GET /words/:id to get a single word with its details
   @app.route('/words/<int:word_id>', methods=['GET'])
   @cross_origin()
@@ -78,18 +194,7 @@ def load(app):
       cursor = app.db.cursor()
       
       # Query to fetch the word and its details
-      cursor.execute('''
-        SELECT w.id, w.kanji, w.romaji, w.english,
-               COALESCE(r.correct_count, 0) AS correct_count,
-               COALESCE(r.wrong_count, 0) AS wrong_count,
-               GROUP_CONCAT(DISTINCT g.id || '::' || g.name) as groups
-        FROM words w
-        LEFT JOIN word_reviews r ON w.id = r.word_id
-        LEFT JOIN word_groups wg ON w.id = wg.word_id
-        LEFT JOIN groups g ON wg.group_id = g.id
-        WHERE w.id = ?
-        GROUP BY w.id
-      ''', (word_id,))
+      cursor.execute(GET_WORD, (word_id,))
       
       word = cursor.fetchone()
       
@@ -105,6 +210,8 @@ def load(app):
             "id": int(group_id),
             "name": group_name
           })
+
+      parts = fetch_word_parts(cursor, [word["id"]])
       
       return jsonify({
         "word": {
@@ -114,9 +221,43 @@ def load(app):
           "english": word["english"],
           "correct_count": word["correct_count"],
           "wrong_count": word["wrong_count"],
-          "groups": groups
+          "groups": groups,
+          "parts": parts[word["id"]]
         }
       })
       
     except Exception as e:
-      return jsonify({"error": str(e)}), 500
\ No newline at end of file
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: GET /words/:id/history?points=50 for the word's learning curve
+  @app.route('/words/<int:word_id>/history', methods=['GET'])
+  @cross_origin()
+  @learner_route()
+  def get_word_history(word_id):
+    try:
+      cursor = app.db.cursor()
+
+      points = min(max(1, request.args.get('points', 50, type=int)), 500)
+
+      cursor.execute(WORD_EXISTS, (word_id,))
+      if not cursor.fetchone():
+        return jsonify({"error": "Word not found"}), 404
+
+      # Words with fewer reviews than points get one point per review
+      cursor.execute(GET_WORD_HISTORY, (points, word_id))
+      history = [{
+        "start": point["start"],
+        "end": point["end"],
+        "review_count": point["review_count"],
+        "correct_count": point["correct_count"],
+        "wrong_count": point["review_count"] - point["correct_count"],
+        "accuracy": point["correct_count"] / point["review_count"]
+      } for point in cursor.fetchall()]
+
+      return jsonify({
+        "word_id": word_id,
+        "total_reviews": sum(point["review_count"] for point in history),
+        "points": history
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
@@ -0,0 +1,40 @@
+"""Production entry point for the backend.
+
+Serves the app over ASGI with uvicorn instead of the Flask development
+server:
+
+    python serve.py --host 0.0.0.0 --port 5000 --threads 16 --workers 4
+
+Any other ASGI server can load `serve:asgi_app` directly.
+"""
+import argparse
+import os
+
+from app import create_app
+from lib.asgi import OffloadedWsgiToAsgi
+
+asgi_app = OffloadedWsgiToAsgi(
+  create_app(),
+  threads=int(os.environ.get('SERVE_THREADS', 16)),
+  stream_threads=int(os.environ.get('SERVE_STREAM_THREADS', 64))
+)
+
+def main():
+  import uvicorn
+
+  parser = argparse.ArgumentParser(description='Serve the lang-portal backend over ASGI')
+  parser.add_argument('--host', default='127.0.0.1')
+  parser.add_argument('--port', type=int, default=5000)
+  parser.add_argument('--threads', type=int, default=16, help='Requests running the app at once, per worker')
+  parser.add_argument('--stream-threads', type=int, default=64, help='Streamed responses (events, exports) sending at once, per worker')
+  parser.add_argument('--workers', type=int, default=1, help='Worker processes')
+  args = parser.parse_args()
+
+  # Workers import serve:asgi_app themselves and read the pool sizes from
+  # the environment
+  os.environ['SERVE_THREADS'] = str(args.threads)
+  os.environ['SERVE_STREAM_THREADS'] = str(args.stream_threads)
+  uvicorn.run('serve:asgi_app', host=args.host, port=args.port, workers=args.workers, log_level='warning')
+
+if __name__ == '__main__':
+  main()
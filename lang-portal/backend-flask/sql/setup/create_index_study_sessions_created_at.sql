@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_study_sessions_created_at ON study_sessions (created_at);
\ No newline at end of file
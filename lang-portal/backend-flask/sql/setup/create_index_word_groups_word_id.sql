@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_word_groups_word_id ON word_groups (word_id);
\ No newline at end of file
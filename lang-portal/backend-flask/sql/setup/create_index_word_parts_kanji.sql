@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_word_parts_kanji ON word_parts (kanji);
\ No newline at end of file
@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_word_review_items_study_session_id ON word_review_items (study_session_id);
\ No newline at end of file
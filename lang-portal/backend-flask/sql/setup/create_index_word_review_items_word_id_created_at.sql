@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_word_review_items_word_id_created_at ON word_review_items(word_id, created_at, correct);
\ No newline at end of file
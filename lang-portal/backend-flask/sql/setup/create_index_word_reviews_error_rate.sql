@@ -0,0 +1,6 @@
+-- Orders words by error rate for GET /words/weakest. Queries must repeat the
+-- expression exactly for SQLite to use this index.
+CREATE INDEX IF NOT EXISTS idx_word_reviews_error_rate ON word_reviews (
+  (wrong_count * 1.0 / (correct_count + wrong_count)) DESC,
+  wrong_count DESC
+);
\ No newline at end of file
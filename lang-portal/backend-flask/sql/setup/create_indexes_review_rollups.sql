@@ -0,0 +1,13 @@
+-- Lookups by group, word or activity over a time range
+CREATE INDEX IF NOT EXISTS idx_review_rollups_hourly_group_id ON review_rollups_hourly (group_id, bucket);
+CREATE INDEX IF NOT EXISTS idx_review_rollups_hourly_word_id ON review_rollups_hourly (word_id, bucket);
+CREATE INDEX IF NOT EXISTS idx_review_rollups_hourly_study_activity_id ON review_rollups_hourly (study_activity_id, bucket);
+CREATE INDEX IF NOT EXISTS idx_review_rollups_daily_group_id ON review_rollups_daily (group_id, bucket);
+CREATE INDEX IF NOT EXISTS idx_review_rollups_daily_word_id ON review_rollups_daily (word_id, bucket);
+CREATE INDEX IF NOT EXISTS idx_review_rollups_daily_study_activity_id ON review_rollups_daily (study_activity_id, bucket);
+-- The rollups without words are read in bucket order (their primary key)
+-- or by group or activity
+CREATE INDEX IF NOT EXISTS idx_review_rollups_group_hourly_group_id ON review_rollups_group_hourly (group_id, bucket);
+CREATE INDEX IF NOT EXISTS idx_review_rollups_group_hourly_study_activity_id ON review_rollups_group_hourly (study_activity_id, bucket);
+CREATE INDEX IF NOT EXISTS idx_review_rollups_group_daily_group_id ON review_rollups_group_daily (group_id, bucket);
+CREATE INDEX IF NOT EXISTS idx_review_rollups_group_daily_study_activity_id ON review_rollups_group_daily (study_activity_id, bucket);
\ No newline at end of file
@@ -0,0 +1,6 @@
+CREATE TABLE IF NOT EXISTS change_log (
+  version INTEGER PRIMARY KEY AUTOINCREMENT,  -- Monotonically increasing version of the write
+  table_name TEXT NOT NULL,  -- The table that was written
+  row_id INTEGER,  -- The id of the written row, NULL when the whole table was cleared
+  operation TEXT NOT NULL  -- 'upsert', 'delete' or 'clear'
+);
\ No newline at end of file
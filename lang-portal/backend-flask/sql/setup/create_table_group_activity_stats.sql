@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS group_activity_stats (
+  group_id INTEGER NOT NULL,
+  study_activity_id INTEGER NOT NULL,
+  sessions_count INTEGER DEFAULT 0,  -- Counter cache for the sessions of the group in this activity
+  PRIMARY KEY (group_id, study_activity_id),
+  FOREIGN KEY (group_id) REFERENCES groups(id),
+  FOREIGN KEY (study_activity_id) REFERENCES study_activities(id)
+);
\ No newline at end of file
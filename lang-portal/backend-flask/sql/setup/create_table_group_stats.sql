@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS group_stats (
+  group_id INTEGER PRIMARY KEY,
+  words_studied INTEGER DEFAULT 0,  -- Words of the group reviewed at least once
+  words_mastered INTEGER DEFAULT 0,  -- Words with >= 80% success over at least 5 reviews
+  correct_count INTEGER DEFAULT 0,  -- Correct reviews in sessions of this group
+  wrong_count INTEGER DEFAULT 0,  -- Wrong reviews in sessions of this group
+  sessions_count INTEGER DEFAULT 0,
+  last_studied_at DATETIME,  -- Timestamp of the latest review in a session of this group
+  FOREIGN KEY (group_id) REFERENCES groups(id)
+);
\ No newline at end of file
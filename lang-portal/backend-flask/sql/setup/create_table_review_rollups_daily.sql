@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS review_rollups_daily (
+  bucket TEXT NOT NULL,  -- The day, e.g. '2025-01-31'
+  word_id INTEGER NOT NULL,
+  group_id INTEGER NOT NULL,
+  study_activity_id INTEGER NOT NULL,
+  correct_count INTEGER DEFAULT 0,
+  wrong_count INTEGER DEFAULT 0,
+  PRIMARY KEY (bucket, word_id, group_id, study_activity_id)
+);
\ No newline at end of file
@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS review_rollups_group_daily (
+  bucket TEXT NOT NULL,  -- The day, e.g. '2025-01-31'
+  group_id INTEGER NOT NULL,
+  study_activity_id INTEGER NOT NULL,
+  correct_count INTEGER DEFAULT 0,
+  wrong_count INTEGER DEFAULT 0,
+  PRIMARY KEY (bucket, group_id, study_activity_id)
+);
\ No newline at end of file
@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS review_rollups_hourly (
+  bucket TEXT NOT NULL,  -- Start of the hour, e.g. '2025-01-31 14:00:00'
+  word_id INTEGER NOT NULL,
+  group_id INTEGER NOT NULL,
+  study_activity_id INTEGER NOT NULL,
+  correct_count INTEGER DEFAULT 0,
+  wrong_count INTEGER DEFAULT 0,
+  PRIMARY KEY (bucket, word_id, group_id, study_activity_id)
+);
\ No newline at end of file
@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS study_session_reports (
+  study_session_id INTEGER PRIMARY KEY,
+  closed_at DATETIME DEFAULT CURRENT_TIMESTAMP,  -- When the session was closed and its counters frozen
+  review_items_count INTEGER NOT NULL,
+  correct_count INTEGER NOT NULL,
+  wrong_count INTEGER NOT NULL,
+  words TEXT NOT NULL,  -- Store the per-word results as JSON array of [id, kanji, romaji, english, correct_count, wrong_count]
+  FOREIGN KEY (study_session_id) REFERENCES study_sessions(id)
+);
\ No newline at end of file
@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS study_session_stats (
+  study_session_id INTEGER PRIMARY KEY,
+  review_items_count INTEGER DEFAULT 0,  -- Counter cache for the reviews in the session
+  correct_count INTEGER DEFAULT 0,
+  wrong_count INTEGER DEFAULT 0,
+  last_activity_at DATETIME,  -- Timestamp of the latest review in the session
+  FOREIGN KEY (study_session_id) REFERENCES study_sessions(id)
+);
\ No newline at end of file
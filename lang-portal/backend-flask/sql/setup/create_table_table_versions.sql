@@ -0,0 +1,4 @@
+CREATE TABLE IF NOT EXISTS table_versions (
+  table_name TEXT PRIMARY KEY,  -- The table that was written
+  version INTEGER NOT NULL  -- Increased by every write to the table
+);
\ No newline at end of file
@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS word_parts (
+  word_id INTEGER NOT NULL,
+  position INTEGER NOT NULL,  -- Order of the part within the word, starting at 0
+  kanji TEXT NOT NULL,  -- The character(s) making up this part
+  romaji TEXT NOT NULL,  -- Store the romaji syllables for the part as JSON array
+  PRIMARY KEY (word_id, position),
+  FOREIGN KEY (word_id) REFERENCES words(id)
+);
\ No newline at end of file
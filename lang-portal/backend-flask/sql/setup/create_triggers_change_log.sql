@@ -0,0 +1,38 @@
+-- Record every write to the synced vocabulary tables in change_log.
+-- Study sessions and review items are logged by
+-- create_triggers_change_log_reviews.sql.
+CREATE TRIGGER IF NOT EXISTS change_log_words_insert
+AFTER INSERT ON words
+BEGIN
+  INSERT INTO change_log (table_name, row_id, operation) VALUES ('words', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_words_update
+AFTER UPDATE ON words
+BEGIN
+  INSERT INTO change_log (table_name, row_id, operation) VALUES ('words', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_words_delete
+AFTER DELETE ON words
+BEGIN
+  INSERT INTO change_log (table_name, row_id, operation) VALUES ('words', OLD.id, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_groups_insert
+AFTER INSERT ON groups
+BEGIN
+  INSERT INTO change_log (table_name, row_id, operation) VALUES ('groups', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_groups_update
+AFTER UPDATE ON groups
+BEGIN
+  INSERT INTO change_log (table_name, row_id, operation) VALUES ('groups', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_groups_delete
+AFTER DELETE ON groups
+BEGIN
+  INSERT INTO change_log (table_name, row_id, operation) VALUES ('groups', OLD.id, 'delete');
+END;
\ No newline at end of file
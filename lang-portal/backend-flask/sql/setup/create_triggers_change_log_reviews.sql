@@ -0,0 +1,26 @@
+-- Record every write to study sessions and review items in change_log.
+-- They are only ever cleared as a whole, which the reset endpoint records as
+-- a single 'clear' entry per table. Learner shards only get these triggers.
+CREATE TRIGGER IF NOT EXISTS change_log_study_sessions_insert
+AFTER INSERT ON study_sessions
+BEGIN
+  INSERT INTO change_log (table_name, row_id, operation) VALUES ('study_sessions', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_study_sessions_update
+AFTER UPDATE ON study_sessions
+BEGIN
+  INSERT INTO change_log (table_name, row_id, operation) VALUES ('study_sessions', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_word_review_items_insert
+AFTER INSERT ON word_review_items
+BEGIN
+  INSERT INTO change_log (table_name, row_id, operation) VALUES ('word_review_items', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_word_review_items_update
+AFTER UPDATE ON word_review_items
+BEGIN
+  INSERT INTO change_log (table_name, row_id, operation) VALUES ('word_review_items', NEW.id, 'upsert');
+END;
\ No newline at end of file
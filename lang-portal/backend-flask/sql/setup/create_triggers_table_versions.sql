@@ -0,0 +1,22 @@
+-- Count writes to study_activities, whose urls are the allowed CORS
+-- origins (see lib/cors.py).
+CREATE TRIGGER IF NOT EXISTS table_versions_study_activities_insert
+AFTER INSERT ON study_activities
+BEGIN
+  INSERT INTO table_versions (table_name, version) VALUES ('study_activities', 1)
+  ON CONFLICT (table_name) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS table_versions_study_activities_update
+AFTER UPDATE ON study_activities
+BEGIN
+  INSERT INTO table_versions (table_name, version) VALUES ('study_activities', 1)
+  ON CONFLICT (table_name) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS table_versions_study_activities_delete
+AFTER DELETE ON study_activities
+BEGIN
+  INSERT INTO table_versions (table_name, version) VALUES ('study_activities', 1)
+  ON CONFLICT (table_name) DO UPDATE SET version = version + 1;
+END;
\ No newline at end of file
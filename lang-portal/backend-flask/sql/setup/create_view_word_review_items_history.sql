@@ -0,0 +1,4 @@
+-- All review items, hot and archived. Rebuilt by lib/archive.py whenever
+-- monthly partitions are added or dropped.
+CREATE VIEW IF NOT EXISTS word_review_items_history AS
+SELECT id, word_id, study_session_id, correct, created_at FROM word_review_items;
\ No newline at end of file
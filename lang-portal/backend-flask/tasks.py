@@ -6,4 +6,106 @@ def init_db(c):
   from flask import Flask
   app = Flask(__name__)
   db.init(app)
-  print("Database initialized successfully.")
\ No newline at end of file
+  print("Database initialized successfully.")
+
+@task
+def backfill_word_parts(c):
+  from flask import Flask
+  app = Flask(__name__)
+  with app.app_context():
+    cursor = db.cursor()
+    # Create any tables missing from an older database before backfilling
+    db.setup_tables(cursor)
+    count = db.backfill_word_parts(cursor)
+  print(f"Backfilled parts for {count} words.")
+
+
+@task
+def backfill_change_log(c):
+  from flask import Flask
+  app = Flask(__name__)
+  with app.app_context():
+    cursor = db.cursor()
+    # Create the change_log table and its triggers on an older database
+    db.setup_tables(cursor)
+    count = db.backfill_change_log(cursor)
+  print(f"Logged {count} existing rows in change_log.")
+
+
+def shard_connections(shards_dir):
+  # Yield (learner, connection) for every learner shard in shards_dir, each
+  # with the database attached as `vocab`
+  if not shards_dir:
+    return
+  db.shards_dir = shards_dir
+  for learner in db.shard_paths():
+    connection = db.connect_shard(learner)
+    try:
+      yield learner, connection
+    finally:
+      connection.close()
+
+
+@task
+def rebuild_rollups(c, shards_dir=None):
+  from flask import Flask
+  from lib import rollups
+  app = Flask(__name__)
+  with app.app_context():
+    cursor = db.cursor()
+    db.setup_tables(cursor)
+    rollups.rebuild(cursor)
+    db.commit()
+  for learner, connection in shard_connections(shards_dir):
+    rollups.rebuild(connection.cursor())
+    connection.commit()
+    print(f"Rebuilt the rollups of learner {learner}.")
+  print("Rebuilt word and study session rollups.")
+
+
+@task
+def archive_reviews(c, keep_months=1, shards_dir=None):
+  from flask import Flask
+  from lib.archive import archive_reviews
+  app = Flask(__name__)
+  with app.app_context():
+    moved = archive_reviews(db.get(), keep_months=int(keep_months))
+  for partition, count in moved.items():
+    print(f"Archived {count} review items into {partition}.")
+  for learner, connection in shard_connections(shards_dir):
+    for partition, count in archive_reviews(connection, keep_months=int(keep_months)).items():
+      print(f"Archived {count} review items of learner {learner} into {partition}.")
+  print("Review archival complete.")
+
+
+@task
+def backup(c, directory='backups', keep=7, shards_dir=None):
+  import time
+  from lib.backup import BackupJob
+  from lib.db import list_shards
+  job = BackupJob(db.database, directory, keep=int(keep), shards=list_shards(shards_dir))
+  job.start()
+  while job.is_alive():
+    status = job.status()
+    if status['pages_total']:
+      print(f"{status['state']} {status['copying']}: {status['pages_copied']}/{status['pages_total']} pages")
+    time.sleep(1)
+  job.join()
+  if job.error:
+    print(f"Backup failed: {job.error}")
+  else:
+    print(f"Backup written to {directory}/{job.filename}")
+    if job.shards:
+      print(f"Backed up {job.shards_copied} learner shards to {directory}/shards")
+
+
+@task
+def compact_rollups(c, keep_hours=48, shards_dir=None):
+  from flask import Flask
+  from lib import rollups
+  app = Flask(__name__)
+  with app.app_context():
+    removed = rollups.compact(db.get(), keep_hours=int(keep_hours))
+  for learner, connection in shard_connections(shards_dir):
+    removed += rollups.compact(connection, keep_hours=int(keep_hours))
+  print(f"Compacted {removed} hourly review rollups into days.")
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from app import create_app
+from lib import rollups
+from lib.fixtures import TemplateDatabase
+
+def seed_study_session(cursor):
+    # The review tests expect study session 1 on group 1
+    cursor.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)')
+    rollups.record_session(cursor, 1, 1)
+
+@pytest.fixture(scope='session')
+def template_db(tmp_path_factory):
+    template = TemplateDatabase(
+        path=str(tmp_path_factory.mktemp('db') / 'template.db'),
+        seed=seed_study_session
+    )
+    template.build()
+    return template
+
+@pytest.fixture
+def app(template_db):
+    database, keeper = template_db.clone_to_memory()
+    app = create_app({"TESTING": True, "DATABASE": database})
+    yield app
+    keeper.close()
+
+@pytest.fixture
+def client(app):
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def post_review(client):
+    """Post a review in a study session (session 1 on group 1 by default)."""
+    def post_review(word_id, correct=True, session_id=1, headers=None):
+        return client.post(
+            f'/api/study_sessions/{session_id}/words/{word_id}/review',
+            data=json.dumps({"correct": correct}),
+            content_type='application/json',
+            headers=headers
+        )
+    return post_review
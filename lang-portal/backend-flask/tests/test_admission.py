@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+
+import pytest
+from flask import request
+
+from app import create_app
+from lib.admission import (
+    AdmissionController, Overloaded, classify_request,
+    PRIORITY_DASHBOARD, PRIORITY_DEFAULT, PRIORITY_REVIEW
+)
+
+@pytest.fixture
+def small_app(template_db):
+    # One read and one write slot and no wait queue, so a held slot sheds
+    database, keeper = template_db.clone_to_memory()
+    app = create_app({
+        "TESTING": True,
+        "DATABASE": database,
+        "ADMISSION_READ_LIMIT": 1,
+        "ADMISSION_WRITE_LIMIT": 1,
+        "ADMISSION_QUEUE_SIZE": 0
+    })
+    yield app
+    keeper.close()
+
+def classify(app, method, path):
+    with app.test_request_context(path, method=method):
+        return classify_request(request)
+
+def test_classify_request(app):
+    """Test reviews are writes first, dashboards reads last and /batch a read"""
+    assert classify(app, 'POST', '/api/study_sessions/1/words/1/review') == ('write', PRIORITY_REVIEW)
+    assert classify(app, 'POST', '/api/study_sessions') == ('write', PRIORITY_DEFAULT)
+    assert classify(app, 'GET', '/dashboard/stats') == ('read', PRIORITY_DASHBOARD)
+    assert classify(app, 'GET', '/words') == ('read', PRIORITY_DEFAULT)
+    assert classify(app, 'POST', '/batch') == ('read', PRIORITY_DEFAULT)
+
+def test_queue_size_zero_sheds():
+    """Test a full lane with no wait queue sheds instead of failing"""
+    controller = AdmissionController(read_limit=1, queue_size=0)
+    controller.acquire('read')
+    with pytest.raises(Overloaded) as e:
+        controller.acquire('read')
+    assert e.value.reason == 'queue_full'
+    controller.release('read')
+    controller.acquire('read')
+
+def test_queue_timeout():
+    """Test a waiter gives up after the queue timeout"""
+    controller = AdmissionController(read_limit=1, queue_timeout=0.05)
+    controller.acquire('read')
+    with pytest.raises(Overloaded) as e:
+        controller.acquire('read')
+    assert e.value.reason == 'timeout'
+    assert controller.stats()['shed']['timeout'] == 1
+
+def test_higher_priority_evicts_waiter():
+    """Test a review displaces a queued dashboard read when the queue is full"""
+    controller = AdmissionController(read_limit=1, write_limit=1, queue_size=1, queue_timeout=2.0)
+    controller.acquire('read')
+    controller.acquire('write')
+    outcome = {}
+
+    def wait_for_dashboard():
+        try:
+            controller.acquire('read', PRIORITY_DASHBOARD)
+            outcome['dashboard'] = 'admitted'
+        except Overloaded as e:
+            outcome['dashboard'] = e.reason
+
+    waiter = threading.Thread(target=wait_for_dashboard)
+    waiter.start()
+    while controller.queued() == 0:
+        time.sleep(0.01)
+
+    def release_write():
+        time.sleep(0.05)
+        controller.release('write')
+
+    threading.Thread(target=release_write).start()
+    controller.acquire('write', PRIORITY_REVIEW)
+    waiter.join()
+    assert outcome['dashboard'] == 'evicted'
+
+def test_overloaded_request_gets_503(small_app):
+    """Test requests over budget get a 503 with Retry-After"""
+    client = small_app.test_client()
+    small_app.admission.acquire('read')
+    try:
+        response = client.get('/words')
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+        assert json.loads(response.data)['reason'] == 'queue_full'
+
+        # The stats stay readable under overload
+        response = client.get('/admin/admission')
+        assert response.status_code == 200
+        assert json.loads(response.data)['shed']['queue_full'] == 1
+    finally:
+        small_app.admission.release('read')
+    assert client.get('/words').status_code == 200
+
+def test_batch_uses_read_lane(small_app):
+    """Test /batch is admitted while the writer slot is busy"""
+    client = small_app.test_client()
+    small_app.admission.acquire('write')
+    try:
+        response = client.post('/batch', json={"requests": [{"path": "/words"}]})
+        assert response.status_code == 200
+    finally:
+        small_app.admission.release('write')
@@ -0,0 +1,63 @@
+import json
+
+from lib.archive import archive_reviews, review_partitions
+
+def backdate_reviews(app, dates):
+    """Insert a review in session 1 on words 1, 2, ... for each of `dates`."""
+    with app.app_context():
+        cursor = app.db.cursor()
+        for word_id, created_at in enumerate(dates, start=1):
+            cursor.execute('''
+                INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+                VALUES (?, 1, 1, ?)
+            ''', (word_id, created_at))
+        app.db.commit()
+
+def count(app, table):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute(f'SELECT COUNT(*) FROM {table}')
+        return cursor.fetchone()[0]
+
+def test_archive_moves_old_months(app, post_review):
+    """Test old reviews move into monthly partitions and stay in the history view"""
+    backdate_reviews(app, ['2024-01-15 10:00:00', '2024-01-20 10:00:00', '2024-02-03 10:00:00'])
+    post_review(4)
+
+    with app.app_context():
+        moved = archive_reviews(app.db.get())
+        assert moved == {'word_review_items_2024_01': 2, 'word_review_items_2024_02': 1}
+        assert review_partitions(app.db.cursor()) == ['word_review_items_2024_01', 'word_review_items_2024_02']
+
+    assert count(app, 'word_review_items') == 1
+    assert count(app, 'word_review_items_history') == 4
+
+def test_archive_nothing_to_move(app, post_review):
+    """Test archiving only recent reviews creates no partitions"""
+    post_review(1)
+    with app.app_context():
+        assert archive_reviews(app.db.get()) == {}
+        assert review_partitions(app.db.cursor()) == []
+    assert count(app, 'word_review_items_history') == 1
+
+def test_archived_reviews_in_session(app, client, post_review):
+    """Test a session still lists its archived reviews"""
+    backdate_reviews(app, ['2024-01-15 10:00:00'])
+    post_review(2)
+    with app.app_context():
+        archive_reviews(app.db.get())
+
+    data = json.loads(client.get('/api/study_sessions/1').data)
+    assert data['total'] == 2
+    assert sorted(word['id'] for word in data['words']) == [1, 2]
+
+def test_reset_drops_partitions(app, client):
+    """Test resetting the history drops the archived partitions"""
+    backdate_reviews(app, ['2024-01-15 10:00:00'])
+    with app.app_context():
+        archive_reviews(app.db.get())
+
+    assert client.post('/api/study_sessions/reset').status_code == 200
+    with app.app_context():
+        assert review_partitions(app.db.cursor()) == []
+    assert count(app, 'word_review_items_history') == 0
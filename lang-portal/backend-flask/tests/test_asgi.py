@@ -0,0 +1,104 @@
+import asyncio
+import json
+import threading
+import time
+
+from flask import Flask, Response
+
+from lib.asgi import OffloadedWsgiToAsgi
+
+def http_scope(path, method='GET', query=b'', headers=()):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query,
+        'root_path': '',
+        'headers': list(headers),
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80)
+    }
+
+async def call(asgi_app, scope, body=b''):
+    """Run one request to completion, returns the status and the body."""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    await asyncio.wait_for(asgi_app(scope, receive, send), timeout=5)
+    assert sent[-1].get('more_body', False) is False
+    return sent[0]['status'], b''.join(message.get('body', b'') for message in sent[1:])
+
+def test_asgi_request(app):
+    """Test requests and their bodies reach the Flask app"""
+    asgi_app = OffloadedWsgiToAsgi(app, threads=2)
+
+    status, body = asyncio.run(call(asgi_app, http_scope('/words', query=b'page=1')))
+    assert status == 200
+    assert json.loads(body)['current_page'] == 1
+
+    body = json.dumps({'correct': True}).encode()
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    status, body = asyncio.run(call(
+        asgi_app,
+        http_scope('/api/study_sessions/1/words/1/review', method='POST', headers=headers),
+        body=body
+    ))
+    assert status == 201
+    assert json.loads(body)['study_session_id'] == 1
+
+def test_asgi_stream_ends_on_disconnect():
+    """Test a stream runs outside the request pool and stops when the client leaves"""
+    flask_app = Flask(__name__)
+    closed = threading.Event()
+
+    @flask_app.route('/stream')
+    def stream():
+        def generate():
+            try:
+                while True:
+                    yield b'tick\n'
+                    time.sleep(0.01)
+            finally:
+                closed.set()
+        return Response(generate(), mimetype='text/event-stream')
+
+    @flask_app.route('/ping')
+    def ping():
+        return 'pong'
+
+    # One request thread, which the open stream must not hold
+    asgi_app = OffloadedWsgiToAsgi(flask_app, threads=1, stream_threads=1)
+
+    async def scenario():
+        messages = asyncio.Queue()
+        await messages.put({'type': 'http.request', 'body': b'', 'more_body': False})
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        task = asyncio.ensure_future(asgi_app(http_scope('/stream'), messages.get, send))
+        while not any(message.get('body') for message in sent):
+            await asyncio.sleep(0.01)
+
+        assert await call(asgi_app, http_scope('/ping')) == (200, b'pong')
+
+        await messages.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, timeout=5)
+        return sent
+
+    sent = asyncio.run(scenario())
+    assert sent[0]['status'] == 200
+    assert closed.wait(5)
@@ -0,0 +1,129 @@
+import gzip
+import os
+import sqlite3
+
+from app import create_app
+from lib import backup
+from lib.backup import BackupJob, list_snapshots
+
+def run_backup(database, directory, keep=7):
+    job = BackupJob(database, directory, keep=keep)
+    job.run()
+    return job
+
+def test_backup_snapshot(template_db, tmp_path):
+    """Test a backup writes a complete compressed copy and no temp files"""
+    database = template_db.clone_to_file(str(tmp_path / 'words.db'))
+    directory = tmp_path / 'backups'
+    job = run_backup(database, str(directory))
+    assert job.state == 'completed', job.error
+    assert os.listdir(directory) == [job.filename]
+
+    restored = tmp_path / 'restored.db'
+    with gzip.open(directory / job.filename, 'rb') as compressed:
+        restored.write_bytes(compressed.read())
+    connection = sqlite3.connect(restored)
+    try:
+        assert connection.execute('SELECT COUNT(*) FROM words').fetchone()[0] > 0
+        assert connection.execute('SELECT COUNT(*) FROM study_sessions').fetchone()[0] == 1
+    finally:
+        connection.close()
+
+def test_backup_failure_removes_temp_files(template_db, tmp_path, monkeypatch):
+    """Test a backup that fails while compressing leaves nothing behind"""
+    database = template_db.clone_to_file(str(tmp_path / 'words.db'))
+    directory = tmp_path / 'backups'
+
+    def fail(*args):
+        raise OSError('disk full')
+    monkeypatch.setattr(backup.shutil, 'copyfileobj', fail)
+
+    job = run_backup(database, str(directory))
+    assert job.state == 'failed'
+    assert 'disk full' in job.error
+    assert os.listdir(directory) == []
+
+def test_backup_keeps_newest(template_db, tmp_path):
+    """Test old snapshots beyond `keep` are removed"""
+    database = template_db.clone_to_file(str(tmp_path / 'words.db'))
+    directory = tmp_path / 'backups'
+    os.makedirs(directory)
+    for day in ('20240101', '20240102', '20240103'):
+        (directory / f'words-{day}-000000.db.gz').write_bytes(b'')
+    job = run_backup(database, str(directory), keep=2)
+    assert job.state == 'completed', job.error
+    assert list_snapshots(str(directory), 'words-') == [job.filename, 'words-20240103-000000.db.gz']
+
+def test_backup_progress(template_db, tmp_path):
+    """Test a backup copies in steps and reports its page progress"""
+    database = template_db.clone_to_file(str(tmp_path / 'words.db'))
+    job = BackupJob(database, str(tmp_path / 'backups'), pages=4, step_sleep=0)
+    job.run()
+    assert job.state == 'completed', job.error
+    status = job.status()
+    assert status['copying'] == job.filename
+    assert status['pages_total'] > 4
+    assert status['pages_copied'] == status['pages_total']
+
+def test_backup_does_not_block_writers(template_db, tmp_path):
+    """Test writers commit while a backup is copying, without restarting it"""
+    database = template_db.clone_to_file(str(tmp_path / 'words.db'))
+    # A database the app has not converted to WAL yet
+    connection = sqlite3.connect(database)
+    connection.execute('PRAGMA journal_mode=DELETE')
+    connection.close()
+    steps = []
+
+    def write_during_step(status, remaining, total):
+        steps.append(remaining)
+        if len(steps) > 3:
+            return
+        writer = sqlite3.connect(database, timeout=0)
+        try:
+            writer.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)')
+            writer.commit()
+        finally:
+            writer.close()
+
+    job = BackupJob(database, str(tmp_path / 'backups'), pages=4, step_sleep=0)
+    job._progress = write_during_step
+    job.run()
+    assert job.state == 'completed', job.error
+    # Pages only ever go down, so no commit restarted the copy
+    assert steps == sorted(steps, reverse=True) and steps[-1] == 0
+
+    restored = tmp_path / 'restored.db'
+    with gzip.open(tmp_path / 'backups' / job.filename, 'rb') as compressed:
+        restored.write_bytes(compressed.read())
+    connection = sqlite3.connect(restored)
+    try:
+        # The snapshot is the database as it was when the copy started
+        assert connection.execute('SELECT COUNT(*) FROM study_sessions').fetchone()[0] == 1
+    finally:
+        connection.close()
+
+def test_backup_memory_database(template_db, tmp_path):
+    """Test a shared in-memory database is backed up through its URI"""
+    database, keeper = template_db.clone_to_memory()
+    try:
+        job = run_backup(database, str(tmp_path / 'backups'))
+        assert job.state == 'completed', job.error
+        assert job.filename.startswith('lang-portal-')
+        assert list_snapshots(str(tmp_path / 'backups')) == [job.filename]
+    finally:
+        keeper.close()
+
+def test_app_uses_wal(template_db, tmp_path):
+    """Test the app switches its database to WAL so backups do not block writers"""
+    database = template_db.clone_to_file(str(tmp_path / 'words.db'))
+    connection = sqlite3.connect(database)
+    connection.execute('PRAGMA journal_mode=DELETE')
+    connection.close()
+
+    app = create_app({"TESTING": True, "DATABASE": database})
+    assert app.test_client().get('/groups/1').status_code == 200
+    connection = sqlite3.connect(database)
+    try:
+        assert connection.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    finally:
+        connection.close()
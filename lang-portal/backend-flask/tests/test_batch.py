@@ -0,0 +1,129 @@
+import json
+import sqlite3
+
+from app import create_app
+
+def batch(client, *paths, **subrequest):
+    return client.post(
+        '/batch',
+        data=json.dumps({"requests": [dict(subrequest, path=path) for path in paths]}),
+        content_type='application/json'
+    )
+
+def test_batch(client):
+    """Test a batch returns each sub-request's status and body in order"""
+    response = batch(client, '/groups/1', '/words?page=2', '/groups/99999')
+    assert response.status_code == 200
+    responses = json.loads(response.data)['responses']
+    assert [item['path'] for item in responses] == ['/groups/1', '/words?page=2', '/groups/99999']
+    assert [item['status'] for item in responses] == [200, 200, 404]
+    assert responses[0]['body'] == json.loads(client.get('/groups/1').data)
+    assert responses[1]['body']['current_page'] == 2
+
+def test_batch_survives_routes_closing_the_connection(client):
+    """Test sub-requests after a route that closes its connection still share it"""
+    response = batch(client, '/words', '/dashboard/stats', '/words', '/api/study_sessions')
+    responses = json.loads(response.data)['responses']
+    assert [item['status'] for item in responses] == [200, 200, 200, 200]
+
+def test_batch_snapshot(template_db, tmp_path):
+    """Test sub-requests read one snapshot while other connections commit"""
+    database = template_db.clone_to_file(str(tmp_path / 'words.db'))
+    connection = sqlite3.connect(database)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.close()
+    app = create_app({"TESTING": True, "DATABASE": database})
+
+    # Commits a new session from another connection mid-batch
+    @app.route('/test/add-session')
+    def add_session():
+        writer = sqlite3.connect(database)
+        writer.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)')
+        writer.commit()
+        writer.close()
+        return {'added': True}
+
+    client = app.test_client()
+    response = batch(client, '/api/study_sessions', '/test/add-session', '/api/study_sessions')
+    responses = json.loads(response.data)['responses']
+    assert responses[0]['body']['total'] == 1
+    assert responses[2]['body']['total'] == 1
+    # The batch is over, so the new session shows up
+    assert json.loads(client.get('/api/study_sessions').data)['total'] == 2
+
+def test_batch_only_get(client):
+    """Test only GET requests can be batched"""
+    response = batch(client, '/api/study_sessions/reset', method='POST')
+    assert response.status_code == 400
+    assert b'Only GET' in response.data
+
+def test_batch_rejects_streams(client, post_review):
+    """Test event streams and exports are rejected instead of buffered"""
+    post_review(1)
+    responses = json.loads(batch(
+        client, '/api/study_sessions/1/events', '/api/export/reviews', '/groups/1'
+    ).data)['responses']
+    assert [item['status'] for item in responses] == [400, 400, 200]
+    assert 'Streaming' in responses[0]['body']['error']
+    assert 'Streaming' in responses[1]['body']['error']
+
+def test_batch_learner_shards(template_db, tmp_path):
+    """Test sub-requests read the shard they would read on their own"""
+    app = create_app({
+        "TESTING": True,
+        "DATABASE": template_db.clone_to_file(str(tmp_path / 'words.db')),
+        "SHARDS_DIR": str(tmp_path / 'shards')
+    })
+    client = app.test_client()
+    paths = ['/words?fields=kanji', '/api/study_sessions', '/dashboard/stats']
+
+    def compare(headers):
+        response = client.post(
+            '/batch',
+            data=json.dumps({"requests": [{"path": path} for path in paths]}),
+            content_type='application/json',
+            headers=headers
+        )
+        responses = json.loads(response.data)['responses']
+        for path, item in zip(paths, responses):
+            alone = client.get(path, headers=headers)
+            assert (item['status'], item['body']) == (alone.status_code, json.loads(alone.data)), path
+        return [item['status'] for item in responses]
+
+    # The default learner, with the batch as its first request
+    assert compare({}) == [200, 200, 200]
+    client.post(
+        '/api/study-sessions',
+        data=json.dumps({"group_id": 1, "study_activity_id": 1}),
+        content_type='application/json'
+    )
+    assert compare({}) == [200, 200, 200]
+    # A learner without a shard reads the vocabulary only
+    assert compare({'X-Learner-Id': 'alice'}) == [200, 404, 404]
+    client.post(
+        '/api/study-sessions',
+        data=json.dumps({"group_id": 2, "study_activity_id": 1}),
+        content_type='application/json',
+        headers={'X-Learner-Id': 'alice'}
+    )
+    assert compare({'X-Learner-Id': 'alice'}) == [200, 200, 200]
+
+def test_batch_invalid(client):
+    """Test malformed batches are rejected"""
+    assert batch(client).status_code == 400
+    assert batch(client, 'groups').status_code == 400
+    response = client.post('/batch', data='invalid json', content_type='application/json')
+    assert response.status_code == 400
+
+def test_batch_max_requests(template_db):
+    """Test batches over BATCH_MAX_REQUESTS are rejected"""
+    database, keeper = template_db.clone_to_memory()
+    try:
+        app = create_app({"TESTING": True, "DATABASE": database, "BATCH_MAX_REQUESTS": 2})
+        client = app.test_client()
+        assert batch(client, '/groups/1', '/groups/2').status_code == 200
+        response = batch(client, '/groups/1', '/groups/2', '/groups/1')
+        assert response.status_code == 400
+        assert b'at most 2' in response.data
+    finally:
+        keeper.close()
@@ -0,0 +1,74 @@
+import gzip
+import json
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+from app import create_app
+from lib import compression
+from lib.json_provider import OrjsonProvider
+
+def test_large_response_gzip(client):
+    """Test a large response is gzipped for clients that accept it"""
+    plain = client.get('/words')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    response = client.get('/words', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data)) == json.loads(plain.data)
+
+def test_large_response_brotli(client):
+    """Test brotli is preferred when installed and accepted"""
+    brotli = pytest.importorskip('brotli')
+    plain = client.get('/words')
+    response = client.get('/words', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(response.data)) == json.loads(plain.data)
+
+def test_gzip_without_brotli(client, monkeypatch):
+    """Test gzip is used when brotli is not installed"""
+    monkeypatch.setattr(compression, 'brotli', None)
+    response = client.get('/words', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+def test_small_response_not_compressed(client):
+    """Test responses under COMPRESS_MIN_SIZE are sent as they are"""
+    response = client.get('/groups/1', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(response.data)['group_name'] == 'Core Verbs'
+
+def test_error_response_not_compressed(client):
+    """Test error responses are not compressed"""
+    response = client.get('/groups/99999', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 404
+    assert 'Content-Encoding' not in response.headers
+
+def test_compress_min_size(template_db):
+    """Test the size threshold is configurable"""
+    database, keeper = template_db.clone_to_memory()
+    try:
+        app = create_app({"TESTING": True, "DATABASE": database, "COMPRESS_MIN_SIZE": 10})
+        response = app.test_client().get('/groups/1', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+    finally:
+        keeper.close()
+
+def test_json_providers_agree(app, template_db):
+    """Test the orjson provider sends the same JSON as Flask's encoder"""
+    pytest.importorskip('orjson')
+    assert isinstance(app.json, OrjsonProvider)
+
+    database, keeper = template_db.clone_to_memory()
+    try:
+        default_app = create_app({"TESTING": True, "DATABASE": database, "FAST_JSON": False})
+        assert type(default_app.json) is DefaultJSONProvider
+        for path in ('/words?include=parts', '/groups?include=stats', '/api/study_sessions/1'):
+            fast = app.test_client().get(path)
+            default = default_app.test_client().get(path)
+            assert fast.mimetype == default.mimetype == 'application/json'
+            assert json.loads(fast.data) == json.loads(default.data), path
+    finally:
+        keeper.close()
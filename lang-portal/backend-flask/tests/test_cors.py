@@ -0,0 +1,52 @@
+import pytest
+
+from app import create_app
+
+@pytest.fixture
+def configured_app(template_db):
+    # Only the activity origins and the portal, checked on every request
+    database, keeper = template_db.clone_to_memory()
+    app = create_app({
+        "TESTING": True,
+        "DATABASE": database,
+        "CORS_EXTRA_ORIGINS": "https://portal.example.com",
+        "CORS_ORIGINS_TTL": 0
+    })
+    yield app
+    keeper.close()
+
+def allowed_origin(client, origin, path='/words'):
+    response = client.get(path, headers={'Origin': origin})
+    return response.headers.get('Access-Control-Allow-Origin')
+
+def test_default_allows_every_origin(client):
+    """Test every origin is allowed when no origins are configured"""
+    assert allowed_origin(client, 'http://localhost:5173') in ('*', 'http://localhost:5173')
+    assert allowed_origin(client, 'https://anywhere.example.com') in ('*', 'https://anywhere.example.com')
+
+def test_configured_origins(configured_app):
+    """Test configured mode allows the activity and extra origins only"""
+    client = configured_app.test_client()
+    assert allowed_origin(client, 'http://localhost:8080') == 'http://localhost:8080'
+    assert allowed_origin(client, 'https://portal.example.com') == 'https://portal.example.com'
+    assert allowed_origin(client, 'https://evil.example.com') is None
+
+def test_new_activity_origin_is_allowed(configured_app):
+    """Test adding a study activity allows its origin without a restart"""
+    client = configured_app.test_client()
+    assert allowed_origin(client, 'https://flashcards.example.com') is None
+    with configured_app.app_context():
+        cursor = configured_app.db.cursor()
+        cursor.execute(
+            'INSERT INTO study_activities (name, url, preview_url) VALUES (?, ?, ?)',
+            ('Flashcards', 'https://flashcards.example.com/play', '/assets/flashcards.png')
+        )
+        configured_app.db.commit()
+    assert allowed_origin(client, 'https://flashcards.example.com') == 'https://flashcards.example.com'
+
+def test_not_found_has_cors_headers(configured_app):
+    """Test responses that skip the views still get the CORS headers"""
+    client = configured_app.test_client()
+    response = client.get('/no-such-route', headers={'Origin': 'https://portal.example.com'})
+    assert response.status_code == 404
+    assert response.headers.get('Access-Control-Allow-Origin') == 'https://portal.example.com'
@@ -0,0 +1,53 @@
+import json
+
+from routes.dashboard import GET_RECENT_SESSION
+
+def add_session(app, group_id, created_at):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('''
+            INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (?, 1, ?)
+        ''', (group_id, created_at))
+        app.db.commit()
+        return cursor.lastrowid
+
+def test_recent_session(client, post_review):
+    """Test the recent session has its activity and review counts"""
+    post_review(1, correct=True)
+    post_review(2, correct=True)
+    post_review(3, correct=False)
+
+    data = json.loads(client.get('/dashboard/recent-session').data)
+    assert data['id'] == 1
+    assert data['group_id'] == 1
+    assert data['activity_name'] == 'Typing Tutor'
+    assert data['correct_count'] == 2
+    assert data['wrong_count'] == 1
+
+def test_recent_session_is_newest(app, client):
+    """Test the newest session wins, and the higher id on equal times"""
+    add_session(app, 2, '2099-01-01 10:00:00')
+    add_session(app, 1, '2000-01-01 10:00:00')
+    data = json.loads(client.get('/dashboard/recent-session').data)
+    assert data['group_id'] == 2
+    assert data['correct_count'] == 0
+
+    session_id = add_session(app, 1, '2099-01-01 10:00:00')
+    data = json.loads(client.get('/dashboard/recent-session').data)
+    assert data['id'] == session_id
+
+def test_recent_session_none(client):
+    """Test there is no recent session after a reset"""
+    assert client.post('/api/study_sessions/reset').status_code == 200
+    response = client.get('/dashboard/recent-session')
+    assert response.status_code == 200
+    assert json.loads(response.data) is None
+
+def test_recent_session_uses_index(app):
+    """Test the lookup reads the created_at index instead of sorting"""
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('EXPLAIN QUERY PLAN ' + GET_RECENT_SESSION)
+        plan = ' '.join(row['detail'] for row in cursor.fetchall())
+    assert 'idx_study_sessions_created_at' in plan
+    assert 'TEMP B-TREE' not in plan
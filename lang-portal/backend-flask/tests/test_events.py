@@ -0,0 +1,42 @@
+import json
+
+def parse_events(data):
+    events = []
+    for block in data.decode().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines() if line and not line.startswith(':'))
+        if 'data' in lines:
+            events.append(json.loads(lines['data']))
+    return events
+
+def test_session_events(app, client, post_review):
+    """Test the stream sends the snapshot, later reviews and the close"""
+    post_review(1)
+    response = client.get('/api/study_sessions/1/events')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+
+    # A review counted in the snapshot, as published by a review that
+    # committed between the subscription and the snapshot read
+    app.events.publish((None, 1), {'type': 'review', 'word_id': 1, 'review_items_count': 1})
+    post_review(2, correct=False)
+    client.post('/api/study_sessions/1/close')
+
+    events = parse_events(response.get_data())
+    assert [event['type'] for event in events] == ['snapshot', 'review', 'closed']
+    assert events[0]['review_items_count'] == 1
+    assert events[1]['word_id'] == 2
+    assert events[1]['review_items_count'] == 2
+    assert events[1]['wrong_count'] == 1
+
+def test_closed_session_events(client, post_review):
+    """Test a closed session only sends its snapshot"""
+    post_review(1)
+    client.post('/api/study_sessions/1/close')
+    events = parse_events(client.get('/api/study_sessions/1/events').get_data())
+    assert [event['type'] for event in events] == ['snapshot']
+    assert events[0]['closed_at']
+
+def test_session_events_not_found(client):
+    """Test streaming a non-existent session"""
+    response = client.get('/api/study_sessions/99999/events')
+    assert response.status_code == 404
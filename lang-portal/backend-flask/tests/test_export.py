@@ -0,0 +1,60 @@
+import csv
+import gzip
+import io
+import json
+
+def read_csv(response):
+    return list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+
+def test_export_reviews_csv(client, post_review):
+    """Test exporting reviews as CSV with a header and one row per review"""
+    for word_id in (1, 2, 3):
+        assert post_review(word_id, correct=word_id != 2).status_code == 201
+
+    response = client.get('/api/export/reviews?format=csv')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    rows = read_csv(response)
+    assert rows[0][:3] == ['id', 'created_at', 'correct']
+    assert [row[3] for row in rows[1:]] == ['1', '2', '3']  # word ids in id order
+
+def test_export_reviews_keyset_pages(app, client, post_review):
+    """Test small chunks still export every review once, and after_id resumes"""
+    app.config['EXPORT_CHUNK_SIZE'] = 2
+    for word_id in range(1, 6):
+        post_review(word_id)
+
+    response = client.get('/api/export/reviews?format=ndjson')
+    ids = [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()]
+    assert ids == sorted(ids) and len(ids) == 5
+
+    response = client.get(f'/api/export/reviews?format=ndjson&after_id={ids[2]}')
+    resumed = [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()]
+    assert resumed == ids[3:]
+
+def test_export_reviews_gzip(client, post_review):
+    """Test the export is gzipped for clients that accept it"""
+    post_review(1)
+    response = client.get('/api/export/reviews?format=ndjson', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    line = gzip.decompress(response.data).decode().splitlines()[0]
+    assert json.loads(line)['word_id'] == 1
+
+def test_export_reviews_date_range(client, post_review):
+    """Test from/to filters reviews by day"""
+    post_review(1)
+    response = client.get('/api/export/reviews?format=ndjson&to=2000-01-01')
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == ''
+
+def test_export_reviews_invalid_dates(client):
+    """Test invalid or reversed from/to values are rejected"""
+    for query in ('from=yesterday', 'to=2024-13-01', 'from=2024-02-02&to=2024-02-01'):
+        response = client.get(f'/api/export/reviews?{query}')
+        assert response.status_code == 400
+        assert 'error' in json.loads(response.data)
+
+def test_export_reviews_invalid_format(client):
+    """Test an unknown format is rejected"""
+    response = client.get('/api/export/reviews?format=xml')
+    assert response.status_code == 400
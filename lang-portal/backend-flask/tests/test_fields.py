@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from lib.serializers import pick_columns
+from routes.words import WORD_LIST_COLUMNS
+
+@pytest.mark.parametrize('path, key, fields', [
+    ('/words', 'words', ['id', 'kanji']),
+    ('/groups', 'groups', ['id', 'group_name']),
+    ('/groups/1/words', 'words', ['id', 'romaji', 'english']),
+    ('/groups/1/words/random', 'words', ['id', 'kanji']),
+    ('/groups/1/study_sessions', 'study_sessions', ['id', 'review_items_count']),
+    ('/api/study_sessions', 'items', ['id', 'group_name']),
+    ('/api/study-activities/1/sessions', 'items', ['id', 'activity_name']),
+])
+def test_list_fields(client, path, key, fields):
+    """Test the list endpoints only return the requested fields and the id"""
+    requested = ','.join(field for field in fields if field != 'id')
+    response = client.get(f'{path}?fields={requested}')
+    assert response.status_code == 200
+    items = json.loads(response.data)[key]
+    assert items
+    assert all(list(item) == fields for item in items)
+
+def test_weakest_words_fields(client, post_review):
+    """Test the weakest words can be narrowed to their error rate"""
+    post_review(1, correct=False)
+    data = json.loads(client.get('/words/weakest?fields=error_rate').data)
+    assert data['words'] == [{'id': 1, 'error_rate': 1.0}]
+
+def test_fields_sort_by_unselected_column(client):
+    """Test sorting does not depend on the sort column being selected"""
+    full = json.loads(client.get('/words?sort_by=english').data)['words']
+    narrow = json.loads(client.get('/words?sort_by=english&fields=kanji').data)['words']
+    assert [word['id'] for word in narrow] == [word['id'] for word in full]
+
+def test_fields_unknown(client):
+    """Test an unknown field is rejected with the allowed fields"""
+    response = client.get('/words?fields=kanji,meaning')
+    assert response.status_code == 400
+    error = json.loads(response.data)['error']
+    assert 'meaning' in error
+    assert 'romaji' in error
+
+    assert client.get('/groups?fields=kanji').status_code == 400
+    assert client.get('/api/study_sessions?fields=kanji').status_code == 400
+
+def test_pick_columns():
+    """Test columns keep their declared order and empty fields are ignored"""
+    assert pick_columns(WORD_LIST_COLUMNS, None) == WORD_LIST_COLUMNS
+    assert pick_columns(WORD_LIST_COLUMNS, '') == WORD_LIST_COLUMNS
+    columns = pick_columns(WORD_LIST_COLUMNS, ' english, ,kanji ')
+    assert [key for key, _ in columns] == ['id', 'kanji', 'english']
@@ -0,0 +1,74 @@
+import json
+
+from lib import rollups
+
+def group_stats(client, group_id):
+    return json.loads(client.get(f'/groups/{group_id}/stats').data)['stats']
+
+def test_group_stats(client, post_review):
+    """Test reviews update the group's counters, studied and mastered words"""
+    for _ in range(5):
+        post_review(1, correct=True)
+    post_review(2, correct=False)
+
+    stats = group_stats(client, 1)
+    assert stats['words_studied'] == 2
+    assert stats['words_mastered'] == 1
+    assert stats['correct_count'] == 5
+    assert stats['wrong_count'] == 1
+    assert stats['accuracy'] == 5 / 6
+    assert stats['sessions_count'] == 1
+    assert stats['last_studied_at'] is not None
+    assert stats['sessions_by_activity'] == [
+        {'study_activity_id': 1, 'activity_name': 'Typing Tutor', 'sessions_count': 1}
+    ]
+
+def test_group_stats_mastery_lost(client, post_review):
+    """Test a word drops out of the mastered words when it falls below 80%"""
+    for _ in range(5):
+        post_review(1, correct=True)
+    assert group_stats(client, 1)['words_mastered'] == 1
+    post_review(1, correct=False)
+    post_review(1, correct=False)
+    stats = group_stats(client, 1)
+    assert stats['words_mastered'] == 0
+    assert stats['words_studied'] == 1
+
+def test_group_stats_unstudied(client):
+    """Test a group nobody studied has zero stats"""
+    stats = group_stats(client, 2)
+    assert stats['words_studied'] == 0
+    assert stats['sessions_count'] == 0
+    assert stats['accuracy'] == 0
+    assert stats['last_studied_at'] is None
+    assert stats['sessions_by_activity'] == []
+
+def test_group_stats_not_found(client):
+    """Test stats of a non-existent group"""
+    response = client.get('/groups/99999/stats')
+    assert response.status_code == 404
+
+def test_groups_include_stats(client, post_review):
+    """Test the group list only includes stats when asked to"""
+    post_review(1, correct=True)
+    data = json.loads(client.get('/groups').data)
+    assert 'stats' not in data['groups'][0]
+    data = json.loads(client.get('/groups?include=stats').data)
+    groups = {group['group_name']: group for group in data['groups']}
+    assert groups['Core Verbs']['stats']['words_studied'] == 1
+    assert groups['Core Verbs']['stats']['accuracy'] == 1
+    assert groups['Core Adjectives']['stats']['words_studied'] == 0
+
+def test_rebuild_group_stats(app, client, post_review):
+    """Test rebuilding the rollups gives the incrementally maintained stats"""
+    for _ in range(5):
+        post_review(1, correct=True)
+    post_review(2, correct=False)
+    before = group_stats(client, 1)
+
+    with app.app_context():
+        cursor = app.db.cursor()
+        rollups.clear(cursor)
+        rollups.rebuild(cursor)
+        app.db.commit()
+    assert group_stats(client, 1) == before
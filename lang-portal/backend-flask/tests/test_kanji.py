@@ -0,0 +1,52 @@
+import json
+
+def test_word_parts(client):
+    """Test a word includes its parts in order"""
+    data = json.loads(client.get('/words/1').data)
+    assert data['word']['kanji'] == '払う'
+    assert data['word']['parts'] == [
+        {'kanji': '払', 'romaji': ['ha', 'ra']},
+        {'kanji': 'う', 'romaji': ['u']}
+    ]
+
+def test_word_list_include_parts(client):
+    """Test the word list only includes parts when asked to"""
+    data = json.loads(client.get('/words').data)
+    assert 'parts' not in data['words'][0]
+    data = json.loads(client.get('/words?include=parts').data)
+    assert all(word['parts'] for word in data['words'])
+
+def test_kanji_words(client):
+    """Test listing the words that use a kanji"""
+    data = json.loads(client.get('/kanji/行/words').data)
+    assert data['kanji'] == '行'
+    assert data['total_words'] == 1
+    assert [word['kanji'] for word in data['words']] == ['行く']
+    assert data['words'][0]['parts'][0] == {'kanji': '行', 'romaji': ['i']}
+
+def test_kanji_words_pages(client):
+    """Test the words of a common kana are paginated"""
+    data = json.loads(client.get('/kanji/い/words').data)
+    assert data['total_words'] == 54
+    assert data['total_pages'] == 2
+    assert len(data['words']) == 50
+    data = json.loads(client.get('/kanji/い/words?page=2').data)
+    assert data['current_page'] == 2
+    assert len(data['words']) == 4
+
+def test_kanji_words_unknown(client):
+    """Test a kanji no word uses has no words"""
+    data = json.loads(client.get('/kanji/猫/words').data)
+    assert data['total_words'] == 0
+    assert data['words'] == []
+
+def test_backfill_word_parts(app, client):
+    """Test backfilling restores the parts of words imported without them"""
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('DELETE FROM word_parts WHERE word_id = 1')
+        app.db.backfill_word_parts(cursor)
+        app.db.commit()
+
+    data = json.loads(client.get('/words/1').data)
+    assert [part['kanji'] for part in data['word']['parts']] == ['払', 'う']
@@ -0,0 +1,97 @@
+import json
+import sqlite3
+
+import pytest
+
+from app import create_app
+from lib.queries import QueryRegistry, null_parameters, queries
+
+def query_stats(client):
+    return {row['name']: row for row in json.loads(client.get('/admin/queries').data)['queries']}
+
+def test_admin_queries(client):
+    """Test executions are counted under their registered names"""
+    queries.reset_stats()
+    client.get('/words')
+    client.get('/words?sort_by=english&order=desc')
+    client.get('/words?sort_by=english&order=desc&fields=kanji')
+
+    stats = query_stats(client)
+    assert stats['words.list[kanji asc]']['count'] == 1
+    # Narrowed variants are reported with the full one
+    assert stats['words.list[english desc]']['count'] == 2
+    assert stats['words.count']['count'] == 3
+    assert stats['words.count']['mean_ms'] == stats['words.count']['total_ms'] / 3
+
+    totals = [row['total_ms'] for row in json.loads(client.get('/admin/queries').data)['queries']]
+    assert totals == sorted(totals, reverse=True)
+
+def test_adhoc_queries(app):
+    """Test unregistered statements are reported by their SQL"""
+    queries.reset_stats()
+    with app.app_context():
+        app.db.cursor().execute('SELECT   MAX(id)\n  FROM groups')
+    assert [row['name'] for row in queries.stats()] == ['adhoc: SELECT MAX(id) FROM groups']
+
+def test_register():
+    """Test a name can only be registered again with the same SQL"""
+    registry = QueryRegistry()
+    sql = registry.register('test.words', 'SELECT id FROM words')
+    assert sql == 'SELECT id FROM words'
+    registry.register('test.words', 'SELECT id\n  FROM words')
+    with pytest.raises(ValueError):
+        registry.register('test.words', 'SELECT kanji FROM words')
+
+def test_validate():
+    """Test statements that do not compile are reported by name"""
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE words (id INTEGER PRIMARY KEY, kanji TEXT)')
+    registry = QueryRegistry()
+    registry.register('test.ok', "SELECT id FROM words WHERE kanji = ? AND id > ?")
+    registry.register('test.named', "SELECT id FROM words WHERE kanji = :kanji")
+    registry.register('test.bad', "SELECT english FROM words")
+    errors = registry.validate(connection)
+    assert list(errors) == ['test.bad']
+    assert 'english' in errors['test.bad']
+
+def test_null_parameters():
+    """Test placeholders inside string literals are not counted"""
+    assert null_parameters("SELECT ? WHERE x = '?'") == (None,)
+    assert null_parameters("SELECT :a, :b") == {'a': None, 'b': None}
+    assert null_parameters("SELECT 1") == ()
+
+def test_invalid_query_fails_startup(template_db, monkeypatch):
+    """Test create_app refuses to start with a statement that does not compile"""
+    monkeypatch.setitem(queries._statements, 'test.bad', 'SELECT english FROM nowhere_words WHERE id = ?')
+    monkeypatch.setitem(queries._statements, 'test.typo', 'SELEC id FROM words')
+    database, keeper = template_db.clone_to_memory()
+    try:
+        # Missing tables are only logged, other errors stop the app
+        with pytest.raises(ValueError, match='test.typo') as error:
+            create_app({"TESTING": True, "DATABASE": database})
+        assert 'test.bad' not in str(error.value)
+        create_app({"TESTING": True, "DATABASE": database, "VALIDATE_QUERIES": False})
+    finally:
+        keeper.close()
+
+def test_routes_use_registered_queries(client, post_review):
+    """Test the read endpoints only run statements registered by name"""
+    post_review(1)
+    queries.reset_stats()
+    for path in [
+        '/words', '/words/1', '/words/1/history', '/words/weakest', '/words/weakest?group_id=1',
+        '/kanji/払/words',
+        '/groups/1', '/groups/1/words', '/groups/1/words/random', '/groups/1/study_sessions',
+        '/api/study_sessions', '/api/study_sessions/1',
+        '/dashboard/stats', '/dashboard/recent-session',
+        '/api/study-activities', '/api/study-activities/1',
+        '/api/study-activities/1/sessions', '/api/study-activities/1/launch',
+    ]:
+        assert client.get(path).status_code == 200, path
+    response = client.post(
+        '/api/study-activities/1/start', data=json.dumps({"group_id": 1}), content_type='application/json'
+    )
+    assert response.status_code == 201
+    names = [row['name'] for row in queries.stats()]
+    assert 'study_sessions.get_session_words_page' in names
+    assert [name for name in names if name.startswith('adhoc:')] == []
@@ -0,0 +1,121 @@
+import json
+
+from lib import rollups
+from lib.queries import queries
+
+def rows(app, sql):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute(sql)
+        return [tuple(row) for row in cursor.fetchall()]
+
+def test_review_upserts_rollups(app, post_review):
+    """Test reviews add up in the hourly rollups with and without words"""
+    post_review(1, correct=True)
+    post_review(1, correct=False)
+    post_review(2, correct=True)
+
+    assert rows(app, '''
+        SELECT word_id, group_id, study_activity_id, correct_count, wrong_count
+        FROM review_rollups_hourly ORDER BY word_id
+    ''') == [(1, 1, 1, 1, 1), (2, 1, 1, 1, 0)]
+    assert rows(app, '''
+        SELECT group_id, study_activity_id, correct_count, wrong_count
+        FROM review_rollups_group_hourly
+    ''') == [(1, 1, 2, 1)]
+
+def test_compact_folds_old_hours(app):
+    """Test compaction moves whole past days into the daily rollups"""
+    with app.app_context():
+        cursor = app.db.cursor()
+        for hour in ('2024-01-01 09:00:00', '2024-01-01 17:00:00'):
+            cursor.execute('''
+                INSERT INTO review_rollups_hourly (bucket, word_id, group_id, study_activity_id, correct_count, wrong_count)
+                VALUES (?, 1, 1, 1, 2, 1)
+            ''', (hour,))
+            cursor.execute('''
+                INSERT INTO review_rollups_group_hourly (bucket, group_id, study_activity_id, correct_count, wrong_count)
+                VALUES (?, 1, 1, 3, 1)
+            ''', (hour,))
+        cursor.execute('''
+            INSERT INTO review_rollups_group_hourly (bucket, group_id, study_activity_id, correct_count, wrong_count)
+            VALUES (strftime('%Y-%m-%d %H:00:00', 'now'), 1, 1, 1, 0)
+        ''')
+        app.db.commit()
+        assert rollups.compact(app.db.get()) == 2
+
+    assert rows(app, 'SELECT bucket, correct_count, wrong_count FROM review_rollups_daily') == [('2024-01-01', 4, 2)]
+    assert rows(app, 'SELECT bucket, correct_count, wrong_count FROM review_rollups_group_daily') == [('2024-01-01', 6, 2)]
+    assert rows(app, 'SELECT COUNT(*) FROM review_rollups_hourly') == [(0,)]
+    # The current hour is kept
+    assert rows(app, 'SELECT COUNT(*) FROM review_rollups_group_hourly') == [(1,)]
+
+def test_rebuild_daily_rollups(app, post_review):
+    """Test rebuilding fills the daily rollups from the review history"""
+    post_review(1, correct=True)
+    post_review(2, correct=False)
+    with app.app_context():
+        rollups.rebuild(app.db.cursor())
+        app.db.commit()
+
+    assert rows(app, 'SELECT COUNT(*) FROM review_rollups_daily') == [(2,)]
+    assert rows(app, '''
+        SELECT bucket = date('now'), group_id, study_activity_id, correct_count, wrong_count
+        FROM review_rollups_group_daily
+    ''') == [(1, 1, 1, 1, 1)]
+
+def test_review_analytics(client, post_review):
+    """Test analytics with and without a word filter"""
+    post_review(1, correct=True)
+    post_review(1, correct=False)
+    post_review(2, correct=True)
+
+    data = json.loads(client.get('/analytics/reviews?bucket=day&group_id=1').data)
+    assert len(data['points']) == 1
+    assert data['points'][0]['review_count'] == 3
+    assert data['points'][0]['correct_count'] == 2
+
+    data = json.loads(client.get('/analytics/reviews?word_id=1').data)
+    assert data['points'][0]['review_count'] == 2
+    assert data['points'][0]['accuracy'] == 0.5
+
+    data = json.loads(client.get('/analytics/reviews?group_id=99999').data)
+    assert data['points'] == []
+
+def test_review_analytics_invalid_bucket(client):
+    """Test an unknown bucket size is rejected"""
+    response = client.get('/analytics/reviews?bucket=month')
+    assert response.status_code == 400
+
+def test_review_analytics_date_range(app, client):
+    """Test from and to limit the days, including the last one"""
+    with app.app_context():
+        cursor = app.db.cursor()
+        for day in ('2024-01-01', '2024-01-02', '2024-01-03'):
+            cursor.execute('''
+                INSERT INTO review_rollups_group_daily (bucket, group_id, study_activity_id, correct_count, wrong_count)
+                VALUES (?, 1, 1, 1, 1)
+            ''', (day,))
+        app.db.commit()
+
+    data = json.loads(client.get('/analytics/reviews?from=2024-01-02&to=2024-01-03').data)
+    assert [point['start'] for point in data['points']] == ['2024-01-02', '2024-01-03']
+    data = json.loads(client.get('/analytics/reviews?to=2024-01-01').data)
+    assert [point['start'] for point in data['points']] == ['2024-01-01']
+
+def test_review_analytics_invalid_dates(client):
+    """Test malformed or reversed dates are rejected"""
+    for query in ('to=garbage', 'from=2024-13-01', 'from=2024-01-01x', 'from=2024-02-01&to=2024-01-01'):
+        response = client.get(f'/analytics/reviews?{query}')
+        assert response.status_code == 400, query
+
+def test_review_analytics_registered(client, post_review):
+    """Test every filter combination runs a registered statement"""
+    post_review(1)
+    queries.reset_stats()
+    client.get('/analytics/reviews?bucket=week&group_id=1&word_id=1')
+    client.get('/analytics/reviews')
+    names = [row['name'] for row in queries.stats()]
+    assert 'analytics.reviews[week group_id+word_id]' in names
+    assert 'analytics.reviews[day all]' in names
+    assert not [name for name in names if name.startswith('adhoc:')]
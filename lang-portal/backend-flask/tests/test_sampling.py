@@ -0,0 +1,64 @@
+import json
+
+from lib import sampling
+
+def group_word_ids(client, group_id):
+    response = client.get(f'/groups/{group_id}/words?page=1&fields=id')
+    data = json.loads(response.data)
+    ids = [word['id'] for word in data['words']]
+    for page in range(2, data['total_pages'] + 1):
+        response = client.get(f'/groups/{group_id}/words?page={page}&fields=id')
+        ids += [word['id'] for word in json.loads(response.data)['words']]
+    return set(ids)
+
+def random_word_ids(client, query):
+    response = client.get(f'/groups/1/words/random?{query}')
+    assert response.status_code == 200
+    return [word['id'] for word in json.loads(response.data)['words']]
+
+def test_random_words_are_distinct_members(client):
+    """Test random words are n distinct members of the group"""
+    members = group_word_ids(client, 1)
+    for weighted in ('false', 'true'):
+        ids = random_word_ids(client, f'n=10&weighted={weighted}')
+        assert len(ids) == 10
+        assert len(set(ids)) == 10
+        assert set(ids) <= members
+
+def test_random_words_exclude(client):
+    """Test excluded words are never returned and small remainders are returned whole"""
+    members = sorted(group_word_ids(client, 1))
+    exclude = members[:-3]
+    ids = random_word_ids(client, f"n=10&exclude={','.join(map(str, exclude))}")
+    assert sorted(ids) == members[-3:]
+
+def test_random_words_ignore_foreign_excludes(client):
+    """Test excluded ids from other groups do not shrink the sample"""
+    members = group_word_ids(client, 1)
+    foreign = [word_id for word_id in range(1, 200) if word_id not in members][:60]
+    ids = random_word_ids(client, f"n=10&exclude={','.join(map(str, foreign))}")
+    assert len(ids) == 10
+
+def test_random_words_fallback_is_random(app, monkeypatch):
+    """Test the fill-up after unlucky draws picks random members, not the first ids"""
+    monkeypatch.setattr(sampling, 'MAX_ATTEMPTS_PER_WORD', 0)
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT words_count FROM groups WHERE id = 1')
+        words_count = cursor.fetchone()['words_count']
+        samples = {
+            tuple(sampling.sample_group_words(cursor, group_id=1, words_count=words_count, n=5))
+            for _ in range(5)
+        }
+    assert all(len(set(sample)) == 5 for sample in samples)
+    assert len(samples) > 1
+
+def test_random_words_invalid_exclude(client):
+    """Test a malformed exclude list is rejected"""
+    response = client.get('/groups/1/words/random?exclude=1,x')
+    assert response.status_code == 400
+
+def test_random_words_missing_group(client):
+    """Test sampling from a non-existent group"""
+    response = client.get('/groups/99999/words/random')
+    assert response.status_code == 404
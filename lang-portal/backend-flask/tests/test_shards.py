@@ -0,0 +1,181 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+from app import create_app
+from lib.backup import BackupJob, list_snapshots
+from lib.db import list_shards
+
+@pytest.fixture
+def sharded_app(template_db, tmp_path):
+    # Shards attach DATABASE by path, so clone it to a file
+    database = template_db.clone_to_file(str(tmp_path / 'words.db'))
+    app = create_app({
+        "TESTING": True,
+        "DATABASE": database,
+        "SHARDS_DIR": str(tmp_path / 'shards')
+    })
+    return app
+
+def learner(name):
+    return {'X-Learner-Id': name}
+
+def shard_exists(app, name):
+    return os.path.exists(os.path.join(app.config['SHARDS_DIR'], f'{name}.db'))
+
+def create_session(client, name):
+    return client.post(
+        '/api/study-sessions',
+        data=json.dumps({"group_id": 1, "study_activity_id": 1}),
+        content_type='application/json',
+        headers=learner(name)
+    )
+
+def test_vocabulary_reads_do_not_create_shards(sharded_app):
+    """Test reading words and groups as an unknown learner creates no shard"""
+    client = sharded_app.test_client()
+    assert client.get('/words', headers=learner('alice')).status_code == 200
+    assert client.get('/groups', headers=learner('alice')).status_code == 200
+    assert not shard_exists(sharded_app, 'alice')
+
+def test_unknown_learner_not_found(sharded_app):
+    """Test session and review reads of an unknown learner are 404s"""
+    client = sharded_app.test_client()
+    for path in ('/api/study_sessions', '/dashboard/stats', '/sync', '/words/weakest'):
+        response = client.get(path, headers=learner('alice'))
+        assert response.status_code == 404, path
+        assert json.loads(response.data)['error'] == 'Learner not found'
+    response = client.post(
+        '/api/study_sessions/1/words/1/review',
+        data=json.dumps({"correct": True}),
+        content_type='application/json',
+        headers=learner('alice')
+    )
+    assert response.status_code == 404
+    assert not shard_exists(sharded_app, 'alice')
+
+def test_session_create_creates_shard(sharded_app):
+    """Test starting a session creates the learner's shard, isolated from others"""
+    client = sharded_app.test_client()
+    response = create_session(client, 'alice')
+    assert response.status_code == 201
+    session_id = json.loads(response.data)['id']
+    assert shard_exists(sharded_app, 'alice')
+
+    response = client.post(
+        f'/api/study_sessions/{session_id}/words/1/review',
+        data=json.dumps({"correct": True}),
+        content_type='application/json',
+        headers=learner('alice')
+    )
+    assert response.status_code == 201
+
+    data = json.loads(client.get('/api/study_sessions', headers=learner('alice')).data)
+    assert data['total'] == 1
+    data = json.loads(client.get('/words/1', headers=learner('alice')).data)
+    assert data['word']['correct_count'] == 1
+
+    # Another learner has their own, still missing, shard
+    assert client.get('/api/study_sessions', headers=learner('bob')).status_code == 404
+    create_session(client, 'bob')
+    data = json.loads(client.get('/api/study_sessions', headers=learner('bob')).data)
+    assert data['total'] == 1
+
+def test_session_create_invalid_group(sharded_app):
+    """Test a missing group is a 404 in a shard, where foreign keys cannot check it"""
+    client = sharded_app.test_client()
+    response = client.post(
+        '/api/study-sessions',
+        data=json.dumps({"group_id": 99999, "study_activity_id": 1}),
+        content_type='application/json',
+        headers=learner('alice')
+    )
+    assert response.status_code == 404
+    assert 'Group not found' in json.loads(response.data)['error']
+    data = json.loads(client.get('/api/study_sessions', headers=learner('alice')).data)
+    assert data['total'] == 0
+
+def test_default_learner(sharded_app):
+    """Test requests without a learner use the default shard"""
+    client = sharded_app.test_client()
+    response = client.get('/api/study_sessions')
+    assert response.status_code == 200
+    assert json.loads(response.data)['total'] == 0
+    assert shard_exists(sharded_app, 'default')
+
+def test_invalid_learner(sharded_app):
+    """Test a malformed learner id is rejected"""
+    client = sharded_app.test_client()
+    response = client.get('/words', headers=learner('../etc'))
+    assert response.status_code == 400
+
+def sync_all(client, name, limit=500):
+    """Follow /sync pages from the start, returns the latest rows by id per
+    table and the last version."""
+    rows = {}
+    since = ''
+    while True:
+        data = json.loads(client.get(f'/sync?since={since}&limit={limit}', headers=learner(name)).data)
+        for table_name, table in data['changes'].items():
+            rows.setdefault(table_name, {}).update((row[0], row) for row in table['rows'])
+        since = data['version']
+        if not data['has_more']:
+            return rows, since
+
+def test_sync_merges_vocabulary_changes(sharded_app):
+    """Test /sync sends the shared words and groups with the learner's sessions"""
+    client = sharded_app.test_client()
+    session_id = json.loads(create_session(client, 'alice').data)['id']
+    client.post(
+        f'/api/study_sessions/{session_id}/words/1/review',
+        data=json.dumps({"correct": True}),
+        content_type='application/json',
+        headers=learner('alice')
+    )
+
+    rows, version = sync_all(client, 'alice', limit=50)
+    assert len(rows['words']) == 124
+    assert len(rows['groups']) == 2
+    assert list(rows['study_sessions']) == [session_id]
+    assert len(rows['word_review_items']) == 1
+    vocab_version, shard_version = map(int, version.split('.'))
+    assert vocab_version > 0 and shard_version > 0
+
+    # Nothing new since the cursor, then only the new group
+    data = json.loads(client.get(f'/sync?since={version}', headers=learner('alice')).data)
+    assert data['changes'] == {}
+    assert data['version'] == version
+    connection = sqlite3.connect(sharded_app.config['DATABASE'])
+    connection.execute("INSERT INTO groups (name) VALUES ('Core Nouns')")
+    connection.commit()
+    connection.close()
+    data = json.loads(client.get(f'/sync?since={version}', headers=learner('alice')).data)
+    assert list(data['changes']) == ['groups']
+    assert data['changes']['groups']['rows'][0][1] == 'Core Nouns'
+
+def test_sync_invalid_cursor(sharded_app):
+    """Test a malformed sync cursor is rejected"""
+    client = sharded_app.test_client()
+    create_session(client, 'alice')
+    response = client.get('/sync?since=x.y', headers=learner('alice'))
+    assert response.status_code == 400
+
+def test_backup_covers_shards(sharded_app, tmp_path):
+    """Test a backup snapshots the database and every learner shard"""
+    client = sharded_app.test_client()
+    create_session(client, 'alice')
+    create_session(client, 'bob')
+
+    job = BackupJob(
+        sharded_app.config['DATABASE'],
+        str(tmp_path / 'backups'),
+        shards=list_shards(sharded_app.config['SHARDS_DIR'])
+    )
+    job.run()
+    assert job.state == 'completed', job.error
+    assert job.shards_copied == 2
+    assert list_snapshots(str(tmp_path / 'backups')) == [job.filename]
+    shard_snapshots = list_snapshots(str(tmp_path / 'backups' / 'shards'))
+    assert sorted(name.split('-')[0] for name in shard_snapshots) == ['alice', 'bob']
@@ -1,12 +1,5 @@
 import pytest
 import json
-from app import create_app
-
-@pytest.fixture
-def client():
-    app = create_app({"TESTING": True})
-    with app.test_client() as client:
-        yield client
 
 def test_create_study_session_success(client):
     """Test creating a study session with valid data"""
@@ -66,6 +59,33 @@ def test_create_study_session_invalid_group(client):
     data = json.loads(response.data)
     assert 'Group not found' in data['error']
 
+def test_create_study_session_returns_names(client):
+    """Test the created session includes the group and activity names"""
+    response = client.post(
+        '/api/study-sessions',
+        data=json.dumps({"group_id": 2, "study_activity_id": 1}),
+        content_type='application/json'
+    )
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert data['id'] == 2
+    assert data['group_name'] == 'Core Adjectives'
+    assert data['activity_name'] == 'Typing Tutor'
+
+def test_create_study_session_invalid_activity(app, client):
+    """Test creating a study session with non-existent activity leaves no session"""
+    response = client.post(
+        '/api/study-sessions',
+        data=json.dumps({"group_id": 1, "study_activity_id": 99999}),
+        content_type='application/json'
+    )
+    assert response.status_code == 404
+    assert 'Study activity not found' in json.loads(response.data)['error']
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT COUNT(*) FROM study_sessions')
+        assert cursor.fetchone()[0] == 1
+
 def test_create_word_review_success(client):
     """Test creating a word review with valid data"""
     payload = {
@@ -119,6 +139,24 @@ def test_create_word_review_invalid_session(client):
     data = json.loads(response.data)
     assert 'Study session not found' in data['error']
 
+def test_create_word_review_stale_session(app, client, post_review):
+    """Test a session deleted behind the membership index is not found"""
+    # As if another worker deleted session 99999 after this one cached it
+    assert post_review(1).status_code == 201
+    app.membership.add_session(99999, 1)
+    response = post_review(1, session_id=99999)
+    assert response.status_code == 404
+    data = json.loads(response.data)
+    assert 'Study session not found' in data['error']
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT COUNT(*) FROM word_review_items WHERE study_session_id = 99999')
+        assert cursor.fetchone()[0] == 0
+
+    # The stale entry is gone, so the next review does not try the insert
+    response = post_review(1, session_id=99999)
+    assert response.status_code == 404
+
 def test_create_word_review_word_not_in_group(client):
     """Test creating a word review for word not in session's group"""
     payload = {"correct": True}
@@ -129,4 +167,63 @@ def test_create_word_review_word_not_in_group(client):
     )
     assert response.status_code == 404
     data = json.loads(response.data)
-    assert 'Word not found or not in session group' in data['error'] 
\ No newline at end of file
+    assert 'Word not found or not in session group' in data['error']
+
+def test_close_study_session(client, post_review):
+    """Test closing a session freezes its report and refuses new reviews"""
+    post_review(1, correct=True)
+    post_review(2, correct=False)
+    response = client.post('/api/study_sessions/1/close')
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert data['review_items_count'] == 2
+    assert data['correct_count'] == 1
+    assert data['wrong_count'] == 1
+    assert data['words_count'] == 2
+    assert data['closed_at']
+
+    assert post_review(1).status_code == 409
+    response = client.post('/api/study_sessions/1/close')
+    assert response.status_code == 200
+    assert json.loads(response.data)['review_items_count'] == 2
+
+def test_close_study_session_not_found(client):
+    """Test closing a non-existent session"""
+    response = client.post('/api/study_sessions/99999/close')
+    assert response.status_code == 404
+
+def test_start_study_activity_success(client):
+    """Test starting a study activity returns the session and its first words"""
+    response = client.post(
+        '/api/study-activities/1/start',
+        data=json.dumps({"group_id": 1, "n": 3}),
+        content_type='application/json'
+    )
+
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert data['session']['group_id'] == 1
+    assert data['session']['activity_id'] == 1
+    assert len(data['words']) == 3
+    for word in data['words']:
+        assert word['parts']
+        assert 'last_reviewed' in word['hints']
+        assert 0 < word['hints']['weight'] < 1
+
+    # The words can be reviewed in the new session straight away
+    response = client.post(
+        f"/api/study_sessions/{data['session']['id']}/words/{data['words'][0]['id']}/review",
+        data=json.dumps({"correct": True}),
+        content_type='application/json'
+    )
+    assert response.status_code == 201
+
+def test_start_study_activity_invalid_group(client):
+    """Test starting a study activity with non-existent group"""
+    response = client.post(
+        '/api/study-activities/1/start',
+        data=json.dumps({"group_id": 99999}),
+        content_type='application/json'
+    )
+    assert response.status_code == 404
+    assert b'Group not found' in response.data
@@ -0,0 +1,68 @@
+import json
+
+def sync(client, since=0, limit=500):
+    return json.loads(client.get(f'/sync?since={since}&limit={limit}').data)
+
+def test_sync_from_start(client):
+    """Test a first sync sends every logged row"""
+    data = sync(client)
+    assert data['has_more'] is False
+    assert data['version'] > 0
+    assert len(data['changes']['words']['rows']) == 124
+    assert data['changes']['words']['columns'] == ['id', 'kanji', 'romaji', 'english']
+    assert [row[1] for row in data['changes']['groups']['rows']] == ['Core Verbs', 'Core Adjectives']
+    assert [row[0] for row in data['changes']['study_sessions']['rows']] == [1]
+
+def test_sync_pages(client):
+    """Test following has_more pages through the whole log"""
+    words = set()
+    since = 0
+    pages = 0
+    while True:
+        data = sync(client, since, limit=50)
+        assert data['version'] > since
+        words.update(row[0] for row in data['changes'].get('words', {}).get('rows', []))
+        since = data['version']
+        pages += 1
+        if not data['has_more']:
+            break
+    assert pages == 3
+    assert len(words) == 124
+    assert sync(client, since) == {'version': since, 'has_more': False, 'changes': {}}
+
+def test_sync_new_reviews(client, post_review):
+    """Test a sync from the last version only sends what changed since"""
+    version = sync(client)['version']
+    post_review(1, correct=True)
+    post_review(2, correct=False)
+
+    data = sync(client, version)
+    assert list(data['changes']) == ['word_review_items']
+    rows = data['changes']['word_review_items']['rows']
+    assert [(row[1], row[2], row[3]) for row in rows] == [(1, 1, 1), (2, 1, 0)]
+
+def test_sync_deleted_rows(app, client):
+    """Test a row added and removed within a page is only reported deleted"""
+    version = sync(client)['version']
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Nouns')")
+        group_id = cursor.lastrowid
+        cursor.execute('DELETE FROM groups WHERE id = ?', (group_id,))
+        app.db.commit()
+
+    data = sync(client, version)
+    assert data['changes']['groups']['rows'] == []
+    assert data['changes']['groups']['deleted'] == [group_id]
+
+def test_sync_clear_after_reset(client, post_review):
+    """Test resetting the history tells clients to drop their sessions and reviews"""
+    post_review(1)
+    version = sync(client)['version']
+    assert client.post('/api/study_sessions/reset').status_code == 200
+
+    data = sync(client, version)
+    assert data['changes']['study_sessions']['cleared'] is True
+    assert data['changes']['word_review_items']['cleared'] is True
+    assert data['changes']['word_review_items']['rows'] == []
+    assert 'words' not in data['changes']
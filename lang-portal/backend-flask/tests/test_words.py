@@ -0,0 +1,103 @@
+import json
+
+from lib.archive import archive_reviews
+
+def weakest(client, query=''):
+    return json.loads(client.get(f'/words/weakest{query}').data)['words']
+
+def test_weakest_words(client, post_review):
+    """Test reviewed words are ranked by error rate, unreviewed ones left out"""
+    post_review(1, correct=False)
+    post_review(1, correct=False)
+    post_review(2, correct=False)
+    post_review(2, correct=True)
+    post_review(3, correct=True)
+
+    words = weakest(client)
+    assert [word['id'] for word in words] == [1, 2, 3]
+    assert [word['error_rate'] for word in words] == [1.0, 0.5, 0.0]
+    assert words[0]['wrong_count'] == 2
+
+    assert [word['id'] for word in weakest(client, '?k=2')] == [1, 2]
+
+def test_weakest_words_ties(client, post_review):
+    """Test words with the same error rate rank by their wrong count"""
+    post_review(1, correct=False)
+    post_review(2, correct=False)
+    post_review(2, correct=False)
+    assert [word['id'] for word in weakest(client)] == [2, 1]
+
+def test_weakest_words_in_group(client, post_review):
+    """Test the weakest words can be limited to a group"""
+    response = client.post(
+        '/api/study-sessions',
+        data=json.dumps({"group_id": 2, "study_activity_id": 1}),
+        content_type='application/json'
+    )
+    session_id = json.loads(response.data)['id']
+    post_review(1, correct=False)
+    post_review(61, correct=False, session_id=session_id)
+
+    assert [word['id'] for word in weakest(client, '?group_id=2')] == [61]
+    assert [word['id'] for word in weakest(client, '?group_id=1')] == [1]
+
+def test_weakest_words_none_reviewed(client):
+    """Test there are no weakest words before any review"""
+    assert weakest(client) == []
+
+def backdate_reviews(app, word_id, reviews):
+    """Insert (created_at, correct) reviews of a word in session 1."""
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.executemany('''
+            INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+            VALUES (?, 1, ?, ?)
+        ''', [(word_id, correct, created_at) for created_at, correct in reviews])
+        app.db.commit()
+
+def test_word_history(client, post_review):
+    """Test a word with few reviews gets one point per review"""
+    post_review(1, correct=True)
+    post_review(1, correct=False)
+    post_review(2, correct=True)
+
+    data = json.loads(client.get('/words/1/history').data)
+    assert data['word_id'] == 1
+    assert data['total_reviews'] == 2
+    assert [(point['review_count'], point['accuracy']) for point in data['points']] == [(1, 1.0), (1, 0.0)]
+
+def test_word_history_buckets(app, client):
+    """Test reviews are split into equal-count buckets in time order"""
+    backdate_reviews(app, 1, [
+        (f'2024-01-{day:02d} 10:00:00', day > 6) for day in range(1, 13)
+    ])
+
+    data = json.loads(client.get('/words/1/history?points=3').data)
+    assert data['total_reviews'] == 12
+    points = data['points']
+    assert [point['review_count'] for point in points] == [4, 4, 4]
+    assert [point['correct_count'] for point in points] == [0, 2, 4]
+    assert [point['wrong_count'] for point in points] == [4, 2, 0]
+    assert points[0]['start'] == '2024-01-01 10:00:00'
+    assert points[0]['end'] == '2024-01-04 10:00:00'
+    assert points[2]['end'] == '2024-01-12 10:00:00'
+
+def test_word_history_includes_archived(app, client, post_review):
+    """Test archived reviews are part of the history"""
+    backdate_reviews(app, 1, [('2024-01-01 10:00:00', False)])
+    post_review(1, correct=True)
+    with app.app_context():
+        archive_reviews(app.db.get())
+
+    data = json.loads(client.get('/words/1/history').data)
+    assert data['total_reviews'] == 2
+    assert data['points'][0]['start'] == '2024-01-01 10:00:00'
+
+def test_word_history_not_found(client):
+    """Test the history of a non-existent word"""
+    assert client.get('/words/99999/history').status_code == 404
+
+def test_word_history_no_reviews(client):
+    """Test a word that was never reviewed has no points"""
+    data = json.loads(client.get('/words/2/history').data)
+    assert data == {'word_id': 2, 'total_reviews': 0, 'points': []}